@@ -0,0 +1,42 @@
+from argparse import ArgumentParser
+from src.batch import BatchRunner
+from src.monitor import JSONLinesSink, PrometheusSink
+from src.rdf import Manager
+from src.results import FORMATS
+import sys
+
+#Parse command line arguments
+parser = ArgumentParser(description='Run a batch of SPARQL queries against one rdf graph.')
+parser.add_argument('queries', nargs='+', help='.rq files or directories containing .rq files')
+parser.add_argument('-g', '--graph', action='append', default=[], help='rdf file to import. Can be repeated.')
+parser.add_argument('-b', '--build', type=int, metavar='MAX_DATA_COUNT', help='build the graph from the web with at most MAX_DATA_COUNT reports per dataset')
+parser.add_argument('-o', '--output', default='./results', help='directory where results are written. Defaults to ./results')
+parser.add_argument('-f', '--format', default='csv', choices=sorted(FORMATS), help='result format. Defaults to csv')
+parser.add_argument('-w', '--workers', type=int, help='maximum number of concurrent queries. Defaults to the number of cores')
+parser.add_argument('--trace', metavar='FILE', help='append a JSON line with the metrics of every stage to FILE')
+parser.add_argument('--metrics-textfile', metavar='FILE', help='export stage metrics to FILE in the Prometheus textfile format')
+args = parser.parse_args()
+
+if not args.graph and args.build is None:
+    parser.error('either --graph or --build is required')
+
+#Load or build the graph once
+manager = Manager()
+if args.trace:
+    manager.monitor.add_sink(JSONLinesSink(args.trace))
+if args.metrics_textfile:
+    manager.monitor.add_sink(PrometheusSink(args.metrics_textfile))
+for filename in args.graph:
+    successfully_imported, path = manager.import_file(filename)
+    if not successfully_imported:
+        print('ERROR: Unable to import \'%s\'' % path)
+        sys.exit(2)
+if args.build is not None:
+    manager.import_reports(args.build)
+
+#Run all queries and print the timing summary
+runner = BatchRunner(manager, args.output, args.format, args.workers)
+records = runner.run(args.queries)
+print(runner.summary(records))
+
+sys.exit(1 if any(r['status'] == 'FAILED' for r in records) else 0)
@@ -0,0 +1,157 @@
+"""Generate synthetic arrest and crime reports with the columns of the LA open data portal.
+
+Run from the repository root:
+    python -m benchmarks.generator 10000 data/
+"""
+from argparse import ArgumentParser
+from csv import writer
+from datetime import date, timedelta
+from pathlib import Path
+from random import Random
+
+#Columns of the arrest reports dataset (amvf-fr72), in portal order
+ARREST_COLUMNS = ['rpt_id', 'report_type', 'arst_date', 'time', 'area', 'area_desc', 'rd', 'age', 'sex_cd', 'descent_cd', 'chrg_grp_cd', 'grp_description', 'arst_typ_cd', 'charge', 'chrg_desc', 'dispo_desc', 'location', 'crsst', 'lat', 'lon', 'bkg_date', 'bkg_time', 'bgk_location', 'bkg_loc_cd']
+
+#Columns of the crime reports dataset (2nrs-mtv8), in portal order
+CRIME_COLUMNS = ['dr_no', 'date_rptd', 'date_occ', 'time_occ', 'area', 'area_name', 'rpt_dist_no', 'part_1_2', 'crm_cd', 'crm_cd_desc', 'mocodes', 'vict_age', 'vict_sex', 'vict_descent', 'premis_cd', 'premis_desc', 'weapon_used_cd', 'weapon_desc', 'status', 'status_desc', 'crm_cd_1', 'crm_cd_2', 'crm_cd_3', 'crm_cd_4', 'location', 'cross_street', 'lat', 'lon']
+
+#The 21 LAPD geographic areas
+AREAS = ['Central', 'Rampart', 'Southwest', 'Hollenbeck', 'Harbor', 'Hollywood', 'Wilshire', 'West LA', 'Van Nuys', 'West Valley', 'Northeast', '77th Street', 'Newton', 'Pacific', 'N Hollywood', 'Foothill', 'Devonshire', 'Southeast', 'Mission', 'Olympic', 'Topanga']
+
+DESCENTS = ['H', 'B', 'W', 'O', 'X', 'A', 'K', 'F', 'C', 'J', 'V', 'I', 'G', 'P', 'U', 'Z', 'S', 'D', 'L']
+STREETS = ['MAIN', 'BROADWAY', 'FIGUEROA', 'VERMONT', 'WESTERN', 'SUNSET', 'HOLLYWOOD', 'WILSHIRE', 'OLYMPIC', 'PICO', 'VENICE', 'SEPULVEDA', 'VAN NUYS', 'RESEDA', 'SHERMAN', 'VICTORY', 'ROSCOE', 'SAN FERNANDO', 'CENTRAL', 'ALAMEDA', 'CRENSHAW', 'LA BREA', 'FAIRFAX', 'LA CIENEGA', 'MANCHESTER', 'SLAUSON', 'FLORENCE', 'CESAR E CHAVEZ', 'SANTA MONICA', 'MELROSE']
+SUFFIXES = ['ST', 'AV', 'BL', 'DR', 'WY']
+
+CHARGE_GROUPS = [('1', 'Homicide'), ('3', 'Robbery'), ('4', 'Aggravated Assault'), ('5', 'Burglary'), ('6', 'Larceny'), ('7', 'Vehicle Theft'), ('8', 'Other Assaults'), ('10', 'Forgery/Counterfeit'), ('11', 'Fraud/Embezzlement'), ('12', 'Receive Stolen Property'), ('13', 'Weapon (carry/poss)'), ('14', 'Prostitution/Allied'), ('15', 'Sex (except rape/prst)'), ('16', 'Narcotic Drug Laws'), ('17', 'Liquor Laws'), ('18', 'Drunkeness'), ('19', 'Disorderly Conduct'), ('22', 'Driving Under Influence'), ('23', 'Moving Traffic Violations'), ('24', 'Miscellaneous Other Violations'), ('25', 'Federal Offenses'), ('26', 'Non-Criminal Detention'), ('27', 'Pre-Delinquency'), ('28', 'Failure to Appear')]
+ARREST_TYPES = ['F', 'M', 'I', 'D', 'O']
+DISPOSITIONS = ['MISDEMEANOR COMPLAINT FILED', 'FELONY COMPLAINT FILED', 'RELEASED', 'REFERRED TO OTHER AGENCY', 'JUVENILE PETITION', 'DISTRICT ATTORNEY REJECT', 'OTHER']
+
+CRIMES = [('110', 'CRIMINAL HOMICIDE'), ('210', 'ROBBERY'), ('230', 'ASSAULT WITH DEADLY WEAPON, AGGRAVATED ASSAULT'), ('310', 'BURGLARY'), ('330', 'BURGLARY FROM VEHICLE'), ('341', 'THEFT-GRAND ($950.01 & OVER)EXCPT,GUNS,FOWL,LIVESTK,PROD'), ('350', 'THEFT, PERSON'), ('354', 'THEFT OF IDENTITY'), ('420', 'THEFT FROM MOTOR VEHICLE - PETTY ($950 & UNDER)'), ('440', 'THEFT PLAIN - PETTY ($950 & UNDER)'), ('510', 'VEHICLE - STOLEN'), ('624', 'BATTERY - SIMPLE ASSAULT'), ('626', 'INTIMATE PARTNER - SIMPLE ASSAULT'), ('740', 'VANDALISM - FELONY ($400 & OVER, ALL CHURCH VANDALISMS)'), ('745', 'VANDALISM - MISDEAMEANOR ($399 OR UNDER)'), ('930', 'CRIMINAL THREATS - NO WEAPON DISPLAYED')]
+PREMISES = [('101', 'STREET'), ('102', 'SIDEWALK'), ('108', 'PARKING LOT'), ('122', 'VEHICLE, PASSENGER/TRUCK'), ('203', 'OTHER BUSINESS'), ('210', 'RESTAURANT/FAST FOOD'), ('402', 'MARKET'), ('404', 'DEPARTMENT STORE'), ('501', 'SINGLE FAMILY DWELLING'), ('502', 'MULTI-UNIT DWELLING (APARTMENT, DUPLEX, ETC)'), ('707', 'GARAGE/CARPORT'), ('710', 'OTHER PREMISE')]
+WEAPONS = [('400', 'STRONG-ARM (HANDS, FIST, FEET OR BODILY FORCE)'), ('500', 'UNKNOWN WEAPON/OTHER WEAPON'), ('511', 'VERBAL THREAT'), ('102', 'HAND GUN'), ('200', 'KNIFE WITH BLADE 6INCHES OR LESS'), ('307', 'VEHICLE')]
+STATUSES = [('IC', 'Invest Cont'), ('AA', 'Adult Arrest'), ('AO', 'Adult Other'), ('JA', 'Juv Arrest'), ('JO', 'Juv Other')]
+MOCODES = ['0344', '1822', '0416', '0329', '1300', '2000', '0913', '1814', '0400', '0444', '1402', '0421']
+
+class ReportGenerator:
+    """A ReportGenerator class used to generate reproducible synthetic reports with realistic cardinalities.
+    """
+    def __init__(self, seed=0, start=date(2020, 1, 1), days=730):
+        """Initialize ReportGenerator class.
+
+        Args:
+            seed (int, optional): seed of the generator. The same seed generates the same reports. Defaults to 0.
+            start (datetime.date, optional): first day of the reports. Defaults to 2020-01-01.
+            days (int, optional): number of days the reports are spread over. Defaults to 730.
+        """
+        self.seed = seed
+        self.start = start
+        self.days = days
+
+        #Addresses are shared between reports, as reports of the same places are
+        random = Random(seed)
+        self._addresses = []
+        for _ in range(5000):
+            area = random.randrange(len(AREAS))
+            address = '%s %s %s' % (random.randint(1, 199) * 100, random.choice(STREETS), random.choice(SUFFIXES))
+            cross_street = '%s %s' % (random.choice(STREETS), random.choice(SUFFIXES)) if random.random() < 0.2 else ''
+            lat = '%.4f' % (33.70 + random.random() * 0.60)
+            lon = '%.4f' % (-118.67 + random.random() * 0.52)
+            self._addresses.append((area, address, cross_street, lat, lon))
+        self._charges = [(random.choice(CHARGE_GROUPS), '%s%s' % (random.randint(100, 25000), random.choice(['', 'A', 'B', '(A)'])), 'CHARGE %s' % i) for i in range(1000)]
+        self._bookings = [('%s' % random.randint(4200, 4299), '%s %s %s' % (random.randint(1, 199) * 100, random.choice(STREETS), random.choice(SUFFIXES))) for _ in range(40)]
+
+    def arrest_reports(self, n):
+        """Generate arrest reports.
+
+        Args:
+            n (int): number of reports.
+
+        Returns:
+            generator: rows of values in the order of ARREST_COLUMNS.
+        """
+        random = Random(self.seed * 2 + 1)
+        for i in range(n):
+            area, address, cross_street, lat, lon = random.choice(self._addresses)
+            day = self._date(random)
+            (group_code, group_description), charge, charge_description = random.choice(self._charges)
+            booking_code, booking_location = random.choice(self._bookings)
+            booked = random.random() < 0.7
+            yield [
+                str(5000000 + i), 'BOOKING' if booked else 'RFC', day, '%02d%02d' % (random.randint(0, 23), random.randint(0, 59)),
+                '%02d' % (area + 1), AREAS[area], str((area + 1) * 100 + random.randint(0, 99)),
+                str(random.randint(18, 70)), random.choice('MMMFX'), random.choice(DESCENTS),
+                group_code, group_description, random.choice(ARREST_TYPES), charge, charge_description, random.choice(DISPOSITIONS),
+                address, cross_street, lat, lon,
+                day if booked else '', '%02d%02d' % (random.randint(0, 23), random.randint(0, 59)) if booked else '', booking_location if booked else '', booking_code if booked else '',
+            ]
+
+    def crime_reports(self, n):
+        """Generate crime reports.
+
+        Args:
+            n (int): number of reports.
+
+        Returns:
+            generator: rows of values in the order of CRIME_COLUMNS.
+        """
+        random = Random(self.seed * 2 + 2)
+        for i in range(n):
+            area, address, cross_street, lat, lon = random.choice(self._addresses)
+            occurred = self._date(random)
+            crime_code, crime_description = random.choice(CRIMES)
+            premise_code, premise_description = random.choice(PREMISES)
+            weapon_code, weapon_description = random.choice(WEAPONS) if random.random() < 0.35 else ('', '')
+            status, status_description = random.choice(STATUSES)
+            yield [
+                str(200000000 + i), self._date(random), occurred, '%02d%02d' % (random.randint(0, 23), random.randint(0, 59)),
+                '%02d' % (area + 1), AREAS[area], str((area + 1) * 100 + random.randint(0, 99)),
+                random.choice('12'), crime_code, crime_description, ' '.join(random.sample(MOCODES, random.randint(0, 4))),
+                str(random.randint(0, 90)), random.choice('MFX'), random.choice(DESCENTS),
+                premise_code, premise_description, weapon_code, weapon_description, status, status_description,
+                crime_code, random.choice(CRIMES)[0] if random.random() < 0.1 else '', '', '',
+                address, cross_street, lat, lon,
+            ]
+
+    def write(self, directory, n):
+        """Write n arrest reports and n crime reports as CSV files.
+
+        Args:
+            directory (string): directory the files are written to.
+            n (int): number of reports per dataset.
+
+        Returns:
+            {string: Path}: path of each dataset by its resource id.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = {'amvf-fr72': directory / ('arrest-reports-%s.csv' % n), '2nrs-mtv8': directory / ('crime-reports-%s.csv' % n)}
+        for (resource, path), columns, rows in zip(paths.items(), (ARREST_COLUMNS, CRIME_COLUMNS), (self.arrest_reports(n), self.crime_reports(n))):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                out = writer(f)
+                out.writerow(columns)
+                out.writerows(rows)
+        return paths
+
+    def _date(self, random):
+        """Pick a day in the portal's date format.
+
+        Args:
+            random (random.Random): the random generator.
+
+        Returns:
+            string: the day.
+        """
+        return (self.start + timedelta(days=random.randrange(self.days))).isoformat() + 'T00:00:00.000'
+
+def main():
+    parser = ArgumentParser(description='Generate synthetic arrest and crime reports.')
+    parser.add_argument('size', type=int, help='number of reports per dataset')
+    parser.add_argument('directory', help='directory the CSV files are written to')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generator (default: 0)')
+    args = parser.parse_args()
+
+    for resource, path in ReportGenerator(args.seed).write(args.directory, args.size).items():
+        print('INFO: Wrote %s reports of \'%s\' to \'%s\'' % (args.size, resource, path))
+
+if __name__ == '__main__':
+    main()
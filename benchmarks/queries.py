@@ -0,0 +1,59 @@
+"""Fixed query set timed by the benchmark suite. Formatted with the namespace of the imported reports."""
+
+PREFIXES = '''PREFIX ns1: <%s>
+PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+'''
+
+QUERIES = {
+    'reports-by-area': '''
+SELECT ?area (COUNT(?report) AS ?count) WHERE {
+    ?report ns1:hasLocation ?location .
+    ?location ns1:hasAreaName ?area .
+} GROUP BY ?area ORDER BY DESC(?count)''',
+
+    'arrests-by-charge-group': '''
+SELECT ?group (COUNT(?report) AS ?count) WHERE {
+    GRAPH <arrest-reports> {
+        ?report ns1:hasCharge ?charge .
+        ?charge ns1:hasChargeGroupDescription ?group .
+    }
+} GROUP BY ?group''',
+
+    'report-lookup': '''
+SELECT ?p ?o WHERE {
+    ?report ns1:hasID "5000010"^^xsd:integer ;
+        ?p ?o .
+}''',
+
+    'crimes-with-weapon-in-area': '''
+SELECT ?report ?weapon WHERE {
+    ?report ns1:hasWeapon ?w ;
+        ns1:hasLocation ?location .
+    ?w ns1:hasWeaponDescription ?weapon .
+    ?location ns1:hasAreaName "HOLLYWOOD"^^xsd:string .
+    FILTER (?weapon != ""^^xsd:string)
+}''',
+
+    'latest-reports': '''
+SELECT ?report ?time WHERE {
+    ?report ns1:hasDateTime ?time .
+} ORDER BY DESC(?time) LIMIT 100''',
+
+    'older-persons': '''
+SELECT DISTINCT ?person ?age WHERE {
+    ?report ns1:hasPerson ?person .
+    ?person ns1:hasAge ?age .
+    FILTER (?age > 60)
+}''',
+}
+
+def queries(namespace):
+    """Get the query set for a namespace.
+
+    Args:
+        namespace (string): namespace of the imported reports.
+
+    Returns:
+        {string: string}: each query by its name.
+    """
+    return {name: (PREFIXES % namespace) + query for name, query in QUERIES.items()}
@@ -0,0 +1,100 @@
+"""Benchmark rendering one 1000-row result chunk to html.
+
+Run from the repository root:
+    python -m benchmarks.render
+"""
+import dominate
+from dominate.tags import *
+from argparse import ArgumentParser
+from random import Random
+from rdflib import Namespace
+from src.rdf import Manager
+from src.render import HTMLRenderer
+from timeit import repeat
+from urllib.parse import quote
+
+def legacy_data_to_html(rdf_manager, data):
+    """The renderer used before HTMLRenderer. Namespaces are fetched from the graph for every url and the page is built with dominate.
+
+    Args:
+        rdf_manager (rdf.Manager): the rdf manager holding the namespaces.
+        data ([[string]]): headers followed by rows.
+
+    Returns:
+        string: html table contains data.
+    """
+    doc = dominate.document(title='SPARQL-Results')
+    with doc.head:
+        style('''
+        table, th, td {
+            border: 1px solid black;
+        }
+
+        ''')
+    with doc.add(table()):
+        with thead().add(tr()):
+            for i in data[0]:
+                th(i)
+        with tbody():
+            for i in range(1, len(data)):
+                with tr():
+                    for j in data[i]:
+                        if 'https://' in j or 'http://' in j:
+                            with td():
+                                shorted_name = j
+                                for prefix, namespace in rdf_manager.get_namespace():
+                                    prefix = str(prefix)+':'
+                                    namespace = str(namespace)
+                                    if namespace in j:
+                                        shorted_name = j.replace(namespace, prefix)
+                                node = a(shorted_name)
+                                node['href']='custom-url-scheme://redirect-to/' + quote('<'+ j + '>') + '/'
+                        else:
+                            td(j)
+    return (str(doc))
+
+def generate_chunk(rows, seed=0):
+    """Generate a chunk shaped like the result of a ?s ?p ?o query over the report graphs.
+
+    Args:
+        rows (int): number of rows.
+        seed (int, optional): seed of the generator. Defaults to 0.
+
+    Returns:
+        [[string]]: headers followed by rows.
+    """
+    random = Random(seed)
+    ns = 'https://data.lacity.org/'
+    predicates = ['reportId', 'arrestDate', 'area', 'areaDesc', 'chargeDesc', 'hasLocation', 'hasVictim', 'crimeCode']
+    data = [['s', 'p', 'o']]
+    for i in range(rows):
+        subject = ns + 'Report-%s' % random.randint(0, rows // 4)
+        predicate = ns + random.choice(predicates)
+        if predicate.endswith('hasLocation') or predicate.endswith('hasVictim'):
+            value = ns + 'Location-%032x' % random.getrandbits(128)
+        else:
+            value = 'value <%s> & more' % random.randint(0, 1000)
+        data.append([subject, predicate, value])
+    return data
+
+def main():
+    parser = ArgumentParser(description='Benchmark html rendering of one result chunk.')
+    parser.add_argument('--rows', type=int, default=1000, help='rows in the chunk (default: 1000)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed runs, the best is reported (default: 5)')
+    args = parser.parse_args()
+
+    #A manager with the namespaces an imported graph has
+    rdf_manager = Manager()
+    rdf_manager.c_graph.bind('ns1', Namespace('https://data.lacity.org/'))
+    data = generate_chunk(args.rows)
+
+    before = min(repeat(lambda: legacy_data_to_html(rdf_manager, data), number=1, repeat=args.repeat))
+    after = min(repeat(lambda: HTMLRenderer(rdf_manager.get_namespace()).render(data[0], data[1:]), number=1, repeat=args.repeat))
+
+    print('rows: %s' % args.rows)
+    print('before (dominate): %8.2f ms' % (before * 1000))
+    print('after (HTMLRenderer): %8.2f ms' % (after * 1000))
+    print('speedup: %.1fx' % (before / after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""A local stand-in for the Socrata API of the LA open data portal.
+
+Run from the repository root:
+    python -m benchmarks.socrata data/arrest-reports-10000.csv data/crime-reports-10000.csv --port 8001
+"""
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from pathlib import Path
+from threading import Thread
+from urllib.parse import parse_qs, urlsplit
+
+class SocrataStandIn:
+    """A SocrataStandIn class used to serve CSV files the way the portal serves its datasets.
+
+    Only the requests made by rdf.Manager are supported:
+        /resource/<id>.json?$query=SELECT COUNT(*)
+        /resource/<id>.csv?$limit=<n>
+    """
+    def __init__(self, datasets, host='127.0.0.1', port=0):
+        """Initialize SocrataStandIn class.
+
+        Args:
+            datasets ({string: string}): path of the CSV file of each resource id, such as 'amvf-fr72'.
+            host (string, optional): address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): port to listen on. 0 picks a free port. Defaults to 0.
+        """
+        self.datasets = {resource: Path(path) for resource, path in datasets.items()}
+        self._counts = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        """Get the base url of the stand-in.
+
+        Returns:
+            string: the base url, such as 'http://127.0.0.1:8001/'.
+        """
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%s/' % (host, port)
+
+    def resource_url(self, resource):
+        """Get the url of a dataset, as passed to rdf.Manager.
+
+        Args:
+            resource (string): resource id of the dataset.
+
+        Returns:
+            string: url of the dataset.
+        """
+        return self.url + 'resource/' + resource
+
+    def start(self):
+        """Serve requests on a background thread.
+        """
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving requests.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        """Serve requests until interrupted.
+        """
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def count(self, resource):
+        """Get the number of rows of a dataset.
+
+        Args:
+            resource (string): resource id of the dataset.
+
+        Returns:
+            int: number of rows without the header.
+        """
+        if resource not in self._counts:
+            with open(self.datasets[resource], 'rb') as f:
+                self._counts[resource] = max(sum(1 for _ in f) - 1, 0)
+        return self._counts[resource]
+
+    def _handler(self):
+        """Create the request handler class bound to this stand-in.
+
+        Returns:
+            type: a http.server.BaseHTTPRequestHandler subclass.
+        """
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = parse_qs(url.query)
+                name = url.path.rsplit('/', 1)[-1]
+                resource, _, extension = name.partition('.')
+                if not url.path.startswith('/resource/') or resource not in stand_in.datasets:
+                    self.send_error(404)
+                    return
+
+                if extension == 'json' and 'COUNT' in params.get('$query', [''])[0].upper():
+                    body = dumps([{'COUNT': str(stand_in.count(resource))}]).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif extension == 'csv':
+                    limit = int(params.get('$limit', [1000])[0])
+
+                    #Stream the header and the first rows in chunks
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/csv')
+                    self.end_headers()
+                    with open(stand_in.datasets[resource], 'rb') as f:
+                        chunk = []
+                        for i, line in enumerate(f):
+                            if i > limit:
+                                break
+                            chunk.append(line)
+                            if len(chunk) == 1000:
+                                self.wfile.write(b''.join(chunk))
+                                chunk = []
+                        self.wfile.write(b''.join(chunk))
+                else:
+                    self.send_error(400)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = ArgumentParser(description='Serve CSV files like the LA open data portal.')
+    parser.add_argument('arrest_reports', help='CSV file served as arrest reports (amvf-fr72)')
+    parser.add_argument('crime_reports', help='CSV file served as crime reports (2nrs-mtv8)')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8001, help='port to listen on (default: 8001)')
+    args = parser.parse_args()
+
+    stand_in = SocrataStandIn({'amvf-fr72': args.arrest_reports, '2nrs-mtv8': args.crime_reports}, args.host, args.port)
+    print('INFO: Serving datasets on %s...' % stand_in.url)
+    stand_in.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Measure cold start in fresh processes: the import time of the main modules, time-to-window of main.py and time-to-first-query of cli_main.py.
+
+The command line query runs against a graph checkpoint built once from generated reports. The window is shown offscreen when there is no display.
+
+Run from the repository root:
+    python -m benchmarks.startup --runs 5
+"""
+from argparse import ArgumentParser
+from json import dump, loads
+from os import environ
+from pathlib import Path
+from statistics import median
+from subprocess import DEVNULL, PIPE, Popen, run
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from .generator import ReportGenerator
+from .socrata import SocrataStandIn
+
+#Modules whose import time is measured
+MODULES = ['src.rdf', 'src.ui']
+
+#Query answered by the command line
+QUERY = 'SELECT (COUNT(*) AS ?count) WHERE { ?s ?p ?o }'
+
+def import_time(module):
+    """Measure the import time of a module in a fresh process.
+
+    Args:
+        module (string): name of the module.
+
+    Returns:
+        float: seconds.
+    """
+    code = 'from time import perf_counter; t = perf_counter(); import %s; print(perf_counter() - t)' % module
+    return float(run([executable, '-c', code], stdout=PIPE, check=True, text=True).stdout)
+
+def time_to_window(timeout=60):
+    """Start main.py and wait until its window is shown.
+
+    Args:
+        timeout (int, optional): seconds to wait for the window. Defaults to 60.
+
+    Returns:
+        (float, float): seconds reported by main.py, and seconds since the process was started. None if no window was shown.
+    """
+    env = dict(environ)
+    if not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+    start = perf_counter()
+    process = Popen([executable, '-u', 'main.py'], stdout=PIPE, stderr=DEVNULL, text=True, env=env)
+    try:
+        for line in process.stdout:
+            if line.startswith('INFO: Window shown'):
+                return float(line.split()[3]), perf_counter() - start
+            if perf_counter() - start > timeout:
+                break
+        return None
+    finally:
+        process.kill()
+        process.wait()
+
+def time_to_first_query(arguments, trace):
+    """Run a query through cli_main.py.
+
+    Args:
+        arguments ([string]): checkpoint, size and url arguments of cli_main.py.
+        trace (string): trace file the command line appends its stage metrics to.
+
+    Returns:
+        (float, float): seconds reported by cli_main.py, and seconds since the process was started.
+    """
+    start = perf_counter()
+    run([executable, 'cli_main.py', 'query', QUERY, '--trace', trace] + arguments, stdout=DEVNULL, stderr=DEVNULL, check=True)
+    seconds = perf_counter() - start
+    with open(trace) as f:
+        records = [loads(line) for line in f]
+    return [record['seconds'] for record in records if record['name'] == 'time-to-first-query'][-1], seconds
+
+def main():
+    parser = ArgumentParser(description='Measure cold start of the window and of a command line query.')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs of each measurement (default: 5)')
+    parser.add_argument('--size', type=int, default=1000, help='number of reports per dataset of the queried graph (default: 1000)')
+    parser.add_argument('--output', help='file the results are written to as JSON')
+    args = parser.parse_args()
+
+    results = {'imports': {}, 'time-to-window': [], 'time-to-first-query': []}
+    for module in MODULES:
+        results['imports'][module] = [import_time(module) for _ in range(args.runs)]
+
+    for _ in range(args.runs):
+        shown = time_to_window()
+        if shown is None:
+            print('ERROR: The window wasn\'t shown')
+            break
+        results['time-to-window'].append(shown)
+
+    with TemporaryDirectory() as directory:
+        print('INFO: Building a graph checkpoint of %s reports per dataset...' % args.size)
+        paths = ReportGenerator().write(directory, args.size)
+        stand_in = SocrataStandIn({'amvf-fr72': paths['amvf-fr72'], '2nrs-mtv8': paths['2nrs-mtv8']})
+        stand_in.start()
+        arguments = ['--checkpoints', str(Path(directory) / 'checkpoints'), '--size', str(args.size), '--arrest-reports-url', stand_in.resource_url('amvf-fr72'), '--crime-reports-url', stand_in.resource_url('2nrs-mtv8')]
+        try:
+            run([executable, 'cli_main.py', 'build'] + arguments, stdout=DEVNULL, stderr=DEVNULL, check=True)
+        finally:
+            stand_in.stop()
+
+        trace = str(Path(directory) / 'trace.jsonl')
+        for _ in range(args.runs):
+            results['time-to-first-query'].append(time_to_first_query(arguments, trace))
+
+    for module, seconds in results['imports'].items():
+        print('%-36s %8.3f s' % ('import ' + module, median(seconds)))
+    for name in ('time-to-window', 'time-to-first-query'):
+        if results[name]:
+            print('%-36s %8.3f s  (%.3f s with interpreter start)' % (name, median(reported for reported, _ in results[name]), median(total for _, total in results[name])))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            dump(results, f, indent=2)
+        print('INFO: Wrote results to \'%s\'' % args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Benchmark the ingest pipeline, rdf export and import, and a fixed query set at several dataset sizes.
+
+Every size runs in a fresh process, so its peak memory is measured on its own. Results are written as JSON and can be compared with the results of another commit.
+
+Run from the repository root:
+    python -m benchmarks.suite --sizes 1000 5000 10000 --output bench.json
+    python -m benchmarks.suite --sizes 1000 5000 10000 --output new.json --compare bench.json
+"""
+from argparse import ArgumentParser, SUPPRESS
+from json import dump, load
+from pathlib import Path
+from platform import platform, python_version
+from subprocess import CalledProcessError, check_output, run
+from sys import executable, platform as system
+from tempfile import TemporaryDirectory
+from time import perf_counter, strftime
+from .generator import ReportGenerator
+from .queries import queries
+from .socrata import SocrataStandIn
+
+#Sizes of the reference datasets listed in the README
+SIZES = [1000, 5000, 10000, 50000, 100000]
+
+#Stages of the ingest pipeline, in order. The stages up to the publication of the version are read from the records of the manager's monitor.
+STAGES = ['download', 'normalize', 'aggregate', 'sample', 'triples', 'add', 'copy-version', 'publish', 'export', 'import']
+INGEST = STAGES[:STAGES.index('publish') + 1]
+
+def peak_rss():
+    """Get the peak resident memory of this process.
+
+    Returns:
+        float: peak memory in MB. None where it can't be measured.
+    """
+    try:
+        from resource import getrusage, RUSAGE_SELF
+    except ImportError:
+        return None
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+
+    #Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if system == 'darwin' else peak / 1024
+
+def run_size(size, data):
+    """Benchmark one dataset size. Executed in its own process.
+
+    Args:
+        size (int): number of reports per dataset.
+        data (string): directory of the generated datasets.
+
+    Returns:
+        dict: seconds of each stage and query, number of triples and peak memory.
+    """
+    from src.rdf import Manager
+
+    paths = {'amvf-fr72': Path(data) / ('arrest-reports-%s.csv' % size), '2nrs-mtv8': Path(data) / ('crime-reports-%s.csv' % size)}
+    stand_in = SocrataStandIn(paths)
+    stand_in.start()
+
+    manager = Manager()
+    stages = {stage: 0.0 for stage in STAGES}
+
+    def timed(stage, function, *args):
+        start = perf_counter()
+        result = function(*args)
+        stages[stage] += perf_counter() - start
+        return result
+
+    #Import both datasets as one version, the way the application does, and read the time of each stage from the spans the import records
+    try:
+        manager.import_reports(size, stand_in.resource_url('amvf-fr72'), stand_in.resource_url('2nrs-mtv8'))
+    finally:
+        stand_in.stop()
+    for record in manager.monitor.records:
+        if record['name'] in INGEST:
+            stages[record['name']] += record['seconds']
+
+    with TemporaryDirectory() as directory:
+        filename = str(Path(directory) / 'output.rdf')
+        timed('export', manager.export_file, filename)
+        timed('import', Manager().import_file, filename)
+
+    timings = {}
+    for name, query in queries(stand_in.url).items():
+        start = perf_counter()
+        rows = len(list(manager.execute(query)))
+        timings[name] = {'seconds': perf_counter() - start, 'rows': rows}
+
+    return {'size': size, 'triples': len(manager.c_graph), 'stages': stages, 'queries': timings, 'peak_rss_mb': peak_rss()}
+
+def commit():
+    """Get the commit of the working tree.
+
+    Returns:
+        string: the short commit hash. None outside a git repository.
+    """
+    try:
+        return check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (CalledProcessError, OSError):
+        return None
+
+def summary(results, baseline=None):
+    """Format a table of benchmark results.
+
+    Args:
+        results (dict): results written by the suite.
+        baseline (dict, optional): results of another run to compare with. Defaults to None.
+
+    Returns:
+        string: the table.
+    """
+    previous = {record['size']: record for record in baseline['sizes']} if baseline else {}
+    lines = []
+    for record in results['sizes']:
+        lines.append('size %s: %s triples, peak %s MB' % (record['size'], record['triples'], '%.0f' % record['peak_rss_mb'] if record['peak_rss_mb'] else '?'))
+        old = previous.get(record['size'])
+        rows = [(stage, seconds, old['stages'].get(stage) if old else None) for stage, seconds in record['stages'].items()]
+        rows += [('query ' + name, timing['seconds'], old['queries'].get(name, {}).get('seconds') if old else None) for name, timing in record['queries'].items()]
+        for name, seconds, old_seconds in rows:
+            line = '    %-36s %10.3f s' % (name, seconds)
+            if old_seconds:
+                line += '  %10.3f s  %+7.1f%%' % (old_seconds, (seconds - old_seconds) / old_seconds * 100)
+            lines.append(line)
+    return '\n'.join(lines)
+
+def main():
+    parser = ArgumentParser(description='Benchmark ingest, export, import and queries at several dataset sizes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='numbers of reports per dataset (default: %s)' % ' '.join(map(str, SIZES)))
+    parser.add_argument('--data', default='benchmarks/data', help='directory of the generated datasets (default: benchmarks/data)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated datasets (default: 0)')
+    parser.add_argument('--output', default='bench.json', help='file the results are written to (default: bench.json)')
+    parser.add_argument('--compare', help='results of an earlier run to compare with')
+    parser.add_argument('--record', nargs=2, help=SUPPRESS)
+    args = parser.parse_args()
+
+    #Inside the process of one size
+    if args.record:
+        size, filename = args.record
+        with open(filename, 'w') as f:
+            dump(run_size(int(size), args.data), f)
+        return
+
+    results = {'commit': commit(), 'date': strftime('%Y-%m-%dT%H:%M:%S'), 'python': python_version(), 'platform': platform(), 'seed': args.seed, 'sizes': []}
+    generator = ReportGenerator(args.seed)
+    with TemporaryDirectory() as directory:
+        for size in args.sizes:
+            if not (Path(args.data) / ('arrest-reports-%s.csv' % size)).exists() or not (Path(args.data) / ('crime-reports-%s.csv' % size)).exists():
+                print('INFO: Generating %s reports per dataset...' % size)
+                generator.write(args.data, size)
+
+            print('INFO: Benchmarking %s reports per dataset...' % size)
+            record = str(Path(directory) / ('%s.json' % size))
+            if run([executable, '-m', 'benchmarks.suite', '--data', args.data, '--record', str(size), record]).returncode != 0:
+                print('ERROR: Benchmark of %s reports failed' % size)
+                continue
+            with open(record) as f:
+                results['sizes'].append(load(f))
+
+    with open(args.output, 'w') as f:
+        dump(results, f, indent=2)
+    print('INFO: Wrote results to \'%s\'' % args.output)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = load(f)
+    print(summary(results, baseline))
+
+if __name__ == '__main__':
+    main()
@@ -1,88 +1,113 @@
+from time import perf_counter
+
+#Startup is measured from here, before the heavy modules are loaded
+started = perf_counter()
+
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from pathlib import Path
+from rdflib.util import guess_format
+from src.monitor import JSONLinesSink, PrometheusSink
+from src.pipeline import DATASETS, Pipeline
 from src.rdf import Manager
-import os
-
-#Variables
-filename = os.path.abspath("./output.rdf")
-arrest_reports_url = "https://data.lacity.org/resource/amvf-fr72"
-crime_reports_url = "https://data.lacity.org/resource/2nrs-mtv8"
-max_data_count = 999999999
-done = False
-sucess_option_1 = False
-sucess_option_2 = False
-sucess_option_3 = False
-sucess_option_4 = False
-
-manager = None
-query_result = None
-
-#CLI logic
-while (not done):
-
-    #Print instructions
-    print("Modeling RDF Data with LA Public Safety Data")
-
-    print(" This program will: \n     \u2022 Download datasets for Arrest Reports and Crime Reports \n     \u2022 Generate RDF graph from both reports \n     \u2022 Save RDF graph to a file")
-
-    print(" Parameters: \n     \u2022 Arrest Reports URL: %s \n     \u2022 Crime Reports URL: %s \n     \u2022 RDF Filename: %s \n     \u2022 Max Data Count to Download: %s" % (arrest_reports_url, crime_reports_url, filename, max_data_count))
-
-    print(" Options: \n     1. Generate RDF file \n     2. Query \n     3. Modify filename \n     4. Modify max max data count \n     5. Exit")
-
-    #User's input feedback
-    if sucess_option_1:
-        print("INFO: Successfully generate RDF file...")
-        sucess_option_1=False
-    elif sucess_option_2:
-        print("INFO: Successfully query RDF graph")
-        print(query_result)
-        sucess_option_2=False
-    elif sucess_option_3:
-        print("INFO: Successfully modify filename")
-        sucess_option_3=False
-    elif sucess_option_4:
-        print("INFO: Successfully modify max data count")
-        sucess_option_4=False
-
-    #Obtain user's input
-    user_input = input("Enter an option: ")
-
-    #Option 1: Generate RDF and save to file
-    if (user_input=="1"):
-        if not manager:
-            manager = Manager()
-            manager.import_reports(max_data_count)
-
-        manager.export_file(filename)
-        sucess_option_1=True
-        pass
-
-    #Option 2: Query graph
-    elif (user_input=="2"):
-        if not manager:
-            manager = Manager()
-            manager.import_reports(max_data_count)
-
-        q = input("Enter query: ")
-        query_result = manager.query(q)
-        sucess_option_2=True
-        pass
-
-    #Option 3: Modify filename
-    elif (user_input=="3"):
-        filename = input("Enter filename: ")
-        filename = os.path.abspath(filename)
-        sucess_option_3=True
-        pass
-
-    #Option 4: Modify max dataset size
-    elif (user_input=="4"):
-        max_data_count = int(input("Enter size: "))
-        sucess_option_4=True
-        pass
-
-    #Option 5: Exit
-    elif (user_input=="5"):
-        done = True
-        pass
-
-    #Clear terminal to prevent overcrowded 
-    os.system('cls' if os.name == 'nt' else 'clear')
\ No newline at end of file
+from src.results import FORMATS, format_from_filename, write_result
+import sys
+
+#rdflib formats the graph can be exported to
+GRAPH_FORMATS = ['pretty-xml', 'xml', 'turtle', 'n3', 'nt', 'nquads', 'trig']
+
+def fetch(pipeline, args):
+    pipeline.fetch()
+
+def build(pipeline, args):
+    pipeline.build()
+
+def export(pipeline, args):
+    pipeline.load()
+    format = args.format or guess_format(args.filename) or 'pretty-xml'
+    pipeline.manager.export_file(args.filename, args.id, format=format)
+
+def query(pipeline, args):
+    #A query is given as a statement or as a .rq file
+    statement = Path(args.query).read_text(encoding='utf-8') if args.query.endswith('.rq') else args.query
+    pipeline.load()
+    if args.output:
+        rows = pipeline.manager.export_query(statement, args.output, args.format, args.id, args.approximate)
+        print('INFO: Wrote %s rows to \'%s\'' % (rows, args.output))
+    else:
+        result = pipeline.manager.execute(statement, args.id, approximate=args.approximate)
+        write_result(result, sys.__stdout__.buffer, args.format or 'csv')
+        sys.__stdout__.flush()
+
+    seconds = perf_counter() - started
+    print('INFO: Query answered %.3f s after start' % seconds)
+    pipeline.manager.monitor.mark('time-to-first-query', seconds)
+
+def stats(pipeline, args):
+    for state in pipeline.stages():
+        line = '%-26s %-8s %-20s %12s bytes' % (state['stage'], state['status'], state['created'] or '-', state['bytes'])
+        if 'rows' in state:
+            line += '  %s rows' % state['rows']
+        if 'triples' in state:
+            line += '  ' + ', '.join('%s triples in %s' % (count, id) for id, count in state['triples'].items())
+        print(line)
+
+#Parse command line arguments
+parser = ArgumentParser(description='Build, export and query the rdf graph of LA public safety data. Every stage keeps a checkpoint that later runs reuse.')
+common = ArgumentParser(add_help=False)
+common.add_argument('-c', '--checkpoints', default='./checkpoints', help='directory of the checkpoints. Defaults to ./checkpoints')
+common.add_argument('-s', '--size', type=int, default=999999999, metavar='MAX_DATA_COUNT', help='maximum number of reports per dataset. Defaults to 999999999')
+common.add_argument('--arrest-reports-url', default=DATASETS['arrest-reports'], help='url of arrest reports, or a local CSV file, .csv.gz file or directory of them')
+common.add_argument('--crime-reports-url', default=DATASETS['crime-reports'], help='url of crime reports, or a local CSV file, .csv.gz file or directory of them')
+common.add_argument('--force', action='store_true', help='recompute every stage of the command instead of reusing checkpoints')
+common.add_argument('--memory-budget', type=float, metavar='MB', help='maximum resident memory while reports are imported')
+common.add_argument('--sample-rates', type=float, nargs='+', default=[0.01], metavar='RATE', help='rates of the stratified samples kept for approximate queries. Defaults to 0.01')
+common.add_argument('--columnar', action='store_true', help='keep the reports as columnar tables and answer queries over one dataset from them')
+common.add_argument('--trace', metavar='FILE', help='append a JSON line with the metrics of every stage to FILE')
+common.add_argument('--metrics-textfile', metavar='FILE', help='export stage metrics to FILE in the Prometheus textfile format')
+commands = parser.add_subparsers(dest='command', metavar='command')
+commands.required = True
+
+command = commands.add_parser('fetch', parents=[common], help='download the raw CSV of every dataset')
+command.set_defaults(run=fetch)
+
+command = commands.add_parser('build', parents=[common], help='build the graph and snapshot it')
+command.set_defaults(run=build)
+
+command = commands.add_parser('export', parents=[common], help='export the graph or a sub graph to an rdf file')
+command.add_argument('filename', help='rdf file to write')
+command.add_argument('-f', '--format', choices=GRAPH_FORMATS, help='rdf format. Defaults to the format of the file extension, or pretty-xml')
+command.add_argument('-i', '--id', choices=sorted(DATASETS), help='sub graph to export. Defaults to the entire graph')
+command.set_defaults(run=export)
+
+command = commands.add_parser('query', parents=[common], help='run a SPARQL query and write its result to a file or standard output')
+command.add_argument('query', help='SPARQL statement or .rq file')
+command.add_argument('-o', '--output', help='result file. Defaults to standard output')
+command.add_argument('-f', '--format', choices=sorted(FORMATS), help='result format. Defaults to the format of the output extension, or csv')
+command.add_argument('-i', '--id', choices=sorted(DATASETS), help='sub graph to query. Defaults to the entire graph')
+command.add_argument('-a', '--approximate', type=float, nargs='?', const=True, default=False, metavar='RATE', help='estimate COUNT and SUM aggregates from the stratified sample of RATE, or of the smallest rate, with confidence intervals')
+command.set_defaults(run=query)
+
+command = commands.add_parser('stats', parents=[common], help='show the state of every checkpoint')
+command.set_defaults(run=stats)
+
+args = parser.parse_args()
+if args.command == 'query' and args.output and not args.format:
+    args.format = format_from_filename(args.output)
+
+manager = Manager(memory_budget=args.memory_budget, sample_rates=args.sample_rates, columnar=args.columnar)
+if args.trace:
+    manager.monitor.add_sink(JSONLinesSink(args.trace))
+if args.metrics_textfile:
+    manager.monitor.add_sink(PrometheusSink(args.metrics_textfile))
+pipeline = Pipeline(manager, args.checkpoints, args.size, {'arrest-reports': args.arrest_reports_url, 'crime-reports': args.crime_reports_url}, args.force)
+
+#Progress of a query printed to standard output goes to standard error, so its result can be piped
+try:
+    with redirect_stdout(sys.stderr if args.command == 'query' and not args.output else sys.stdout):
+        args.run(pipeline, args)
+except Exception as e:
+    print('ERROR: %s' % e, file=sys.stderr)
+    sys.exit(1)
+finally:
+    manager.monitor.close()
@@ -1,18 +1,21 @@
-from src.ui import MainWindow, install_scheme_handler
+from time import perf_counter
+
+#Startup is measured from here, before the heavy modules are loaded
+started = perf_counter()
+
+from src.ui import MainWindow
 from src.rdf import Manager
+import PyQt5.QtCore as qtc
 from PyQt5.QtWidgets import QApplication
 
+#WebEngine is loaded when the output view is first shown. Loading it after QApplication is created needs shared OpenGL contexts.
+QApplication.setAttribute(qtc.Qt.AA_ShareOpenGLContexts)
+
 #Create QApplication
 app =QApplication([])
 
-#Register the handlers
-handler = install_scheme_handler()
-
 #Initlaize main window
-mw = MainWindow(Manager(), handler)
-
-#Provide ui reference to handler
-handler.set_ui(mw)
+mw = MainWindow(Manager(), started)
 
 #Show QApplication
 app.exec()
\ No newline at end of file
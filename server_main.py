@@ -0,0 +1,38 @@
+from argparse import ArgumentParser
+from src.monitor import JSONLinesSink, PrometheusSink
+from src.rdf import Manager
+from src.server import Server
+import sys
+
+#Parse command line arguments
+parser = ArgumentParser(description='Serve a SPARQL 1.1 Protocol endpoint over one rdf graph.')
+parser.add_argument('-g', '--graph', action='append', default=[], help='rdf file to import. Can be repeated.')
+parser.add_argument('-b', '--build', type=int, metavar='MAX_DATA_COUNT', help='build the graph from the web with at most MAX_DATA_COUNT reports per dataset')
+parser.add_argument('--host', default='127.0.0.1', help='address to listen on. Defaults to 127.0.0.1')
+parser.add_argument('-p', '--port', type=int, default=8000, help='port to listen on. Defaults to 8000')
+parser.add_argument('-w', '--workers', type=int, help='number of query workers. Defaults to the number of cores')
+parser.add_argument('-c', '--max-concurrent', type=int, help='maximum number of queries evaluated at once. Defaults to the number of workers')
+parser.add_argument('-t', '--timeout', type=float, default=60, help='per-request timeout in seconds. Defaults to 60')
+parser.add_argument('--trace', metavar='FILE', help='append a JSON line with the metrics of every stage to FILE')
+parser.add_argument('--metrics-textfile', metavar='FILE', help='export stage metrics to FILE in the Prometheus textfile format')
+args = parser.parse_args()
+
+if not args.graph and args.build is None:
+    parser.error('either --graph or --build is required')
+
+#Load or build the graph once
+manager = Manager()
+if args.trace:
+    manager.monitor.add_sink(JSONLinesSink(args.trace))
+if args.metrics_textfile:
+    manager.monitor.add_sink(PrometheusSink(args.metrics_textfile))
+for filename in args.graph:
+    successfully_imported, path = manager.import_file(filename)
+    if not successfully_imported:
+        print('ERROR: Unable to import \'%s\'' % path)
+        sys.exit(2)
+if args.build is not None:
+    manager.import_reports(args.build)
+
+#Serve queries until interrupted
+Server(manager, args.host, args.port, args.workers, args.max_concurrent, args.timeout).serve_forever()
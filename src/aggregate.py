@@ -0,0 +1,349 @@
+from .algebra import term_sort_key
+from collections import Counter, namedtuple
+from hashlib import md5
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import RDF, XSD
+from rdflib.query import Result
+from rdflib.term import Variable
+from .versions import unchanged
+
+#Name of the virtual named graph exposing all aggregate views
+AGGREGATE_CONTEXT = 'aggregate-views'
+
+#A view counts reports grouped by one column. Reports reach the grouped attribute through the link predicate and the entity built from entity_columns.
+View = namedtuple('View', ['link', 'attribute', 'entity_columns', 'column', 'datatype'])
+
+#Aggregate views of each context: (report type, report id column, {view name: View})
+VIEWS = {
+    'arrest-reports': ('ArrestReport', 'rpt_id', {
+        'area-name': View('hasLocation', 'hasAreaName', ['rd', 'area', 'area_desc', 'location', 'crsst', 'lat', 'lon'], 'area_desc', XSD.string),
+        'charge-group': View('hasCharge', 'hasChargeGroupDescription', ['chrg_grp_cd', 'grp_description', 'charge', 'chrg_desc'], 'grp_description', XSD.string),
+        'descent': View('hasPerson', 'hasDescendent', ['age', 'sex_cd', 'descent_cd'], 'descent_cd', XSD.string),
+        'month': View(None, None, ['arst_date'], 'arst_date', XSD.gYearMonth),
+    }),
+    'crime-reports': ('CrimeReport', 'dr_no', {
+        'area-name': View('hasLocation', 'hasAreaName', ['rpt_dist_no', 'area', 'area_name', 'location', 'cross_street', 'lat', 'lon'], 'area_name', XSD.string),
+        'crime-code': View('hasCrime', 'hasCrimeCommitted', ['crm_cd', 'crm_cd_desc', 'crm_cd_1', 'crm_cd_2', 'crm_cd_3', 'crm_cd_4'], 'crm_cd', XSD.integer),
+        'weapon': View('hasWeapon', 'hasWeaponDescription', ['weapon_used_cd', 'weapon_desc'], 'weapon_desc', XSD.string),
+        'premise': View('hasPremise', 'hasPremiseDescription', ['premis_cd', 'premis_desc'], 'premis_desc', XSD.string),
+        'victim-descent': View('hasPerson', 'hasDescendent', ['vict_age', 'vict_sex', 'vict_descent'], 'vict_descent', XSD.string),
+        'month': View(None, None, ['date_occ'], 'date_occ', XSD.gYearMonth),
+    }),
+}
+
+class AggregateViews:
+    """An AggregateViews class used to maintain materialized GROUP BY counts over the imported reports.
+    """
+    def __init__(self):
+        """Initialize AggregateViews class.
+        """
+        #Counts of each (context, view) pair
+        self._counts = {}
+
+        #Report ids already counted per context
+        self._seen = {}
+
+        #Hashes of the (report, entity) pairs already counted by each (context, view) pair. The rows of a report can come in several chunks or delta loads, and a pair is only counted once across them.
+        self._pairs = {}
+
+        #Namespace used by each context
+        self._namespaces = {}
+
+        #Revision of each sub graph once its reports were counted
+        self._revisions = {}
+
+        #Whether arrest and crime report ids collide, which merges their report nodes in the union graph
+        self._overlap = False
+
+        #Cached virtual graph
+        self._graph = None
+
+        #Contexts whose state isn't shared with a copy of the views
+        self._owned = set()
+
+    def copy(self):
+        """Copy the views. The copy shares the state of every context with the views, until it changes it.
+
+        Returns:
+            AggregateViews: the copy.
+        """
+        views = AggregateViews.__new__(AggregateViews)
+        views.__dict__.update({name: dict(value) if isinstance(value, dict) else value for name, value in self.__dict__.items()})
+        self._owned, views._owned = set(), set()
+        return views
+
+    def update(self, context, namespace, reports):
+        """Incrementally update the views of a context with newly imported reports.
+
+        Args:
+            context (string): id of the sub-graph the reports were added to.
+            namespace (rdflib.Namespace): namespace of the reports.
+            reports (DataFrame): normalized reports.
+        """
+        if context not in VIEWS:
+            return
+        #pandas is only needed for report ingest, so it is imported on first use
+        from pandas.util import hash_pandas_object
+
+        _, id_column, views = VIEWS[context]
+        self._own(context)
+        seen = self._seen.setdefault(context, set())
+        self._namespaces[context] = Namespace(str(namespace))
+
+        #Pairs of reports counted before, such as the rest of a report split between two chunks, are looked up. Pairs of new reports can't have been counted.
+        known = reports[id_column].isin(seen).to_numpy()
+        for name, view in views.items():
+            #One solution exists per distinct (report, entity) pair
+            columns = [id_column] + view.entity_columns
+            unique = ~reports.duplicated(subset=columns).to_numpy()
+            rows = reports[unique]
+            hashes = hash_pandas_object(rows[columns], index=False).to_numpy()
+            pairs = self._pairs.setdefault((context, name), _Hashes())
+            new = ~known[unique]
+            new[~new] = ~pairs.contains(hashes[~new])
+            pairs.add(hashes[new])
+
+            rows = rows[new]
+            keys = rows[view.column].str[:7] if view.datatype == XSD.gYearMonth else rows[view.column]
+            self._counts.setdefault((context, name), Counter()).update(keys.value_counts().to_dict())
+        seen.update(reports[id_column][~known])
+
+        seens = list(self._seen.values())
+        self._overlap = len(seens) > 1 and bool(set.intersection(*seens))
+        self._graph = None
+
+    def record(self, context, revision):
+        """Record the revision of a sub graph once its reports are counted. Its views only answer queries while it is unchanged.
+
+        Args:
+            context (string): id of the sub-graph.
+            revision (tuple): revision of the sub-graph, see versions.ContextStore.revision.
+        """
+        if context in self._seen:
+            self._revisions[context] = revision
+
+    def remove(self, context):
+        """Remove the views of a context.
+
+        Args:
+            context (string): id of the removed sub-graph.
+        """
+        for key in [key for key in self._counts if key[0] == context]:
+            del self._counts[key]
+            self._pairs.pop(key, None)
+        self._seen.pop(context, None)
+        self._namespaces.pop(context, None)
+        self._revisions.pop(context, None)
+
+        seens = list(self._seen.values())
+        self._overlap = len(seens) > 1 and bool(set.intersection(*seens))
+        self._graph = None
+
+    def _own(self, context):
+        """Copy the state of a context shared with a copy of the views, before it is changed.
+
+        Args:
+            context (string): id of the sub-graph.
+        """
+        if context in self._owned:
+            return
+        for state in (self._counts, self._pairs):
+            for key in [key for key in state if key[0] == context]:
+                state[key] = state[key].copy()
+        if context in self._seen:
+            self._seen[context] = set(self._seen[context])
+        self._owned.add(context)
+
+    def names(self):
+        """Get names of all available views.
+
+        Returns:
+            [(string, string)]: a list of (context, view) tuples.
+        """
+        return sorted(self._counts.keys())
+
+    def get(self, view, context):
+        """Get the counts of a view.
+
+        Args:
+            view (string): name of the view.
+            context (string): id of the sub-graph the view belongs to.
+
+        Returns:
+            [(string, int)]: a list of (key, count) tuples sorted by count.
+        """
+        return self._counts.get((context, view), Counter()).most_common()
+
+    def to_graph(self):
+        """Expose all views as a virtual rdf graph. Each view entry is an AggregateView resource.
+
+        Returns:
+            rdflib.Graph: graph containing all views.
+        """
+        if self._graph is None:
+            graph = Graph(identifier=AGGREGATE_CONTEXT)
+            for (context, name), counts in self._counts.items():
+                namespace = self._namespaces[context]
+                graph.bind('ns1', namespace)
+                datatype = VIEWS[context][2][name].datatype
+                for key, count in counts.items():
+                    node = namespace['View-' + md5((context + name + key).encode('utf-8')).hexdigest()]
+                    graph.add((node, RDF.type, namespace['AggregateView']))
+                    graph.add((node, namespace['hasContext'], Literal(context, datatype=XSD.string)))
+                    graph.add((node, namespace['hasView'], Literal(name, datatype=XSD.string)))
+                    graph.add((node, namespace['hasKey'], Literal(key, datatype=datatype)))
+                    graph.add((node, namespace['hasCount'], Literal(count)))
+            self._graph = graph
+        return self._graph
+
+    def answer(self, shape, graph, id=None):
+        """Answer a GROUP BY count query from the views if it matches one of them.
+
+        Matching queries have the shape
+        SELECT ?key (COUNT(?r) AS ?n) WHERE { ?r a ns1:<Report> ; ns1:<link> ?x . ?x ns1:<attribute> ?key } GROUP BY ?key
+        with optional ORDER BY over the projected variables and LIMIT/OFFSET. The views are only used while every queried sub graph holding triples is one they were counted from, unchanged since.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            graph (rdflib.ConjunctiveGraph): the graph the views were counted alongside.
+            id (string, optional): name of the sub-graph being queried. Defaults to None.
+
+        Returns:
+            rdflib.query.Result: result of the query. None if the query doesn't match a view.
+        """
+        if shape is None or shape.type != 'SelectQuery' or not shape.is_aggregate or shape.having is not None:
+            return None
+        if not shape.group or len(shape.group) != 1 or not isinstance(shape.group[0], Variable):
+            return None
+
+        match = self._match(shape.triples(), shape.group[0], id)
+        if not match or not unchanged(graph, self._revisions, id):
+            return None
+        context, name, variables = match
+
+        #Every projected variable must either be the group key or a plain count of solutions
+        columns = {}
+        for var in shape.projection:
+            source = shape.resolve(var)
+            if source is None:
+                return None
+            if isinstance(source, Variable):
+                if source != shape.group[0]:
+                    return None
+                columns[var] = 'key'
+            elif source.name == 'Aggregate_Sample' and source.vars == shape.group[0]:
+                columns[var] = 'key'
+            elif source.name == 'Aggregate_Count' and not source.distinct and (source.vars == '*' or source.vars in variables):
+                columns[var] = 'count'
+            else:
+                return None
+
+        datatype = VIEWS[context][2][name].datatype
+        rows = [(Literal(key, datatype=datatype), Literal(count)) for key, count in self._counts[(context, name)].items()]
+
+        #Apply ORDER BY and LIMIT/OFFSET
+        if shape.order:
+            for var, descending in reversed(shape.order):
+                if var not in columns:
+                    return None
+                index = 0 if columns[var] == 'key' else 1
+                rows.sort(key=lambda row: term_sort_key(row[index]), reverse=descending)
+        end = None if shape.length is None else shape.start + shape.length
+        rows = rows[shape.start:end]
+
+        result = Result('SELECT')
+        result.vars = shape.projection
+        result.bindings = [{var: row[0 if columns[var] == 'key' else 1] for var in shape.projection} for row in rows]
+        return result
+
+    def _match(self, triples, key, id):
+        """Find the view matching the triple patterns of a query.
+
+        Args:
+            triples ([(Node, Node, Node)]): triple patterns of the query.
+            key (rdflib.term.Variable): the group variable.
+            id (string): name of the sub-graph being queried.
+
+        Returns:
+            (string, string, set): context, view name and variables of the matched pattern. None if no view matches.
+        """
+        if not triples or len(triples) != 3:
+            return None
+
+        for context, (report_type, _, views) in VIEWS.items():
+            if (context, next(iter(views))) not in self._counts or id not in (None, context):
+                continue
+            if id is None and self._overlap:
+                return None
+            namespace = self._namespaces[context]
+            for name, view in views.items():
+                if not view.link:
+                    continue
+                report, entity = Variable('__report__'), Variable('__entity__')
+                for s, p, o in triples:
+                    if p == RDF.type and o == namespace[report_type] and isinstance(s, Variable):
+                        report = s
+                    elif p == namespace[view.link] and isinstance(o, Variable):
+                        entity = o
+                expected = {(report, RDF.type, namespace[report_type]), (report, namespace[view.link], entity), (entity, namespace[view.attribute], key)}
+                if set(triples) == expected and len({report, entity, key}) == 3:
+                    return context, name, {report, entity, key}
+        return None
+
+class _Hashes:
+    """A _Hashes class used to keep a set of 64-bit hashes in sorted numpy arrays, 8 bytes per hash. New hashes are added as an array of their own, and arrays of similar sizes are merged, so each hash is only merged a logarithmic number of times.
+    """
+    def __init__(self):
+        """Initialize _Hashes class.
+        """
+        self._runs = []
+
+    def __len__(self):
+        """Get the number of hashes.
+
+        Returns:
+            int: number of hashes.
+        """
+        return sum(len(run) for run in self._runs)
+
+    def copy(self):
+        """Copy the set. Arrays are never changed once added, so they are shared with the copy.
+
+        Returns:
+            _Hashes: the copy.
+        """
+        hashes = _Hashes()
+        hashes._runs = list(self._runs)
+        return hashes
+
+    def contains(self, hashes):
+        """Check which hashes are in the set.
+
+        Args:
+            hashes (numpy.ndarray): hashes to be looked up.
+
+        Returns:
+            numpy.ndarray: True for each hash in the set.
+        """
+        from numpy import minimum, zeros
+
+        found = zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            positions = minimum(run.searchsorted(hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes):
+        """Add hashes to the set.
+
+        Args:
+            hashes (numpy.ndarray): hashes not in the set yet.
+        """
+        from numpy import union1d, unique
+
+        if not len(hashes):
+            return
+        self._runs.append(unique(hashes))
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            last = self._runs.pop()
+            self._runs[-1] = union1d(self._runs[-1], last)
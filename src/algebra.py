@@ -0,0 +1,142 @@
+from rdflib.term import Variable
+
+class QueryShape:
+    """A QueryShape class used to flatten the algebra of a prepared SPARQL query into its solution modifiers, aggregates and pattern.
+    """
+    def __init__(self, prepared):
+        """Initialize QueryShape class.
+
+        Args:
+            prepared (rdflib.plugins.sparql.sparql.Query): a prepared SPARQL query.
+        """
+        self.prepared = prepared
+        self.type = prepared.algebra.name
+        self.projection = list(prepared.algebra.get('PV') or [])
+        self.start = 0
+        self.length = None
+        self.distinct = False
+        self.order = None
+        self.having = None
+        self.extends = {}
+        self.aggregates = {}
+        self.group = None
+        self.is_aggregate = False
+        self.pattern = None
+
+        #Walk down the solution modifiers until the graph pattern is reached
+        node = prepared.algebra.p
+        while node is not None:
+            name = node.name
+            if name == 'Slice':
+                self.start = node.start or 0
+                self.length = node.length
+            elif name in ('Distinct', 'Reduced'):
+                self.distinct = True
+            elif name == 'Project':
+                self.projection = list(node.PV)
+            elif name == 'OrderBy':
+                self.order = [_order_condition(x) for x in node.expr]
+            elif name == 'Extend':
+                self.extends[node.var] = node.expr
+            elif name == 'Filter' and _above_aggregate(node.p):
+                self.having = node.expr
+            elif name == 'AggregateJoin':
+                self.is_aggregate = True
+                for aggregate in node.A:
+                    self.aggregates[aggregate.res] = aggregate
+                self.group = node.p.expr
+                self.pattern = node.p.p
+                break
+            else:
+                self.pattern = node
+                break
+            node = node.p
+
+    def resolve(self, var):
+        """Follow the projection extends of a variable until an aggregate or a group variable is reached.
+
+        Args:
+            var (rdflib.term.Variable): a projected variable.
+
+        Returns:
+            rdflib.term.Variable|CompValue: the aggregate or variable backing the projected variable. None if it is an expression.
+        """
+        expr = self.extends.get(var, var)
+        if isinstance(expr, Variable):
+            return self.aggregates.get(expr, expr)
+        return None
+
+    def triples(self):
+        """Get the triple patterns of the query if its pattern is a single basic graph pattern.
+
+        Returns:
+            [(Node, Node, Node)]: triple patterns of the query. None if the pattern is not a single BGP.
+        """
+        if self.pattern is not None and self.pattern.name == 'BGP':
+            return list(self.pattern.triples)
+        return None
+
+def describe_query(query, namespaces=None):
+    """Prepare a SPARQL query and describe its shape.
+
+    Args:
+        query (SPARQL string|rdflib.plugins.sparql.sparql.Query): SPARQL statments or an already prepared query.
+        namespaces (dict, optional): prefixes available to the query. Defaults to None.
+
+    Returns:
+        QueryShape: shape of the query. None if the query can't be parsed.
+    """
+    try:
+        #The SPARQL parser takes a while to build its grammar, so it is imported by the first query
+        from rdflib.plugins.sparql import prepareQuery
+
+        prepared = query if hasattr(query, 'algebra') else prepareQuery(query, initNs=namespaces or {})
+        return QueryShape(prepared)
+    except Exception:
+        return None
+
+def term_sort_key(term):
+    """Get a key used to sort rdf terms of a result column.
+
+    Args:
+        term (rdflib.term.Node): term to be sorted. None for unbound values.
+
+    Returns:
+        tuple: unbound values first, then numeric literals, then everything else in lexical order.
+    """
+    if term is None:
+        return (0, 0, '')
+    value = term.toPython() if hasattr(term, 'toPython') else term
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value, '')
+    return (2, 0, str(term))
+
+def _above_aggregate(node):
+    """Check whether an AggregateJoin is reachable through solution modifiers only.
+
+    Args:
+        node (CompValue): algebra node to start from.
+
+    Returns:
+        bool: True if the node sits on top of an AggregateJoin.
+    """
+    while node is not None and getattr(node, 'name', None) in ('Extend', 'Filter', 'AggregateJoin'):
+        if node.name == 'AggregateJoin':
+            return True
+        node = node.p
+    return False
+
+def _order_condition(condition):
+    """Convert an ORDER BY condition to a (variable, descending) tuple.
+
+    Args:
+        condition (Variable|CompValue): ORDER BY condition.
+
+    Returns:
+        (Variable, bool): variable and order of the condition. Variable is None if the condition is an expression.
+    """
+    if isinstance(condition, Variable):
+        return condition, False
+    if getattr(condition, 'name', None) == 'OrderCondition' and isinstance(condition.expr, Variable):
+        return condition.expr, condition.order == 'DESC'
+    return None, False
@@ -0,0 +1,189 @@
+from .monitor import Span
+from .replica import ReplicaPool
+from .results import FORMATS, write_result
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from csv import DictWriter
+from multiprocessing import get_all_start_methods
+from os import cpu_count
+from os.path import commonpath
+from pathlib import Path
+from time import perf_counter
+
+#Manager shared by all batch workers. Replicas inherit it copy-on-write.
+_manager = None
+
+class BatchRunner:
+    """A BatchRunner class used to run many SPARQL queries against one loaded graph.
+    """
+    def __init__(self, manager, output, format='csv', workers=None):
+        """Initialize BatchRunner class.
+
+        Args:
+            manager (rdf.Manager): the rdf manager holding the graph to be queried.
+            output (string): directory where each query result is written.
+            format (string, optional): result format, one of 'csv', 'tsv', 'json' or 'xml'. Defaults to 'csv'.
+            workers (int, optional): maximum number of queries running at once. Defaults to the number of cores.
+        """
+        if format not in FORMATS:
+            raise ValueError('Unsupported result format \'%s\'' % format)
+        self.manager = manager
+        self.output = Path(output)
+        self.format = format
+        self.workers = workers or cpu_count() or 1
+
+    def collect(self, paths):
+        """Collect query files from files and directories.
+
+        Args:
+            paths ([string]): paths of .rq files or directories containing .rq files.
+
+        Returns:
+            [Path]: query files sorted by name. A file given twice is only collected once.
+        """
+        files = []
+        for path in paths:
+            path = Path(path)
+            if path.is_dir():
+                files.extend(sorted(path.glob('*.rq')))
+            elif path.exists():
+                files.append(path)
+            else:
+                print('ERROR: Query file \'%s\' does not exist' % path)
+        return list({f.resolve(): f for f in files}.values())
+
+    def outputs(self, files):
+        """Name the queries and their result files. A query is named by its path relative to the directory holding all queries, so queries of the same file name in different directories get different names and results.
+
+        Args:
+            files ([Path]): query files returned by collect.
+
+        Returns:
+            [(string, Path)]: the name and the result file of each query.
+        """
+        try:
+            root = Path(commonpath([str(f.resolve().parent) for f in files])) if files else None
+        except ValueError:
+            #Files on different drives have no common directory
+            root = None
+
+        outputs = []
+
+        #The summary of the batch is written next to the results
+        taken = {'summary'} if self.format == 'csv' else set()
+        for f in files:
+            name = f.resolve().relative_to(root).as_posix() if root else f.name
+            stem = name[:-len(f.suffix)] if f.suffix else name
+
+            #Files of the same name and another extension, or on another drive, are told apart by an index
+            output, index = stem, 1
+            while output.lower() in taken:
+                index += 1
+                output = '%s-%s' % (stem, index)
+            taken.add(output.lower())
+            outputs.append((name, self.output / (output + FORMATS[self.format])))
+        return outputs
+
+    def run(self, paths):
+        """Run all queries concurrently and write each result to the output directory. A failed query doesn't abort the batch.
+
+        Args:
+            paths ([string]): paths of .rq files or directories containing .rq files.
+
+        Returns:
+            [dict]: a record for each query containing its name, status, rows, seconds, output and error.
+        """
+        global _manager
+
+        files = self.collect(paths)
+        outputs = self.outputs(files)
+        self.output.mkdir(parents=True, exist_ok=True)
+        for _, output in outputs:
+            output.parent.mkdir(parents=True, exist_ok=True)
+        print('INFO: Running %s queries with %s workers...' % (len(files), self.workers))
+
+        #Forked replicas share the loaded graph. Fall back to threads where fork isn't available.
+        _manager = self.manager
+        if 'fork' in get_all_start_methods():
+            executor = ReplicaPool(self.workers)
+        else:
+            executor = ThreadPoolExecutor(self.workers)
+
+        records = []
+        try:
+            with executor:
+                futures = {executor.submit(_run_query, str(f), name, str(output), self.format): name for f, (name, output) in zip(files, outputs)}
+                for future in as_completed(futures):
+                    try:
+                        record, trace = future.result()
+
+                        #Replicas don't write to the sinks of the batch, so the span they measured is recorded here
+                        self.manager.monitor.add_record(trace)
+                    except Exception as e:
+                        record = {'name': futures[future], 'status': 'FAILED', 'rows': 0, 'seconds': 0.0, 'output': '', 'error': str(e)}
+                        self.manager.monitor.mark('query', 0.0, query=futures[future], format=self.format, error=type(e).__name__)
+                    if record['status'] == 'FAILED':
+                        print('ERROR: Query \'%s\' failed: %s' % (record['name'], record['error']))
+                    records.append(record)
+        finally:
+            _manager = None
+
+        records.sort(key=lambda record: record['name'])
+        self._write_summary(records)
+        return records
+
+    def summary(self, records):
+        """Format a timing summary table of a batch.
+
+        Args:
+            records ([dict]): records returned by run.
+
+        Returns:
+            string: the summary table.
+        """
+        width = max([len('query')] + [len(r['name']) for r in records])
+        lines = ['%-*s  %-6s  %10s  %10s' % (width, 'query', 'status', 'rows', 'seconds')]
+        lines.append('-' * len(lines[0]))
+        for r in records:
+            lines.append('%-*s  %-6s  %10s  %10.3f' % (width, r['name'], r['status'], r['rows'], r['seconds']))
+        failed = sum(1 for r in records if r['status'] == 'FAILED')
+        lines.append('-' * len(lines[0]))
+        lines.append('%s queries, %s failed, %.3f seconds in total' % (len(records), failed, sum(r['seconds'] for r in records)))
+        return '\n'.join(lines)
+
+    def _write_summary(self, records):
+        """Write the timing summary of a batch to summary.csv in the output directory.
+
+        Args:
+            records ([dict]): records returned by run.
+        """
+        with open(self.output / 'summary.csv', 'w', newline='', encoding='utf-8') as f:
+            out = DictWriter(f, fieldnames=['name', 'status', 'rows', 'seconds', 'output', 'error'])
+            out.writeheader()
+            out.writerows(records)
+
+def _run_query(path, name, output, format):
+    """Run one query and write its result. Executed inside a batch worker.
+
+    Args:
+        path (string): path of the .rq file.
+        name (string): name of the query in its record.
+        output (string): path of the result file.
+        format (string): result format.
+
+    Returns:
+        (dict, dict): record of the query, and the record of the 'query' span of its evaluation.
+    """
+    start = perf_counter()
+    span = Span('query', attributes={'query': name, 'format': format})
+    with span.running():
+        try:
+            query = Path(path).read_text(encoding='utf-8')
+            result = _manager.execute(query)
+            with open(output, 'wb') as f:
+                rows = write_result(result, f, format)
+                span.add(rows=rows, bytes=f.tell())
+            record = {'name': name, 'status': 'OK', 'rows': rows, 'seconds': perf_counter() - start, 'output': output, 'error': ''}
+        except Exception as e:
+            span.error = type(e).__name__
+            record = {'name': name, 'status': 'FAILED', 'rows': 0, 'seconds': perf_counter() - start, 'output': '', 'error': str(e)}
+    return record, span.finish()
@@ -0,0 +1,146 @@
+from .monitor import memory
+from gc import collect
+from rdflib.plugins.parsers.ntriples import NTriplesParser
+from rdflib.plugins.serializers.nt import _nt_row
+from tempfile import TemporaryFile
+
+class MemoryBudgetExceeded(MemoryError):
+    """Raised when an import can't stay within the memory budget of a Manager.
+    """
+
+class MemoryBudget:
+    """A MemoryBudget class used to keep the resident memory of an import below a limit.
+
+    Below the spill threshold an import runs as usual. Above it, triples are spilled to a staging file and loaded once the intermediate data is freed. Above the limit the import fails.
+    """
+    def __init__(self, limit, spill_ratio=0.75, chunk_size=20000):
+        """Initialize MemoryBudget class.
+
+        Args:
+            limit (float): the maximum resident memory in MB.
+            spill_ratio (float, optional): share of the limit from which triples are spilled to disk. Defaults to 0.75.
+            chunk_size (int, optional): number of reports turned into triples at once. Defaults to 20000.
+        """
+        self.limit = limit
+        self.spill_ratio = spill_ratio
+        self.chunk_size = chunk_size
+
+    def resident(self):
+        """Get the resident memory of this process.
+
+        Returns:
+            float: resident memory in MB. None where it can't be measured.
+        """
+        return memory()[0]
+
+    def measurable(self):
+        """Check whether the resident memory can be measured on this platform.
+
+        Returns:
+            bool: True if the budget can be enforced.
+        """
+        return self.resident() is not None
+
+    def near(self):
+        """Check whether the resident memory reached the spill threshold.
+
+        Returns:
+            bool: True if pending triples should be spilled to disk.
+        """
+        rss = self.resident()
+        return rss is not None and rss >= self.limit * self.spill_ratio
+
+    def check(self, stage):
+        """Fail if the resident memory is above the limit, even after freeing unreachable objects.
+
+        Args:
+            stage (string): description of the running stage, used in the error message.
+
+        Raises:
+            MemoryBudgetExceeded: the resident memory is above the limit.
+        """
+        rss = self.resident()
+        if rss is None or rss <= self.limit:
+            return
+        collect()
+        rss = self.resident()
+        if rss > self.limit:
+            raise MemoryBudgetExceeded('Memory budget of %.0f MB exceeded while %s (%.0f MB resident). Import fewer reports or raise the budget.' % (self.limit, stage, rss))
+
+    def chunks(self, reports):
+        """Split reports into chunks of chunk_size rows.
+
+        Args:
+            reports (DataFrame): normalized reports.
+
+        Returns:
+            generator: DataFrame slices of at most chunk_size rows.
+        """
+        for start in range(0, len(reports), self.chunk_size):
+            yield reports.iloc[start:start + self.chunk_size]
+
+class StagingFile:
+    """A StagingFile class used to spill triples to a temporary N-Triples file, and to bulk-load them into a graph afterwards.
+    """
+    def __init__(self, directory=None):
+        """Initialize StagingFile class.
+
+        Args:
+            directory (string, optional): directory of the temporary file. Defaults to the system temporary directory.
+        """
+        self.file = TemporaryFile(dir=directory)
+        self.triples = 0
+
+    def write(self, quads):
+        """Append quads to the file. The graph of each quad is dropped, a staging file belongs to one graph.
+
+        Args:
+            quads (list): (subject, predicate, object, graph) quads.
+        """
+        self.file.write(''.join(_nt_row(quad) for quad in quads).encode('utf-8'))
+        self.triples += len(quads)
+
+    @property
+    def size(self):
+        """Get the size of the file.
+
+        Returns:
+            int: size in bytes.
+        """
+        return self.file.tell()
+
+    def load(self, graph, budget, batch_size=10000):
+        """Add the spilled triples to a graph, in batches, checking the memory budget after each batch.
+
+        Args:
+            graph (rdflib.Graph): the graph the triples are added to.
+            budget (MemoryBudget): the budget of the running import.
+            batch_size (int, optional): number of triples added at once. Defaults to 10000.
+
+        Raises:
+            MemoryBudgetExceeded: the graph doesn't fit in the budget.
+        """
+        class Sink:
+            def __init__(self):
+                self.batch = []
+
+            def triple(self, s, p, o):
+                self.batch.append((s, p, o, graph))
+                if len(self.batch) >= batch_size:
+                    self.flush()
+
+            def flush(self):
+                if self.batch:
+                    graph.addN(self.batch)
+                    self.batch = []
+                    budget.check('loading spilled triples into the graph')
+
+        self.file.seek(0)
+        sink = Sink()
+        NTriplesParser(sink).parse(self.file)
+        sink.flush()
+
+    def close(self):
+        """Delete the file.
+        """
+        self.file.close()
@@ -0,0 +1,729 @@
+from collections import namedtuple
+from decimal import Decimal
+from hashlib import md5
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDF, XSD
+from rdflib.query import Result
+from rdflib.term import URIRef, Variable
+from .versions import unchanged
+
+#An attribute is a literal built from one column, or a dateTime joined from a date and a time column
+Attribute = namedtuple('Attribute', ['columns', 'datatype'])
+
+#An entity is a node a report links to, hashed from its columns, with its attributes by predicate
+Entity = namedtuple('Entity', ['type', 'columns', 'attributes'])
+
+#A table maps the reports of a context onto the triples built from them by Manager._arrest_report_quads and Manager._crime_report_quads
+Table = namedtuple('Table', ['type', 'id_column', 'attributes', 'entities'])
+
+TABLES = {
+    'arrest-reports': Table('ArrestReport', 'rpt_id', {
+        'hasID': Attribute(('rpt_id',), XSD.integer),
+        'hasDateTime': Attribute(('arst_date', 'time'), XSD.dateTime),
+        'hasReporType': Attribute(('report_type',), XSD.string),
+        'hasArrestType': Attribute(('arst_typ_cd',), XSD.string),
+        'hasDispositionDescription': Attribute(('dispo_desc',), XSD.string),
+    }, {
+        'hasPerson': Entity('Person', ('age', 'sex_cd', 'descent_cd'), {
+            'hasAge': Attribute(('age',), XSD.integer),
+            'hasSex': Attribute(('sex_cd',), XSD.string),
+            'hasDescendent': Attribute(('descent_cd',), XSD.string),
+        }),
+        'hasLocation': Entity('Location', ('rd', 'area', 'area_desc', 'location', 'crsst', 'lat', 'lon'), {
+            'hasReportingDistrictNumber': Attribute(('rd',), XSD.integer),
+            'hasAreaID': Attribute(('area',), XSD.integer),
+            'hasAreaName': Attribute(('area_desc',), XSD.string),
+            'hasAddress': Attribute(('location',), XSD.string),
+            'hasCrossStreet': Attribute(('crsst',), XSD.string),
+            'hasLatitude': Attribute(('lat',), XSD.double),
+            'hasLongtitude': Attribute(('lon',), XSD.double),
+        }),
+        'hasCharge': Entity('Charge', ('chrg_grp_cd', 'grp_description', 'charge', 'chrg_desc'), {
+            'hasChargeGroupCode': Attribute(('chrg_grp_cd',), XSD.integer),
+            'hasChargeGroupDescription': Attribute(('grp_description',), XSD.string),
+            'hasChargeCode': Attribute(('charge',), XSD.integer),
+            'hasChargeDescription': Attribute(('chrg_desc',), XSD.string),
+        }),
+        'hasBooking': Entity('Booking', ('bkg_date', 'bkg_time', 'bgk_location', 'bkg_loc_cd'), {
+            'hasBookingDateTime': Attribute(('bkg_date', 'bkg_time'), XSD.dateTime),
+            'hasBookingLocation': Attribute(('bgk_location',), XSD.string),
+            'hasBookingCode': Attribute(('bkg_loc_cd',), XSD.integer),
+        }),
+    }),
+    'crime-reports': Table('CrimeReport', 'dr_no', {
+        'hasID': Attribute(('dr_no',), XSD.integer),
+        'hasDateTime': Attribute(('date_occ', 'time_occ'), XSD.dateTime),
+        'hasDateReported': Attribute(('date_rptd',), XSD.dateTime),
+        'hasMocodes': Attribute(('mocodes',), XSD.string),
+        'hasPart1-2': Attribute(('part_1_2',), XSD.integer),
+    }, {
+        'hasPerson': Entity('Person', ('vict_age', 'vict_sex', 'vict_descent'), {
+            'hasAge': Attribute(('vict_age',), XSD.integer),
+            'hasSex': Attribute(('vict_sex',), XSD.string),
+            'hasDescendent': Attribute(('vict_descent',), XSD.string),
+        }),
+        'hasLocation': Entity('Location', ('rpt_dist_no', 'area', 'area_name', 'location', 'cross_street', 'lat', 'lon'), {
+            'hasReportingDisctrictNumber': Attribute(('rpt_dist_no',), XSD.integer),
+            'hasAreaID': Attribute(('area',), XSD.integer),
+            'hasAreaName': Attribute(('area_name',), XSD.string),
+            'hasAddress': Attribute(('location',), XSD.string),
+            'hasCrossStreet': Attribute(('cross_street',), XSD.string),
+            'hasLatitude': Attribute(('lat',), XSD.double),
+            'hasLongitude': Attribute(('lon',), XSD.double),
+        }),
+        'hasCrime': Entity('Crime', ('crm_cd', 'crm_cd_desc', 'crm_cd_1', 'crm_cd_2', 'crm_cd_3', 'crm_cd_4'), {
+            'hasCrimeCommitted': Attribute(('crm_cd',), XSD.integer),
+            'hasCrimeCrimmitedDescription': Attribute(('crm_cd_desc',), XSD.string),
+            'hasCrimeCommited1': Attribute(('crm_cd_1',), XSD.integer),
+            'hasCrimeCommited2': Attribute(('crm_cd_2',), XSD.integer),
+            'hasCrimeCommited3': Attribute(('crm_cd_3',), XSD.integer),
+            'hasCrimeCommited4': Attribute(('crm_cd_4',), XSD.integer),
+        }),
+        'hasPremise': Entity('Premise', ('premis_cd', 'premis_desc'), {
+            'hasPremiseCode': Attribute(('premis_cd',), XSD.integer),
+            'hasPremiseDescription': Attribute(('premis_desc',), XSD.string),
+        }),
+        'hasWeapon': Entity('Weapon', ('weapon_used_cd', 'weapon_desc'), {
+            'hasWeaponCode': Attribute(('weapon_used_cd',), XSD.integer),
+            'hasWeaponDescription': Attribute(('weapon_desc',), XSD.string),
+        }),
+        'hasStatus': Entity('Status', ('status', 'status_desc'), {
+            'hasStatusCode': Attribute(('status',), XSD.integer),
+            'hasStatusDescription': Attribute(('status_desc',), XSD.string),
+        }),
+    }),
+}
+
+#Aggregates computed from the columns. GROUP_CONCAT and SAMPLE of other variables depend on the order rdflib finds solutions in, so they are left to rdflib.
+_AGGREGATES = ('Aggregate_Count', 'Aggregate_Sum', 'Aggregate_Avg', 'Aggregate_Min', 'Aggregate_Max', 'Aggregate_Sample')
+
+#Functions whose value doesn't only depend on the variable they are applied to
+_VOLATILE = ('Builtin_NOW', 'Builtin_RAND', 'Builtin_BNODE', 'Builtin_UUID', 'Builtin_STRUUID', 'Builtin_EXISTS', 'Builtin_NOTEXISTS')
+
+#Solution modifiers evaluated over the columns
+_MODIFIERS = ('Slice', 'Distinct', 'Project', 'OrderBy', 'Extend', 'Filter', 'AggregateJoin', 'Group', 'BGP')
+
+class ColumnarTables:
+    """A ColumnarTables class used to keep the normalized reports of each context as categorical columns, and to answer queries over one dataset from them.
+
+    A query is answered from the columns when its basic graph pattern maps one-to-one onto the columns of one report table: one report variable, its attributes, and entities it links to with their attributes. Filters on a single variable are evaluated by rdflib once per distinct value of the variable. Every term is built exactly as the quads of the reports are, so results match the results of rdflib.
+
+    The columns are only used while they describe the graph: report ids are unique, entity nodes aren't shared by different column values, and the sub graphs haven't changed since the reports were imported, which their revisions tell.
+    """
+    def __init__(self):
+        """Initialize ColumnarTables class.
+        """
+        #Distinct normalized reports of each context, with categorical columns
+        self._tables = {}
+
+        #Reports of each context imported since its table was last built
+        self._parts = {}
+
+        #Namespace used by each context
+        self._namespaces = {}
+
+        #Revision of each sub graph once its reports were imported
+        self._revisions = {}
+
+        #Codes and terms of variables, and checks of tables, computed by queries
+        self._cache = {}
+
+    def copy(self):
+        """Copy the tables. A table is replaced instead of changed when reports are imported, so tables are shared with the copy.
+
+        Returns:
+            ColumnarTables: the copy.
+        """
+        tables = ColumnarTables()
+        tables._tables = dict(self._tables)
+        tables._parts = {context: list(parts) for context, parts in self._parts.items()}
+        tables._namespaces = dict(self._namespaces)
+        tables._revisions = dict(self._revisions)
+        return tables
+
+    def update(self, context, namespace, reports):
+        """Add newly imported reports to the table of a context. The table is built once every report of the import is added, see record.
+
+        Args:
+            context (string): id of the sub-graph the reports were added to.
+            namespace (rdflib.Namespace): namespace of the reports.
+            reports (DataFrame): normalized reports.
+        """
+        if context not in TABLES:
+            return
+        self._parts.setdefault(context, []).append(reports[_columns(TABLES[context])].drop_duplicates())
+        self._namespaces[context] = Namespace(str(namespace))
+
+    def record(self, context, revision):
+        """Build the table of a sub graph from the reports added since it was last built, and record its revision once its reports are imported.
+
+        Args:
+            context (string): id of the sub-graph.
+            revision (tuple): revision of the sub-graph, see versions.ContextStore.revision.
+        """
+        parts = self._parts.pop(context, [])
+        if parts:
+            #pandas is only needed once reports are imported, so it is imported on first use
+            from pandas import concat
+
+            #Categories of the previous table are merged with the new values once per import, not once per chunk
+            if context in self._tables:
+                parts.insert(0, self._tables[context].astype(str))
+            self._tables[context] = concat(parts, ignore_index=True).drop_duplicates().reset_index(drop=True).astype('category')
+            self._cache = {}
+        if context in self._tables:
+            self._revisions[context] = revision
+
+    def remove(self, context):
+        """Remove the table of a context.
+
+        Args:
+            context (string): id of the removed sub-graph.
+        """
+        for state in (self._tables, self._parts, self._namespaces, self._revisions):
+            state.pop(context, None)
+        self._cache = {}
+
+    def names(self):
+        """Get the contexts with a table.
+
+        Returns:
+            {string: int}: number of distinct reports, by context.
+        """
+        return {context: len(table) for context, table in self._tables.items()}
+
+    def answer(self, shape, graph, id=None):
+        """Answer a query from the columns if its pattern maps onto one report table.
+
+        Answered queries are SELECT queries over a basic graph pattern with optional filters, such as
+        SELECT ?group (COUNT(?r) AS ?n) WHERE { ?r a ns1:ArrestReport ; ns1:hasCharge ?c ; ns1:hasLocation ?l . ?c ns1:hasChargeGroupDescription ?group . ?l ns1:hasAreaName "77TH STREET"^^xsd:string } GROUP BY ?group
+        with optional DISTINCT, ORDER BY over variables, LIMIT/OFFSET, and COUNT, SUM, AVG, MIN, MAX or SAMPLE of group variables.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            graph (rdflib.ConjunctiveGraph): the graph the tables were imported alongside.
+            id (string, optional): name of the sub-graph being queried. Defaults to None.
+
+        Returns:
+            rdflib.query.Result: result of the query. None if the query can't be answered from the columns.
+        """
+        if not self._tables or shape is None or shape.type != 'SelectQuery' or shape.having is not None or not _modifiers(shape.prepared.algebra.p):
+            return None
+
+        #Split the filters from the basic graph pattern
+        pattern, filters = shape.pattern, []
+        while pattern is not None and pattern.name == 'Filter':
+            filters.extend(_conjuncts(pattern.expr))
+            pattern = pattern.p
+        if pattern is None or pattern.name != 'BGP' or not self._current(graph, id):
+            return None
+
+        for context in ([id] if id else list(self._tables)):
+            match = self._match(context, list(pattern.triples), id is None)
+            if match is not None and self._exact(context, match, id is None):
+                break
+        else:
+            return None
+
+        #pandas and the SPARQL evaluator are loaded by then, by the import and by the parsed query
+        import numpy
+        from rdflib.plugins.sparql.sparql import QueryContext
+
+        variables, constants = match
+        query_context = QueryContext(graph)
+        query_context.prologue = shape.prepared.prologue
+        try:
+            mask = numpy.ones(len(self._tables[context]), dtype=bool)
+            for spec, constant in constants:
+                codes, terms = self._terms(context, spec)
+                mask &= numpy.array([term == constant for term in terms], dtype=bool)[codes]
+            for expr in filters:
+                mask = self._filter(context, variables, expr, mask, query_context)
+                if mask is None:
+                    return None
+            rows = numpy.nonzero(mask)[0]
+
+            columns = {var: self._terms(context, spec) for var, spec in variables.items()}
+            columns = {var: (codes[rows], terms) for var, (codes, terms) in columns.items()}
+            if shape.is_aggregate:
+                columns, count = self._aggregate(shape, columns, len(rows))
+            else:
+                count = len(rows)
+                if shape.extends:
+                    return None
+            if columns is None:
+                return None
+            return self._result(shape, columns, count)
+        except TypeError:
+            #Terms rdflib can't compare, such as for ORDER BY, are left to rdflib
+            return None
+
+    def _current(self, graph, id):
+        """Check whether the tables still describe the queried sub graphs.
+
+        Args:
+            graph (rdflib.ConjunctiveGraph): the graph the tables were imported alongside.
+            id (string): name of the sub-graph being queried.
+
+        Returns:
+            bool: True if every queried sub graph holding triples has a table and hasn't changed since its reports were imported.
+        """
+        return unchanged(graph, self._revisions, id)
+
+    def _match(self, context, triples, union):
+        """Map the triple patterns of a query onto the table of a context.
+
+        Args:
+            context (string): id of the sub-graph.
+            triples ([(Node, Node, Node)]): triple patterns of the query.
+            union (bool): the query is evaluated over the union of all sub graphs, so the report type must be given.
+
+        Returns:
+            ({Variable: tuple}, [(tuple, Node)]): term spec of every variable, and the spec and constant of every constant object. None if the pattern doesn't map onto the table.
+        """
+        table, namespace = TABLES[context], self._namespaces[context]
+        attributes = {namespace[name]: attribute for name, attribute in table.attributes.items()}
+        entities = {namespace[name]: name for name in table.entities}
+
+        #The report variable is the subject of the report type, or of report predicates within a sub graph
+        reports = {s for s, p, o in triples if (p == RDF.type and o == namespace[table.type]) or (not union and (p in attributes or p in entities))}
+        if len(reports) != 1 or not isinstance(next(iter(reports)), Variable):
+            return None
+        report = reports.pop()
+
+        #Entity variables linked from the report, each link at most once
+        links = {}
+        for s, p, o in triples:
+            if s == report and p in entities:
+                if not isinstance(o, Variable) or o == report or entities[p] in links.values() or o in links:
+                    return None
+                links[o] = entities[p]
+
+        variables = {report: ('report', context)}
+        for entity, link in links.items():
+            variables[entity] = ('entity', context, link)
+        constants, typed = [], False
+        for s, p, o in triples:
+            if s == report and p == RDF.type:
+                if o != namespace[table.type]:
+                    return None
+                typed = True
+                continue
+            if s == report and p in entities:
+                continue
+            if s in links and p == RDF.type:
+                if o != namespace[table.entities[links[s]].type]:
+                    return None
+                continue
+            if s == report and p in attributes:
+                spec = ('attribute', context, None, str(p)[len(str(namespace)):])
+            elif s in links and p in (namespace[name] for name in table.entities[links[s]].attributes):
+                spec = ('attribute', context, links[s], str(p)[len(str(namespace)):])
+            else:
+                return None
+
+            #Every variable is bound by one triple, joins between attributes are left to rdflib
+            if isinstance(o, Variable):
+                if o in variables:
+                    return None
+                variables[o] = spec
+            elif isinstance(o, (Literal, URIRef)):
+                constants.append((spec, o))
+            else:
+                return None
+        if union and not typed:
+            return None
+        return variables, constants
+
+    def _exact(self, context, match, union):
+        """Check whether the columns describe the nodes used by a query exactly.
+
+        Args:
+            context (string): id of the sub-graph.
+            match (tuple): the match of the query returned by _match.
+            union (bool): the query is evaluated over the union of all sub graphs.
+
+        Returns:
+            bool: True if every report has one row, and every entity node used comes from one set of column values.
+        """
+        variables, constants = match
+        links = {spec[2] for spec in variables.values() if spec[0] == 'entity'} | {spec[2] for spec, _ in constants if spec[2]} | {spec[2] for spec in variables.values() if spec[0] == 'attribute' and spec[2]}
+        checks = [('reports', context, union)] + [('entity', context, link, union) for link in links]
+        for check in checks:
+            key = ('check',) + check
+            if key not in self._cache:
+                self._cache[key] = self._check(*check)
+            if not self._cache[key]:
+                return False
+        return True
+
+    def _check(self, kind, context, *args):
+        """Check the reports or one entity of a table. See _exact.
+
+        Args:
+            kind (string): 'reports' or 'entity'.
+            context (string): id of the sub-graph.
+            args: the link predicate of the entity, and whether all sub graphs are queried.
+
+        Returns:
+            bool: True if the check passes.
+        """
+        from pandas import concat
+
+        union = args[-1]
+        table = TABLES[context]
+        if kind == 'reports':
+            ids = self._tables[context][table.id_column]
+            if not ids.is_unique:
+                return False
+
+            #Report nodes are only hashed from their id, so reports of two contexts with one id are merged in the union graph
+            others = [self._tables[other][TABLES[other].id_column] for other in self._tables if other != context]
+            return not union or not any(ids.astype(str).isin(other.astype(str)).any() for other in others)
+
+        #Entity nodes are hashed from their concatenated columns, which different columns can share
+        entity = table.entities[args[0]]
+        frames = [self._tables[context][list(entity.columns)].astype(str)]
+        if union:
+            for other in self._tables:
+                for candidate in TABLES[other].entities.values():
+                    if other != context and candidate.type == entity.type:
+                        frame = self._tables[other][list(candidate.columns)].astype(str)
+                        frame.columns = list(entity.columns)
+                        frames.append(frame)
+        values = concat(frames, ignore_index=True).drop_duplicates()
+        columns = list(entity.columns)
+        return not values[columns[0]].str.cat([values[column] for column in columns[1:]]).duplicated().any()
+
+    def _terms(self, context, spec):
+        """Get the term of a variable in every row of a table.
+
+        Args:
+            context (string): id of the sub-graph.
+            spec (tuple): term spec of the variable, see _match.
+
+        Returns:
+            (numpy.ndarray, list): code of the term of every row, and the distinct terms by code.
+        """
+        key = ('terms', spec)
+        if key in self._cache:
+            return self._cache[key]
+
+        import numpy
+        from pandas import factorize
+
+        table, namespace, frame = TABLES[context], self._namespaces[context], self._tables[context]
+        if spec[0] == 'report':
+            columns = (table.id_column,)
+            build = lambda values : namespace['Report-' + md5(values[0].encode('utf-8')).hexdigest()]
+        elif spec[0] == 'entity':
+            entity = table.entities[spec[2]]
+            columns = entity.columns
+            build = lambda values : namespace[entity.type + '-' + md5(''.join(values).encode('utf-8')).hexdigest()]
+        else:
+            attribute = (table.entities[spec[2]].attributes if spec[2] else table.attributes)[spec[3]]
+            columns = attribute.columns
+            build = lambda values : _literal(values, attribute.datatype)
+
+        #Rows are coded by their distinct values, and the term of each distinct value is built once
+        codes = numpy.zeros(len(frame), dtype='int64')
+        for column in columns:
+            codes, _ = factorize(codes * len(frame[column].cat.categories) + frame[column].cat.codes.to_numpy())
+        _, first = numpy.unique(codes, return_index=True)
+        values = frame.loc[first, list(columns)].astype(str).itertuples(index=False, name=None)
+
+        #Different values can make the same term, such as integers with leading zeros
+        terms, index = [], {}
+        remap = numpy.array([index.setdefault(term, len(index)) for term in map(build, values)] or [0], dtype='int64')
+        terms = list(index)
+        result = (remap[codes] if len(frame) else codes, terms)
+        self._cache[key] = result
+        return result
+
+    def _filter(self, context, variables, expr, mask, query_context):
+        """Apply one filter of a query to the rows of a table.
+
+        Args:
+            context (string): id of the sub-graph.
+            variables ({Variable: tuple}): term spec of every variable.
+            expr (CompValue): the filter expression.
+            mask (numpy.ndarray): rows matching the query so far.
+            query_context (rdflib.plugins.sparql.sparql.QueryContext): context the expression is evaluated in.
+
+        Returns:
+            numpy.ndarray: rows matching the filter too. None if the filter isn't on a single variable of the pattern.
+        """
+        import numpy
+        from rdflib.plugins.sparql.evalutils import _ebv
+        from rdflib.plugins.sparql.sparql import FrozenBindings
+
+        used, names = set(), set()
+        _walk(expr, used, names)
+        if len(used) > 1 or names & set(_VOLATILE) or not used <= set(variables):
+            return None
+        if not used:
+            return mask if _ebv(expr, FrozenBindings(query_context, {})) else mask & False
+
+        #The filter is evaluated by rdflib once for every distinct term still matching
+        var = used.pop()
+        codes, terms = self._terms(context, variables[var])
+        keep = numpy.zeros(len(terms), dtype=bool)
+        for code in numpy.unique(codes[mask]):
+            keep[code] = _ebv(expr, FrozenBindings(query_context, {var: terms[code]}))
+        return mask & keep[codes]
+
+    def _aggregate(self, shape, columns, count):
+        """Group the matching rows and compute the aggregates of a query, as rdflib's Aggregator does.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            columns ({Variable: (numpy.ndarray, list)}): codes and terms of every variable in the matching rows.
+            count (int): number of matching rows.
+
+        Returns:
+            ({Variable: (numpy.ndarray, list)}, int): codes and terms of every projected variable in each group, and the number of groups. None if an aggregate can't be computed from the columns.
+        """
+        import numpy
+        from pandas import DataFrame, factorize
+        from rdflib.plugins.sparql.evalutils import _val
+
+        group = list(shape.group or [])
+        if not all(isinstance(var, Variable) and var in columns for var in group):
+            return None, 0
+
+        #Rows are numbered by group, in order of first appearance
+        groups = numpy.zeros(count, dtype='int64')
+        for var in group:
+            codes, terms = columns[var]
+            groups, _ = factorize(groups * (len(terms) + 1) + codes)
+        size = (int(groups.max()) + 1 if count else 0) if group else 1
+        first = numpy.unique(groups, return_index=True)[1]
+
+        #Without matches, a query with GROUP BY has one empty solution, and a query without has one group
+        if group and not count:
+            return {}, 1
+
+        output = {}
+        for var in shape.projection:
+            source = shape.resolve(var)
+            if source is None:
+                return None, 0
+            if isinstance(source, Variable) or source.name == 'Aggregate_Sample':
+                source = source if isinstance(source, Variable) else source.vars
+                if source not in group:
+                    return None, 0
+                codes, terms = columns[source]
+                output[var] = (codes[first], terms)
+                continue
+            if source.name not in _AGGREGATES or not (source.vars == '*' or source.vars in columns):
+                return None, 0
+
+            if source.vars == '*' or (source.name == 'Aggregate_Count' and not source.distinct):
+                values = None
+            else:
+                codes, terms = columns[source.vars]
+                if source.distinct:
+                    pairs = DataFrame({'group': groups, 'code': codes}).drop_duplicates()
+                    values = (pairs['group'].to_numpy(), pairs['code'].to_numpy(), terms)
+                else:
+                    values = (groups, codes, terms)
+
+            if source.name == 'Aggregate_Count':
+                counts = numpy.bincount(groups if values is None else values[0], minlength=size)
+                results = [Literal(int(n)) for n in counts]
+            elif source.name in ('Aggregate_Sum', 'Aggregate_Avg'):
+                if values is None:
+                    return None, 0
+
+                #Sums are only exact for integers, float sums depend on the order of the solutions
+                used = {int(code) for code in numpy.unique(values[1])}
+                numbers = [term.toPython() if code in used and isinstance(term, Literal) and term.datatype == XSD.integer else None for code, term in enumerate(values[2])]
+                if any(not isinstance(numbers[code], int) or isinstance(numbers[code], bool) for code in used):
+                    return None, 0
+                if used and max(abs(numbers[code]) for code in used) * count >= 2 ** 62:
+                    return None, 0
+                sums = numpy.zeros(size, dtype='int64')
+                numpy.add.at(sums, values[0], numpy.array([number or 0 for number in numbers] or [0], dtype='int64')[values[1]])
+                counts = numpy.bincount(values[0], minlength=size)
+                if source.name == 'Aggregate_Sum':
+                    results = [Literal(int(total), datatype=XSD.integer) if n else Literal(0) for total, n in zip(sums, counts)]
+                else:
+                    results = [Literal(Decimal(int(total)) / Decimal(int(n))) if n else Literal(0) for total, n in zip(sums, counts)]
+            else:
+                if values is None:
+                    return None, 0
+
+                #Terms are ranked as rdflib compares them, distinct terms that compare equal are left to rdflib
+                used = sorted({int(code) for code in numpy.unique(values[1])}, key=lambda code: _val(values[2][code]))
+                for a, b in zip(used, used[1:]):
+                    if not _val(values[2][a]) < _val(values[2][b]):
+                        return None, 0
+                ranks = numpy.zeros(len(values[2]) or 1, dtype='int64')
+                ranks[used] = numpy.arange(len(used))
+                series = DataFrame({'group': values[0], 'rank': ranks[values[1]]}).groupby('group')['rank']
+                best = series.min() if source.name == 'Aggregate_Min' else series.max()
+                results = [None] * size
+                for index, rank in best.items():
+                    results[index] = Literal(values[2][used[rank]])
+            output[var] = _encode(results)
+        return output, size
+
+    def _result(self, shape, columns, count):
+        """Order, project, deduplicate and slice solutions as rdflib does, and build the result.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            columns ({Variable: (numpy.ndarray, list)}): codes and terms of every variable of the solutions. A code of -1 is an unbound value.
+            count (int): number of solutions.
+
+        Returns:
+            rdflib.query.Result: result of the query. None if a variable isn't available.
+        """
+        import numpy
+        from pandas import DataFrame
+        from rdflib.plugins.sparql.evalutils import _val
+
+        order = numpy.arange(count)
+        if shape.order:
+            if any(var is None for var, _ in shape.order):
+                return None
+
+            #Stable sorts by each condition from the last one, over the rank of each term, unbound values first
+            for var, descending in reversed(shape.order):
+                codes, terms = columns.get(var, (numpy.full(count, -1, dtype='int64'), []))
+                used = sorted({int(code) for code in numpy.unique(codes) if code >= 0}, key=lambda code: _val(terms[code]))
+                ranks = numpy.zeros(len(terms) + 1, dtype='int64')
+                rank = 0
+                for previous, code in zip([None] + used, used):
+                    if previous is not None and _val(terms[previous]) < _val(terms[code]):
+                        rank += 1
+                    ranks[code] = rank + 1
+                keys = ranks[codes[order]]
+                order = order[numpy.argsort(-keys if descending else keys, kind='stable')]
+
+        projection = list(shape.projection)
+        if shape.is_aggregate and not columns:
+            projected = {}
+        else:
+            if not all(var in columns for var in projection):
+                return None
+            projected = {var: (columns[var][0][order], columns[var][1]) for var in projection}
+            if shape.distinct:
+                keep = DataFrame({str(index): codes for index, (codes, _) in enumerate(projected.values())}).drop_duplicates().index.to_numpy()
+                projected = {var: (codes[keep], terms) for var, (codes, terms) in projected.items()}
+        rows = len(next(iter(projected.values()))[0]) if projected else count
+        end = None if shape.length is None else shape.start + shape.length
+
+        result = Result('SELECT')
+        result.vars = projection
+        bindings = []
+        for index in range(rows)[shape.start:end]:
+            bindings.append({var: terms[codes[index]] for var, (codes, terms) in projected.items() if codes[index] >= 0})
+        result.bindings = bindings
+        return result
+
+    def __getstate__(self):
+        """Get the state of the tables to be pickled, without the cache.
+
+        Returns:
+            dict: the state.
+        """
+        state = dict(self.__dict__)
+        state['_cache'] = {}
+        return state
+
+def _columns(table):
+    """Get the columns of a table.
+
+    Args:
+        table (Table): the table.
+
+    Returns:
+        [string]: every column the triples of the table are built from, without repeats.
+    """
+    columns = [table.id_column]
+    attributes = list(table.attributes.values())
+    for entity in table.entities.values():
+        columns.extend(entity.columns)
+        attributes.extend(entity.attributes.values())
+    for attribute in attributes:
+        columns.extend(attribute.columns)
+    return list(dict.fromkeys(columns))
+
+def _literal(values, datatype):
+    """Build the literal of an attribute, as the quads of the reports build it.
+
+    Args:
+        values ((string)): values of the columns of the attribute.
+        datatype (rdflib.URIRef): datatype of the literal.
+
+    Returns:
+        rdflib.Literal: the literal.
+    """
+    if len(values) == 2:
+        return Literal(Literal(values[0], datatype=XSD.date) + 'T' + Literal(values[1], datatype=XSD.time), datatype=datatype)
+    return Literal(values[0], datatype=datatype)
+
+def _encode(terms):
+    """Code a list of terms.
+
+    Args:
+        terms ([rdflib.term.Node]): terms, None for unbound values.
+
+    Returns:
+        (numpy.ndarray, list): code of every term, -1 for unbound values, and the distinct terms by code.
+    """
+    import numpy
+
+    index = {}
+    codes = [-1 if term is None else index.setdefault(term, len(index)) for term in terms]
+    return numpy.array(codes, dtype='int64'), list(index)
+
+def _conjuncts(expr):
+    """Split a filter expression into the expressions joined by &&.
+
+    Args:
+        expr (CompValue): a filter expression.
+
+    Returns:
+        [CompValue]: the joined expressions.
+    """
+    if getattr(expr, 'name', None) == 'ConditionalAndExpression':
+        return [part for other in [expr.expr] + list(expr.other or []) for part in _conjuncts(other)]
+    return [expr]
+
+def _walk(expr, variables, names):
+    """Collect the variables and the names of the functions of an expression.
+
+    Args:
+        expr (CompValue|Node|list): an expression.
+        variables (set): variables found so far.
+        names (set): function names found so far.
+    """
+    if isinstance(expr, Variable):
+        variables.add(expr)
+    elif isinstance(expr, (list, tuple)):
+        for part in expr:
+            _walk(part, variables, names)
+    elif isinstance(expr, dict):
+        if getattr(expr, 'name', None):
+            names.add(expr.name)
+        for key, value in expr.items():
+            #Keys with an underscore are annotations of the algebra, such as the variables in scope
+            if not key.startswith('_'):
+                _walk(value, variables, names)
+
+def _modifiers(node):
+    """Check whether the algebra of a query only uses modifiers evaluated over the columns.
+
+    Args:
+        node (CompValue): the algebra node below the query.
+
+    Returns:
+        bool: True if every node down to the basic graph pattern is supported.
+    """
+    while node is not None and getattr(node, 'name', None) != 'BGP':
+        if node.name not in _MODIFIERS:
+            return False
+        node = node.p
+    return node is not None
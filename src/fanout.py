@@ -0,0 +1,246 @@
+from .algebra import term_sort_key
+from multiprocessing import get_all_start_methods, get_context
+from os import cpu_count
+from rdflib import Literal
+from rdflib.query import Result
+from rdflib.term import Variable
+
+#Partitions of the query evaluated by a worker process. Set by the initializer of its pool.
+_partitions = []
+
+#Aggregates that can be recomputed from partial results of each partition
+_MERGEABLE = ('Aggregate_Count', 'Aggregate_Sum', 'Aggregate_Min', 'Aggregate_Max', 'Aggregate_Sample')
+
+class FanOut:
+    """A FanOut class used to evaluate a query in parallel over independent partitions of a graph and merge the partial results.
+
+    Two query shapes are partitioned:
+        * UNION: each branch of a top-level UNION is evaluated separately against the whole graph.
+        * GRAPH ?g: the pattern is evaluated once per named sub-graph with ?g bound to it (per-context scans and aggregates).
+    """
+    def __init__(self, processes=None):
+        """Initialize FanOut class.
+
+        Args:
+            processes (int, optional): maximum number of worker processes. Defaults to the number of cores.
+        """
+        self.processes = processes or cpu_count() or 1
+
+    def execute(self, shape, c_graph):
+        """Evaluate a query over partitions in parallel worker processes.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            c_graph (rdflib.ConjunctiveGraph): graph to be queried.
+
+        Returns:
+            rdflib.query.Result: merged result of the query. None if the query shape can't be partitioned safely.
+        """
+        partitions = self._partition(shape, c_graph)
+        if not partitions or len(partitions) < 2 or not self._mergeable(shape):
+            return None
+
+        #Fork workers holding a snapshot of the graph being queried. Their partitions are handed to them as arguments of the fork rather than through a global of this process, so concurrent queries each get their own. A pool is forked per query, as its workers only see the graph as it was when they were forked.
+        if 'fork' not in get_all_start_methods():
+            return None
+        print('INFO: Fanning out query over %s partitions...' % len(partitions))
+        with get_context('fork').Pool(min(self.processes, len(partitions)), initializer=_initialize, initargs=(partitions,)) as pool:
+            partials = pool.map(_evaluate_partition, range(len(partitions)))
+
+        if shape.type == 'AskQuery':
+            result = Result('ASK')
+            result.askAnswer = any(partials)
+            return result
+
+        if shape.is_aggregate:
+            rows = self._reaggregate(shape, partials)
+        else:
+            rows = [row for partial in partials for row in partial]
+            if shape.distinct:
+                rows = list(dict.fromkeys(rows))
+
+        #Apply ORDER BY and LIMIT on the merged rows
+        if shape.order:
+            for var, descending in reversed(shape.order):
+                index = shape.projection.index(var)
+                rows.sort(key=lambda row: term_sort_key(row[index]), reverse=descending)
+        if shape.length is not None:
+            rows = rows[:shape.length]
+
+        result = Result('SELECT')
+        result.vars = shape.projection
+        result.bindings = [{var: value for var, value in zip(shape.projection, row) if value is not None} for row in rows]
+        return result
+
+    def _partition(self, shape, c_graph):
+        """Split a query into independent partitions.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            c_graph (rdflib.ConjunctiveGraph): graph to be queried.
+
+        Returns:
+            [(rdflib.Graph, Query, dict)]: graph, query and initial bindings of each partition. None if the query can't be partitioned.
+        """
+        if shape is None or shape.type not in ('SelectQuery', 'AskQuery') or shape.pattern is None:
+            return None
+
+        #A shape only exists once a query was parsed, so the SPARQL plugin is already loaded here
+        from rdflib.plugins.sparql.sparql import Query
+
+        #Each branch of a top-level UNION
+        if shape.pattern.name == 'Union':
+            branches = []
+            stack = [shape.pattern]
+            while stack:
+                node = stack.pop()
+                if node.name == 'Union':
+                    stack.extend([node.p2, node.p1])
+                else:
+                    branches.append(node)
+            return [(c_graph, Query(shape.prepared.prologue, _replace(shape.prepared.algebra, shape.pattern, branch)), {}) for branch in branches]
+
+        #Each named sub-graph of a GRAPH ?g pattern
+        if shape.pattern.name == 'Graph' and isinstance(shape.pattern.term, Variable):
+            contexts = [c for c in c_graph.contexts() if c.identifier != c_graph.default_context.identifier]
+            return [(c_graph, shape.prepared, {shape.pattern.term: c.identifier}) for c in contexts]
+
+        return None
+
+    def _mergeable(self, shape):
+        """Check whether partial results of a query can be merged exactly.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+
+        Returns:
+            bool: True if partial results can be merged.
+        """
+        if shape.type == 'AskQuery':
+            return True
+        if shape.start:
+            return False
+        if shape.order and any(var is None or var not in shape.projection for var, _ in shape.order):
+            return False
+        if not shape.is_aggregate:
+            return True
+        if shape.length is not None or shape.having is not None or any(not isinstance(x, Variable) for x in shape.group or []):
+            return False
+
+        #Every group variable must be projected so partial groups can be matched
+        group = set(shape.group or [])
+        projected = set()
+        for var in shape.projection:
+            source = shape.resolve(var)
+            if source is None:
+                return False
+            if isinstance(source, Variable):
+                projected.add(source)
+            elif source.name not in _MERGEABLE or (source.name != 'Aggregate_Sample' and source.distinct):
+                return False
+            elif source.name == 'Aggregate_Sample':
+                if source.vars not in group:
+                    return False
+                projected.add(source.vars)
+        return group <= projected
+
+    def _reaggregate(self, shape, partials):
+        """Merge partial aggregate results of each partition.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            partials ([[tuple]]): rows of each partition.
+
+        Returns:
+            [tuple]: merged rows.
+        """
+        sources = [shape.resolve(var) for var in shape.projection]
+        keys = [i for i, source in enumerate(sources) if isinstance(source, Variable) or source.name == 'Aggregate_Sample']
+
+        groups = {}
+        for partial in partials:
+            for row in partial:
+                key = tuple(row[i] for i in keys)
+                if key not in groups:
+                    groups[key] = list(row)
+                    continue
+                merged = groups[key]
+                for i, source in enumerate(sources):
+                    if i in keys:
+                        continue
+                    merged[i] = _combine(source.name, merged[i], row[i])
+        return [tuple(row) for row in groups.values()]
+
+def _combine(name, a, b):
+    """Combine two partial values of an aggregate.
+
+    Args:
+        name (string): name of the aggregate.
+        a (rdflib.Literal): first partial value.
+        b (rdflib.Literal): second partial value.
+
+    Returns:
+        rdflib.Literal: combined value. None if a partial COUNT or SUM is unbound or not numeric, as the aggregate of a partition with an error is unbound.
+    """
+    from rdflib.plugins.sparql.aggregates import type_promotion, type_safe_numbers
+    from rdflib.plugins.sparql.operators import numeric
+    from rdflib.plugins.sparql.sparql import SPARQLError
+
+    if name in ('Aggregate_Count', 'Aggregate_Sum'):
+        if a is None or b is None:
+            return None
+        #Add the partials as SUM does, promoting their datatypes
+        try:
+            return Literal(sum(type_safe_numbers(numeric(a), numeric(b))), datatype=type_promotion(a.datatype, b.datatype))
+        except (SPARQLError, TypeError):
+            return None
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if name == 'Aggregate_Min':
+        return min(a, b, key=term_sort_key)
+    return max(a, b, key=term_sort_key)
+
+def _replace(node, old, new):
+    """Copy the chain of algebra nodes leading to a pattern and replace that pattern.
+
+    Args:
+        node (CompValue): root of the algebra.
+        old (CompValue): pattern to be replaced.
+        new (CompValue): replacement pattern.
+
+    Returns:
+        CompValue: copied algebra.
+    """
+    from rdflib.plugins.sparql.parserutils import CompValue
+
+    if node is old:
+        return new
+    copy = CompValue(node.name, **node)
+    copy['p'] = _replace(node.p, old, new)
+    return copy
+
+def _initialize(partitions):
+    """Keep the partitions of a query inside a worker process. Run when the worker starts.
+
+    Args:
+        partitions ([(rdflib.Graph, Query, dict)]): graph, query and initial bindings of each partition. Inherited through the fork, without pickling.
+    """
+    global _partitions
+    _partitions = partitions
+
+def _evaluate_partition(index):
+    """Evaluate one partition inside a worker process.
+
+    Args:
+        index (int): index of the partition.
+
+    Returns:
+        [tuple]|bool: rows of the partition, or the answer of an ASK query.
+    """
+    graph, query, bindings = _partitions[index]
+    result = graph.query(query, initBindings=bindings)
+    if result.type == 'ASK':
+        return result.askAnswer
+    return [tuple(row) for row in result]
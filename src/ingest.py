@@ -0,0 +1,193 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from csv import reader
+from gzip import open as open_gzip
+from io import StringIO
+from multiprocessing import get_all_start_methods, get_context
+from os import cpu_count
+from pathlib import Path
+
+#Namespace of reports read from local exports, the same as of reports downloaded from the portal
+PORTAL_NAMESPACE = 'https://data.lacity.org/'
+
+#Extensions of the files read from a directory
+EXTENSIONS = ('.csv', '.csv.gz')
+
+def is_local(source):
+    """Check whether a source of reports is a local file or directory rather than a url.
+
+    Args:
+        source (string): url or path of the reports.
+
+    Returns:
+        bool: True if the source is local.
+    """
+    return not str(source).startswith(('http://', 'https://'))
+
+def normalize_column(column):
+    """Normalize a column of reports. Every value is converted to an upper case string with single spaces.
+
+    Args:
+        column (Series): a column of reports.
+
+    Returns:
+        Series: the normalized column.
+    """
+    return column.astype(str).str.upper().replace(' +', ' ', regex=True)
+
+class LocalReader:
+    """A LocalReader class used to read reports from local CSV exports, plain or gzip-compressed.
+
+    Files are split into byte ranges on line boundaries, which worker processes parse and normalize in parallel. A gzip file can't be read from an offset, so it is decompressed as one stream and its blocks of lines are handed to the workers. Records spanning lines, such as quoted fields with line breaks, aren't supported.
+    """
+    def __init__(self, source, workers=None, chunk_size=8 * 1024 * 1024):
+        """Initialize LocalReader class.
+
+        Args:
+            source (string): a CSV file, a gzip-compressed CSV file or a directory of such files.
+            workers (int, optional): number of worker processes. Defaults to the number of cores.
+            chunk_size (int, optional): size in bytes of the ranges parsed at once. Defaults to 8 MB.
+        """
+        self.source = Path(source)
+        self.workers = workers or cpu_count() or 1
+        self.chunk_size = chunk_size
+
+        #Rows and uncompressed bytes read so far
+        self.rows = 0
+        self.bytes = 0
+
+    def files(self):
+        """Get the files of the source.
+
+        Raises:
+            FileNotFoundError: the source doesn't exist or contains no CSV file.
+
+        Returns:
+            [Path]: CSV files sorted by name.
+        """
+        if self.source.is_dir():
+            files = sorted(path for path in self.source.iterdir() if path.name.lower().endswith(EXTENSIONS))
+        else:
+            files = [self.source] if self.source.exists() else []
+        if not files:
+            raise FileNotFoundError('No CSV file found at \'%s\'' % self.source)
+        return files
+
+    def chunks(self, limit=None):
+        """Read the reports, in file order.
+
+        Args:
+            limit (int, optional): the maximum number of reports. Defaults to None, all reports.
+
+        Returns:
+            generator: DataFrames of normalized reports, one per byte range.
+        """
+        for reports in self._results(self._tasks()):
+            if limit is not None and self.rows + len(reports) > limit:
+                reports = reports.iloc[:limit - self.rows]
+            if len(reports):
+                self.rows += len(reports)
+                yield reports
+            if limit is not None and self.rows >= limit:
+                return
+
+    def _tasks(self):
+        """Split the files into parse tasks.
+
+        Returns:
+            generator: (function, arguments) tuples, in file order.
+        """
+        for path in self.files():
+            if path.name.lower().endswith('.gz'):
+                with open_gzip(path, 'rb') as f:
+                    header = f.readline()
+                    while True:
+                        data = f.read(self.chunk_size)
+                        if not data:
+                            break
+                        data += f.readline()
+                        self.bytes += len(data)
+                        yield _parse_block, (header, data)
+            else:
+                size = path.stat().st_size
+                with open(path, 'rb') as f:
+                    header = f.readline()
+                    start = f.tell()
+
+                    #Every range ends after the first line break past its nominal end
+                    while start < size:
+                        f.seek(min(start + self.chunk_size, size))
+                        f.readline()
+                        end = f.tell()
+                        self.bytes += end - start
+                        yield _parse_range, (header, str(path), start, end)
+                        start = end
+
+    def _results(self, tasks):
+        """Run parse tasks and get their results in task order. At most two tasks per worker are queued, so only a few ranges are held at once.
+
+        Args:
+            tasks (iterable): (function, arguments) tuples.
+
+        Returns:
+            generator: the result of every task.
+        """
+        if self.workers <= 1:
+            for function, arguments in tasks:
+                yield function(*arguments)
+            return
+
+        #Forked workers start without importing the program again. Fall back to the default start method where fork isn't available.
+        pending = deque()
+        context = get_context('fork') if 'fork' in get_all_start_methods() else None
+        with ProcessPoolExecutor(self.workers, mp_context=context) as executor:
+            try:
+                for function, arguments in tasks:
+                    pending.append(executor.submit(function, *arguments))
+                    if len(pending) >= 2 * self.workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+def _parse_range(header, filename, start, end):
+    """Parse a byte range of a CSV file. Run by worker processes.
+
+    Args:
+        header (bytes): the header line of the file.
+        filename (string): path to the file.
+        start (int): offset of the first line of the range.
+        end (int): offset after the last line of the range.
+
+    Returns:
+        DataFrame: the normalized reports of the range.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return _parse_block(header, data)
+
+def _parse_block(header, data):
+    """Parse and normalize lines of a CSV file. Run by worker processes.
+
+    Args:
+        header (bytes): the header line of the file.
+        data (bytes): complete lines of the file.
+
+    Raises:
+        ValueError: a line doesn't have as many fields as the header.
+
+    Returns:
+        DataFrame: the normalized reports of the lines.
+    """
+    #pandas is only needed for report ingest, so it is imported on first use
+    from pandas import DataFrame
+
+    columns = next(reader([header.decode('utf-8-sig')]))
+    rows = [row for row in reader(StringIO(data.decode('utf-8'), newline='')) if row]
+    for row in rows:
+        if len(row) != len(columns):
+            raise ValueError('Line of %s fields where the header has %s. Quoted fields spanning lines aren\'t supported in local files.' % (len(row), len(columns)))
+    return DataFrame(rows, columns=columns).apply(normalize_column)
@@ -1,76 +1,477 @@
+from contextlib import contextmanager
+from json import dumps
+from os import replace
+from pathlib import Path
+from sys import platform
+from threading import Lock, local
+from time import perf_counter, process_time, time
 from tqdm import tqdm
-from threading import Timer, Thread
-from time import sleep
 
 class Monitor ():
-    """A Monitor class used to keep track of the current progress of some functions.
+    """A Monitor class used to keep track of the current progress of some functions, and to record metrics of every stage they go through.
+
+    Progress is reported to sinks and listeners. Stages are recorded as nested spans, which are passed to sinks once they finish.
     """
-    def __init__(self, unit = 'data', finite_bar_format = '{n_fmt}/{total_fmt} [{bar}] - {elapsed} - {rate_fmt}', infinite_bar_format='{n_fmt}/∞ [{bar}] - {elapsed}'):
+    def __init__(self, unit = 'data', finite_bar_format = '{n_fmt}/{total_fmt} [{bar}] - {elapsed} - {rate_fmt}', infinite_bar_format='{n_fmt} {unit} - {elapsed}', sinks=None):
         """Initialize Monitor object.
 
         Args:
             unit (str, optional): unit label. Defaults to 'data'.
             finite_bar_format (str, optional): format of finite tqdm progress bar. Defaults to '{n_fmt}/{total_fmt} [{bar}] - {elapsed} - {rate_fmt}'.
-            infinite_bar_format (str, optional): format of infinite tqdm progress bar. Defaults to '{n_fmt}/∞ [{bar}] - {elapsed}'.
+            infinite_bar_format (str, optional): format of infinite tqdm progress bar. Defaults to '{n_fmt} {unit} - {elapsed}'.
+            sinks ([Sink], optional): sinks receiving progress and finished spans. Defaults to a single TqdmSink.
         """
-        self._finite_bar_format = finite_bar_format
-        self._infinite_bar_format = infinite_bar_format
-        self._ncols = 100
-        self._unit = unit
-        self._leave = False
+        self._sinks = list(sinks) if sinks is not None else [TqdmSink(unit, finite_bar_format, infinite_bar_format)]
         self._mode=0
+        self._n = 0
+        self._total = None
+
+        #Callbacks notified about progress as (description, n, total)
+        self._listeners = []
+        self._desc = ''
+
+        #Open spans of each thread, innermost last
+        self._local = local()
+
+        #Records of finished spans, oldest first
+        self.records = []
+        self.max_records = 10000
+        self._lock = Lock()
 
-        self._tqdm=None
-        self._is_tqdm_thread_activate = False
+    def add_listener(self, listener):
+        """Register a callback notified whenever progress changes.
 
-    def start(self, total = None, unit_scale=None, mode=0):
-        """Generate a tqdm progress bar based a given mode.
+        Args:
+            listener (callable): a function called with (description, n, total). total is None when progress is infinite.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Unregister a progress callback.
+
+        Args:
+            listener (callable): a function previously passed to add_listener.
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def add_sink(self, sink):
+        """Register a sink receiving progress and finished spans.
+
+        Args:
+            sink (Sink): the sink.
+        """
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """Unregister a sink and close it.
+
+        Args:
+            sink (Sink): a sink previously passed to add_sink.
+        """
+        if sink in self._sinks:
+            self._sinks.remove(sink)
+            sink.close()
+
+    def _notify(self, n, total):
+        """Notify all listeners about the current progress.
+
+        Args:
+            n (int): current tick of the progress bar.
+            total (int): total tick of the progress bar. None when progress is infinite.
+        """
+        for listener in list(self._listeners):
+            listener(self._desc, n, total)
+
+    def start(self, total = None, unit_scale=None, mode=0, desc=''):
+        """Start reporting progress of an operation.
 
         Args:
             total (int, optional): a total tick of the progress bar. Defaults to None.
             unit_scale (int, optional): a scaling factor of progress bar. Defaults to None.
-            mode (int, optional): mode of progress bar. 1 = finite progress bar, 2 = infinite progress bar, and 3 = pandas progress bar. Defaults to 0.
+            mode (int, optional): mode of progress bar. 0 = finite progress bar, 1 = infinite progress bar, and 2 = pandas progress bar. Defaults to 0.
+            desc (str, optional): description of the current operation. Defaults to ''.
         """
         self._mode=mode
+        self._desc=desc
+        self._n = 0
+        self._total = total if mode != 1 else None
+
+        #progress_apply must exist even when no sink draws pandas progress
+        if mode == 2:
+            tqdm.pandas(disable=True)
+
+        for sink in self._sinks:
+            sink.start(desc, total, unit_scale, mode)
+        self._notify(0, self._total)
+
+    def stop(self):
+        """Stop reporting progress of the current operation.
+        """
+        for sink in self._sinks:
+            sink.stop()
+        self._notify(self._n, self._total)
+
+    def update(self, n = 1):
+        """Report progress of the current operation.
+
+        Args:
+            n (int, optional): the number of tick that the operation progressed by. Defaults to 1.
+        """
+        self._n += n
+        for sink in self._sinks:
+            sink.update(n)
+        self._notify(self._n, self._total)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Record a stage as a span. Spans opened inside the block become its children.
+
+        Args:
+            name (string): name of the stage.
+            **attributes: attributes of the span, such as the dataset.
+
+        Returns:
+            contextmanager: yields the Span, whose counters can be increased inside the block.
+        """
+        span = self.open_span(name, **attributes)
+        try:
+            with span.running():
+                yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            self.close_span(span)
+
+    def open_span(self, name, **attributes):
+        """Open a span whose time is measured in one or more running blocks. Use span for a single block.
+
+        Args:
+            name (string): name of the stage.
+            **attributes: attributes of the span.
+
+        Returns:
+            Span: the opened span.
+        """
+        stack = self._stack()
+        span = Span(name, stack[-1] if stack else None, attributes)
+        stack.append(span)
+        for sink in self._sinks:
+            sink.begin(span)
+        return span
+
+    def close_span(self, span):
+        """Finish a span and pass its record to the sinks.
+
+        Args:
+            span (Span): a span returned by open_span.
+        """
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+        self.add_record(span.finish())
+
+    def add_record(self, record):
+        """Record a span finished outside of the monitor, such as a span measured in a read replica, and pass it to the sinks.
+
+        Args:
+            record (dict): the record returned by Span.finish.
+        """
+        with self._lock:
+            self.records.append(record)
+            del self.records[:-self.max_records]
+        for sink in self._sinks:
+            sink.end(record)
+
+    def mark(self, name, seconds, **attributes):
+        """Record a stage measured without a span, such as the time since the program started.
+
+        Args:
+            name (string): name of the stage.
+            seconds (float): duration of the stage.
+            **attributes: attributes of the stage.
+        """
+        stack = self._stack()
+        span = Span(name, stack[-1] if stack else None, attributes)
+        span.seconds = seconds
+        self.close_span(span)
+
+    def current_span(self):
+        """Get the innermost open span of the calling thread.
+
+        Returns:
+            Span: the span. None if no span is open.
+        """
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def close(self):
+        """Close all sinks.
+        """
+        for sink in self._sinks:
+            sink.close()
+
+    def _stack(self):
+        """Get the open spans of the calling thread.
+
+        Returns:
+            [Span]: the open spans, innermost last.
+        """
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+class Span ():
+    """A Span class used to measure one stage. A span counts rows, triples and bytes, and measures wall time, cpu time and memory.
+    """
+    def __init__(self, name, parent=None, attributes=None):
+        """Initialize Span object.
+
+        Args:
+            name (string): name of the stage.
+            parent (Span, optional): the span this span is nested in. Defaults to None.
+            attributes (dict, optional): attributes of the span. Defaults to None.
+        """
+        self.name = name
+        self.parent = parent
+        self.path = parent.path + '/' + name if parent else name
+        self.attributes = dict(attributes or {})
+        self.counters = {'rows': 0, 'triples': 0, 'bytes': 0}
+        self.started = time()
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.error = None
+
+    def add(self, **counts):
+        """Increase counters of the span.
+
+        Args:
+            **counts: amounts to add, such as rows=10, triples=100 or bytes=1024.
+        """
+        for counter, value in counts.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    @contextmanager
+    def running(self):
+        """Measure the time of a block. The time of every block is added up.
+
+        Returns:
+            contextmanager: measures the block.
+        """
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield self
+        finally:
+            self.seconds += perf_counter() - wall
+            self.cpu_seconds += process_time() - cpu
+
+    def finish(self):
+        """Get the record of the finished span.
+
+        Returns:
+            dict: name, path, attributes, times, counters, rates and memory of the span.
+        """
+        record = {'name': self.name, 'path': self.path, 'started': self.started, 'seconds': self.seconds, 'cpu_seconds': self.cpu_seconds}
+        record.update(self.attributes)
+        for counter, value in self.counters.items():
+            record[counter] = value
+            if value and counter != 'bytes':
+                record[counter + '_per_second'] = value / self.seconds if self.seconds else None
+        rss, peak_rss = memory()
+        record['rss_mb'] = rss
+        record['peak_rss_mb'] = peak_rss
+        if self.error:
+            record['error'] = self.error
+        return record
+
+class Sink ():
+    """A Sink class used to receive progress and spans from a Monitor. Every method does nothing by default.
+    """
+    def start(self, desc, total, unit_scale, mode):
+        """Receive the start of an operation's progress.
+
+        Args:
+            desc (string): description of the operation.
+            total (int): total tick. None when progress is infinite.
+            unit_scale (int): a scaling factor of progress.
+            mode (int): 0 = finite, 1 = infinite and 2 = pandas progress.
+        """
+        pass
+
+    def update(self, n):
+        """Receive progress of the current operation.
+
+        Args:
+            n (int): the number of tick that the operation progressed by.
+        """
+        pass
+
+    def stop(self):
+        """Receive the end of the current operation's progress.
+        """
+        pass
+
+    def begin(self, span):
+        """Receive a newly opened span.
+
+        Args:
+            span (Span): the span.
+        """
+        pass
+
+    def end(self, record):
+        """Receive the record of a finished span.
+
+        Args:
+            record (dict): the record.
+        """
+        pass
+
+    def close(self):
+        """Release resources of the sink.
+        """
+        pass
+
+class TqdmSink (Sink):
+    """A TqdmSink class used to show progress as tqdm progress bars.
+    """
+    def __init__(self, unit = 'data', finite_bar_format = '{n_fmt}/{total_fmt} [{bar}] - {elapsed} - {rate_fmt}', infinite_bar_format='{n_fmt} {unit} - {elapsed}'):
+        """Initialize TqdmSink object.
+
+        Args:
+            unit (str, optional): unit label. Defaults to 'data'.
+            finite_bar_format (str, optional): format of finite tqdm progress bar. Defaults to '{n_fmt}/{total_fmt} [{bar}] - {elapsed} - {rate_fmt}'.
+            infinite_bar_format (str, optional): format of infinite tqdm progress bar. Defaults to '{n_fmt} {unit} - {elapsed}'.
+        """
+        self._finite_bar_format = finite_bar_format
+        self._infinite_bar_format = infinite_bar_format
+        self._ncols = 100
+        self._unit = unit
+        self._leave = False
+        self._tqdm = None
+
+    def start(self, desc, total, unit_scale, mode):
+        self.stop()
 
         #Finite mode
-        if self._mode == 0:
+        if mode == 0:
             self._tqdm = tqdm(total=total, unit_scale=unit_scale, ncols=self._ncols, unit=self._unit ,leave=self._leave, bar_format=self._finite_bar_format)
-        
-        #Infinite mode
-        elif self._mode == 1:
-            self._tqdm = tqdm(total=100, ncols=self._ncols ,leave=self._leave, bar_format=self._infinite_bar_format)
-            self._is_tqdm_thread_activate=True
-            thread = Thread(target=self._auto_update, daemon=True)
-            thread.start()
-            
+
+        #Infinite mode. The bar is only redrawn when progress is reported.
+        elif mode == 1:
+            self._tqdm = tqdm(total=None, ncols=self._ncols, unit=self._unit, leave=self._leave, bar_format=self._infinite_bar_format)
+
         #Panda mode
-        elif self._mode == 2:
+        elif mode == 2:
             tqdm.pandas(total=total, unit_scale=unit_scale, ncols=self._ncols, unit=self._unit ,leave=self._leave, bar_format=self._finite_bar_format)
-    
+
+    def update(self, n):
+        if self._tqdm is not None:
+            self._tqdm.update(n)
+
     def stop(self):
-        """Stop and clean up a tqdm progress bar.
+        if self._tqdm is not None:
+            self._tqdm.close()
+            self._tqdm = None
+
+    def close(self):
+        self.stop()
+
+class JSONLinesSink (Sink):
+    """A JSONLinesSink class used to append the record of every finished span to a JSON-lines file.
+    """
+    def __init__(self, filename):
+        """Initialize JSONLinesSink object.
+
+        Args:
+            filename (string): path of the log file. Records are appended.
         """
-        self._tqdm.close()
-        if self._mode==1:
-            self._is_tqdm_thread_activate=False
+        self.filename = Path(filename)
+        self._file = open(self.filename, 'a', encoding='utf-8')
+        self._lock = Lock()
 
-    def update(self, n = 1):
-        """Update a tqdm progress bar.
+    def end(self, record):
+        with self._lock:
+            self._file.write(dumps(record) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class PrometheusSink (Sink):
+    """A PrometheusSink class used to export totals of finished spans in the Prometheus textfile format, as read by the node exporter's textfile collector.
+    """
+    #Totals exported for every stage, with their help text
+    METRICS = [
+        ('runs', 'Number of finished runs of a stage.'),
+        ('seconds', 'Wall time spent in a stage.'),
+        ('cpu_seconds', 'Cpu time spent in a stage.'),
+        ('rows', 'Rows processed by a stage.'),
+        ('triples', 'Triples processed by a stage.'),
+        ('bytes', 'Bytes transferred by a stage.'),
+        ('errors', 'Number of failed runs of a stage.'),
+    ]
+
+    def __init__(self, filename, prefix='sparql_la'):
+        """Initialize PrometheusSink object.
 
         Args:
-            n (int, optional): the number of tick that the progress bar should be progress by. It can't be more than total. Defaults to 1.
+            filename (string): path of the .prom file. It is replaced atomically after every span.
+            prefix (string, optional): prefix of the metric names. Defaults to 'sparql_la'.
         """
-        if self._tqdm.n == self._tqdm.total:
-            self._tqdm.n = 0
-            self._tqdm.last_print_n = 0
-            self._tqdm.refresh()
-        else:
-            self._tqdm.update(n)
+        self.filename = Path(filename)
+        self.prefix = prefix
+        self._totals = {}
+        self._peak_rss = None
+        self._lock = Lock()
 
-    def _auto_update(self):
-        """A self call update of a tqdm a progress bar. This is only applicable to mode = 1.
+    def end(self, record):
+        with self._lock:
+            totals = self._totals.setdefault(record['path'], dict.fromkeys([metric for metric, _ in self.METRICS], 0))
+            totals['runs'] += 1
+            totals['errors'] += 1 if 'error' in record else 0
+            for metric in ('seconds', 'cpu_seconds', 'rows', 'triples', 'bytes'):
+                totals[metric] += record.get(metric, 0)
+            if record.get('peak_rss_mb') is not None:
+                self._peak_rss = record['peak_rss_mb']
+            self._write()
+
+    def _write(self):
+        """Replace the textfile with the current totals.
         """
-        while self._is_tqdm_thread_activate:
-            self.update()
-            sleep(0.1)
\ No newline at end of file
+        lines = []
+        for metric, help in self.METRICS:
+            name = '%s_stage_%s_total' % (self.prefix, metric)
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s counter' % name)
+            for path, totals in sorted(self._totals.items()):
+                lines.append('%s{stage="%s"} %s' % (name, path.replace('\\', '\\\\').replace('"', '\\"'), totals[metric]))
+        if self._peak_rss is not None:
+            name = '%s_peak_rss_bytes' % self.prefix
+            lines.append('# HELP %s Peak resident memory of the process.' % name)
+            lines.append('# TYPE %s gauge' % name)
+            lines.append('%s %s' % (name, int(self._peak_rss * 1024 * 1024)))
+
+        #Write next to the target and rename, so the collector never reads a partial file
+        temporary = self.filename.with_name(self.filename.name + '.tmp')
+        temporary.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        replace(temporary, self.filename)
+
+def memory():
+    """Get the current and the peak resident memory of this process.
+
+    Returns:
+        (float, float): current and peak memory in MB. None where they can't be measured.
+    """
+    rss = peak = None
+    try:
+        from resource import getrusage, getpagesize, RUSAGE_SELF
+
+        #Linux reports the peak in kilobytes, macOS in bytes
+        peak = getrusage(RUSAGE_SELF).ru_maxrss / (1024 * 1024 if platform == 'darwin' else 1024)
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * getpagesize() / (1024 * 1024)
+    except (ImportError, OSError):
+        pass
+    return rss, peak
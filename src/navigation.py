@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from rdflib import URIRef, Variable
+from rdflib.namespace import RDF
+from rdflib.query import Result
+from threading import Lock
+
+#Variables of an entity description
+_VARS = [Variable('s'), Variable('p'), Variable('o')]
+
+class EntityNavigator:
+    """An EntityNavigator class used to describe the entity behind a clicked url. Triples are looked up through the indexes of the store instead of a SPARQL query, and cached per url.
+    """
+    def __init__(self, manager, cache_size=256, max_rows=10000, prefetch_limit=32):
+        """Initialize EntityNavigator class.
+
+        Args:
+            manager (rdf.Manager): the rdf manager holding the graph.
+            cache_size (int, optional): maximum number of cached entities. Defaults to 256.
+            max_rows (int, optional): entities with more triples than this are not cached or prefetched. Defaults to 10000.
+            prefetch_limit (int, optional): maximum number of neighbors prefetched after an entity is shown. Defaults to 32.
+        """
+        self.manager = manager
+        self.cache_size = cache_size
+        self.max_rows = max_rows
+        self.prefetch_limit = prefetch_limit
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+        #The graph version when the cache was filled. Cached entities are dropped once a new version is published.
+        self._stamp = None
+
+        #Neighbors are described in the background
+        self._executor = ThreadPoolExecutor(1)
+
+    def parse(self, target):
+        """Get the url of a navigation target.
+
+        Args:
+            target (string): a url in angle brackets, as used by the result links.
+
+        Returns:
+            rdflib.URIRef: the url. None if the target isn't a url.
+        """
+        target = target.strip()
+        if len(target) > 2 and target[0] == '<' and target[-1] == '>':
+            return URIRef(target[1:-1])
+        return None
+
+    def query(self, uri):
+        """Get the SPARQL query equivalent to the description of an entity.
+
+        Args:
+            uri (rdflib.URIRef): url of the entity.
+
+        Returns:
+            string: the query.
+        """
+        target = uri.n3()
+        query0 = 'SELECT (COALESCE(%s) as ?s) ?p ?o WHERE {%s ?p ?o}' % (target, target)
+        query1 = 'SELECT ?s (COALESCE(%s) as ?p) ?o WHERE {?s %s ?o}' % (target, target)
+        query2 = 'SELECT ?s ?p (COALESCE(%s) as ?o) WHERE {?s ?p %s}' % (target, target)
+
+        return 'SELECT ?s ?p ?o WHERE {{%s} UNION {%s} UNION {%s}}' % (query0, query1, query2)
+
+    def describe(self, uri):
+        """Get every triple the entity appears in, as the subject, the predicate or the object.
+
+        Args:
+            uri (rdflib.URIRef): url of the entity.
+
+        Returns:
+            rdflib.query.Result: a SELECT result binding ?s ?p ?o.
+        """
+        triples = self._cached(uri)
+        if triples is None:
+            triples = self._lookup(uri)
+            self._store(uri, triples)
+
+        result = Result('SELECT')
+        result.vars = _VARS
+        result.bindings = [dict(zip(_VARS, triple)) for triple in triples]
+        return result
+
+    def prefetch(self, uri):
+        """Describe the neighbors of an entity in the background, so following one of its links is instant.
+
+        Args:
+            uri (rdflib.URIRef): url of the entity.
+        """
+        self._executor.submit(self._prefetch, uri)
+
+    def clear(self):
+        """Drop all cached entities.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._stamp = None
+
+    def _lookup(self, uri, limit=None):
+        """Look up the triples of an entity in the store, in the order of the equivalent SPARQL query.
+
+        Args:
+            uri (rdflib.URIRef): url of the entity.
+            limit (int, optional): maximum number of triples read from each index. Defaults to None.
+
+        Returns:
+            [(rdflib.term.Node, rdflib.term.Node, rdflib.term.Node)]: the triples.
+        """
+        graph = self.manager.c_graph
+        triples = []
+        for pattern in ((uri, None, None), (None, uri, None), (None, None, uri)):
+            triples.extend(islice(graph.triples(pattern), limit))
+        return triples
+
+    def _cached(self, uri):
+        """Get the cached triples of an entity.
+
+        Args:
+            uri (rdflib.URIRef): url of the entity.
+
+        Returns:
+            [(rdflib.term.Node, rdflib.term.Node, rdflib.term.Node)]: the triples. None if the entity isn't cached.
+        """
+        with self._lock:
+            if self._stamp != self.manager.version:
+                self._cache.clear()
+                self._stamp = self.manager.version
+            triples = self._cache.get(uri)
+            if triples is not None:
+                self._cache.move_to_end(uri)
+            return triples
+
+    def _store(self, uri, triples):
+        """Cache the triples of an entity unless there are too many of them.
+
+        Args:
+            uri (rdflib.URIRef): url of the entity.
+            triples ([(rdflib.term.Node, rdflib.term.Node, rdflib.term.Node)]): the triples.
+        """
+        if len(triples) > self.max_rows:
+            return
+        with self._lock:
+            if self._stamp != self.manager.version:
+                return
+            self._cache[uri] = triples
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _prefetch(self, uri):
+        """Describe the neighbors of an entity. Executed on the prefetch thread.
+
+        Args:
+            uri (rdflib.URIRef): url of the entity.
+        """
+        triples = self._cached(uri)
+        if triples is None:
+            return
+
+        #Subjects and objects linked to the entity. Predicates and classes are shared by too many triples to be worth it.
+        neighbors = []
+        for s, p, o in triples:
+            for node in (s, o):
+                if isinstance(node, URIRef) and node != uri and node not in neighbors and not (node is o and p == RDF.type):
+                    neighbors.append(node)
+        for node in neighbors[:self.prefetch_limit]:
+            if self._cached(node) is not None:
+                continue
+            try:
+                triples = self._lookup(node, self.max_rows + 1)
+            except RuntimeError:
+                #The graph changed while it was read
+                return
+            self._store(node, triples)
+
+class History:
+    """A History class used to go back and forward between visited entries.
+    """
+    def __init__(self):
+        """Initialize History class.
+        """
+        self._entries = []
+        self._position = -1
+
+    def visit(self, entry):
+        """Record a newly visited entry. Entries after the current one are dropped.
+
+        Args:
+            entry (object): the visited entry.
+        """
+        if 0 <= self._position and self._entries[self._position] == entry:
+            return
+        del self._entries[self._position + 1:]
+        self._entries.append(entry)
+        self._position += 1
+
+    def back(self):
+        """Go back to the previous entry.
+
+        Returns:
+            object: the previous entry. None if there is none.
+        """
+        if not self.can_go_back():
+            return None
+        self._position -= 1
+        return self._entries[self._position]
+
+    def forward(self):
+        """Go forward to the next entry.
+
+        Returns:
+            object: the next entry. None if there is none.
+        """
+        if not self.can_go_forward():
+            return None
+        self._position += 1
+        return self._entries[self._position]
+
+    def can_go_back(self):
+        """Check whether there is a previous entry.
+
+        Returns:
+            bool: whether there is a previous entry.
+        """
+        return self._position > 0
+
+    def can_go_forward(self):
+        """Check whether there is a next entry.
+
+        Returns:
+            bool: whether there is a next entry.
+        """
+        return self._position < len(self._entries) - 1
@@ -0,0 +1,359 @@
+from hashlib import sha1
+from .ingest import LocalReader, is_local
+from json import dump, dumps, load
+from os import replace
+from pathlib import Path
+from pickle import dump as dump_pickle, load as load_pickle
+from time import strftime
+
+#Sub graph of each report dataset and the url it is downloaded from by default
+DATASETS = {
+    'arrest-reports': 'https://data.lacity.org/resource/amvf-fr72',
+    'crime-reports': 'https://data.lacity.org/resource/2nrs-mtv8',
+}
+
+class PipelineError(Exception):
+    """Raised when a stage of the pipeline can't be completed.
+    """
+
+class Pipeline:
+    """A Pipeline class used to run the stages of building a graph, keeping the artifact of every stage as a checkpoint.
+
+    Stages and their checkpoints, relative to the checkpoint directory:
+        fetch-<dataset>: raw/<dataset>.csv, the downloaded CSV.
+        normalize-<dataset>: normalized/<dataset>.pkl, the normalized DataFrame.
+        graph: graph/<dataset>.pkl, graph/aggregates.pkl, graph/samples.pkl and graph/columns.pkl, a snapshot of every sub graph, of the aggregate views, of the stratified samples and of the columnar tables.
+
+    A checkpoint is reused while its files are unchanged, it was made with the same url and dataset size, and the upstream checkpoints it was made from weren't rebuilt since. A dataset read from local CSV exports has no fetch and normalize checkpoints, the graph checkpoint is rebuilt when its files change.
+    """
+    def __init__(self, manager, directory='checkpoints', dataset_size=999999999, urls=None, force=False):
+        """Initialize Pipeline class.
+
+        Args:
+            manager (rdf.Manager): the rdf manager the graph is built in.
+            directory (string, optional): directory of the checkpoints. Defaults to 'checkpoints'.
+            dataset_size (int, optional): the maximum of data per dataset to include. Defaults to 999999999.
+            urls ({string: string}, optional): url of each dataset, by sub graph id. Defaults to the urls of DATASETS.
+            force (bool, optional): recompute every stage that runs instead of reusing its checkpoint. Defaults to False.
+        """
+        self.manager = manager
+        self.directory = Path(directory)
+        self.dataset_size = dataset_size
+        self.urls = dict(DATASETS, **(urls or {}))
+        self.force = force
+
+        #Whether the manager holds the graph of the graph checkpoint
+        self._loaded = False
+
+        self.manifest = self._read_manifest()
+
+    def fetch(self):
+        """Download every dataset unless its raw CSV checkpoint is valid.
+        """
+        for dataset in DATASETS:
+            if is_local(self.urls[dataset]):
+                print('INFO: Reading %s from local files, nothing to fetch' % dataset.replace('-', ' '))
+                continue
+            self._raw(dataset, read=False)
+
+    def normalize(self, dataset):
+        """Get the normalized reports of a dataset, from its checkpoint when valid.
+
+        Args:
+            dataset (string): sub graph id such as 'arrest-reports'.
+
+        Returns:
+            DataFrame: the normalized reports.
+        """
+        stage = 'normalize-' + dataset
+        path, = self._paths(stage)
+        if self._reusable(stage):
+            from pandas import read_pickle
+
+            print('INFO: Reusing checkpoint \'%s\'...' % stage)
+            with self.manager.monitor.span('checkpoint-load', stage=stage) as span:
+                reports = read_pickle(path)
+                span.add(rows=len(reports), bytes=path.stat().st_size)
+            return reports
+
+        reports = self._raw(dataset)
+        print('INFO: Processing %s...' % dataset.replace('-', ' '))
+        reports = self.manager._normalize_reports(reports, 'Processing ' + dataset.replace('-', ' '))
+        with self.manager.monitor.span('checkpoint-save', stage=stage) as span:
+            self._write(path, lambda temporary: reports.to_pickle(str(temporary)))
+            span.add(rows=len(reports), bytes=path.stat().st_size)
+        self._record(stage, [path], rows=len(reports))
+        return reports
+
+    def build(self):
+        """Build the graph unless its checkpoint is valid, and snapshot it.
+        """
+        if self._reusable('graph'):
+            print('INFO: Checkpoint \'graph\' is up to date')
+            return
+
+        #Normalized reports are loaded one dataset at a time, so only one of them is held at once
+        self.manager.import_reports(self.dataset_size, self.urls['arrest-reports'], self.urls['crime-reports'], load=lambda dataset, url: self.normalize(dataset))
+
+        paths = self._paths('graph')
+        with self.manager.monitor.span('checkpoint-save', stage='graph') as span:
+            triples = {}
+            for dataset, path in zip(DATASETS, paths):
+                self._write(path, lambda temporary: self.manager.export_snapshot(temporary, dataset))
+                triples[dataset] = len(self.manager.c_graph.get_context(dataset))
+            self._write(paths[-3], lambda temporary: self._dump(temporary, self.manager.aggregates))
+            self._write(paths[-2], lambda temporary: self._dump(temporary, self.manager.samples))
+            self._write(paths[-1], lambda temporary: self._dump(temporary, self.manager.columns))
+            span.add(triples=sum(triples.values()), bytes=sum(path.stat().st_size for path in paths))
+        self._record('graph', paths, triples=triples)
+        self._loaded = True
+
+    def load(self):
+        """Load the graph into the manager, building it first unless its checkpoint is valid.
+        """
+        if self._loaded:
+            return
+        if not self._reusable('graph'):
+            self.build()
+            return
+
+        print('INFO: Reusing checkpoint \'graph\'...')
+        #The graph is published once every dataset and the state derived from it are loaded
+        with self.manager.monitor.span('checkpoint-load', stage='graph') as span, self.manager.transaction():
+            for dataset in DATASETS:
+                self.manager.import_snapshot(self.directory / 'graph' / (dataset + '.pkl'), dataset)
+            with open(self.directory / 'graph' / 'aggregates.pkl', 'rb') as f:
+                self.manager.aggregates = load_pickle(f)
+            with open(self.directory / 'graph' / 'samples.pkl', 'rb') as f:
+                self.manager.samples = load_pickle(f)
+            with open(self.directory / 'graph' / 'columns.pkl', 'rb') as f:
+                self.manager.columns = load_pickle(f)
+
+            #The loaded state was derived from the triples of the snapshots
+            for dataset in DATASETS:
+                self.manager.record_context(dataset)
+            span.add(triples=len(self.manager.c_graph))
+        self._loaded = True
+
+    def stages(self):
+        """Get the state of every checkpoint.
+
+        Returns:
+            [dict]: for each stage in pipeline order, its name, status ('valid', 'stale' or 'missing'), creation time, size in bytes and recorded counts.
+        """
+        states = []
+        for stage in self._stage_names():
+            entry = self.manifest.get(stage)
+            state = {'stage': stage, 'status': 'missing', 'created': None, 'bytes': 0}
+            if entry:
+                state['status'] = 'valid' if self._valid(stage) else 'stale'
+                state['created'] = entry['created']
+                state['bytes'] = sum((self.directory / name).stat().st_size for name in entry['files'] if (self.directory / name).exists())
+                state.update(entry['info'])
+            states.append(state)
+        return states
+
+    def _raw(self, dataset, read=True):
+        """Get the downloaded reports of a dataset, from its checkpoint when valid.
+
+        Args:
+            dataset (string): sub graph id such as 'arrest-reports'.
+            read (bool, optional): read the reports. Leave to False to only make sure the checkpoint is valid. Defaults to True.
+
+        Raises:
+            PipelineError: the reports couldn't be downloaded.
+
+        Returns:
+            DataFrame: the downloaded reports as strings. None if the checkpoint is reused and read is False.
+        """
+        stage = 'fetch-' + dataset
+        path, = self._paths(stage)
+        if self._reusable(stage):
+            print('INFO: Reusing checkpoint \'%s\'...' % stage)
+            if not read:
+                return None
+            with self.manager.monitor.span('checkpoint-load', stage=stage) as span, open(path, encoding='utf-8', newline='') as f:
+                reports = self.manager._reports_from_lines(f)
+                span.add(rows=len(reports), bytes=path.stat().st_size)
+            return reports
+
+        def download(temporary):
+            reports = self.manager._download_csv(self.urls[dataset], self.dataset_size, filename=temporary)
+            if reports is None:
+                raise PipelineError('Unable to download %s from \'%s\'' % (dataset.replace('-', ' '), self.urls[dataset]))
+            return reports
+
+        reports = self._write(path, download)
+        self._record(stage, [path], rows=len(reports))
+        return reports
+
+    def _stage_names(self):
+        """Get the names of all stages in pipeline order.
+
+        Returns:
+            [string]: names of the stages.
+        """
+        return ['fetch-' + dataset for dataset in DATASETS] + ['normalize-' + dataset for dataset in DATASETS] + ['graph']
+
+    def _definition(self, stage):
+        """Get what a checkpoint depends on.
+
+        Args:
+            stage (string): name of the stage.
+
+        Returns:
+            (dict, [string]): the parameters the checkpoint is made with, and the stages it is made from.
+        """
+        if stage == 'graph':
+            #Local sources are part of the parameters, as they have no checkpoint of their own
+            params = {dataset: [self.urls[dataset], self.dataset_size] for dataset in DATASETS}
+            params['sample-rates'] = list(self.manager.samples.rates)
+            params['columnar'] = self.manager.columns is not None
+            for dataset in DATASETS:
+                if is_local(self.urls[dataset]):
+                    files = LocalReader(self.urls[dataset]).files() if Path(self.urls[dataset]).exists() else []
+                    params[dataset].append(self._fingerprint(files, [str(path.resolve()) for path in files]))
+            return params, ['normalize-' + dataset for dataset in DATASETS]
+        kind, dataset = stage.split('-', 1)
+        return {dataset: [self.urls[dataset], self.dataset_size]}, ['fetch-' + dataset] if kind == 'normalize' else []
+
+    def _paths(self, stage):
+        """Get the files of a checkpoint.
+
+        Args:
+            stage (string): name of the stage.
+
+        Returns:
+            [Path]: paths of its files.
+        """
+        if stage == 'graph':
+            return [self.directory / 'graph' / (dataset + '.pkl') for dataset in DATASETS] + [self.directory / 'graph' / name for name in ('aggregates.pkl', 'samples.pkl', 'columns.pkl')]
+        kind, dataset = stage.split('-', 1)
+        return [self.directory / 'raw' / (dataset + '.csv')] if kind == 'fetch' else [self.directory / 'normalized' / (dataset + '.pkl')]
+
+    def _fingerprint(self, paths, names=None):
+        """Fingerprint files by their names, sizes and modification times.
+
+        Args:
+            paths ([Path]): files of a checkpoint, inside the checkpoint directory.
+            names ([string], optional): names of the files. Defaults to their paths relative to the checkpoint directory.
+
+        Returns:
+            string: the fingerprint. None if a file is missing.
+        """
+        if not all(path.exists() for path in paths):
+            return None
+        return sha1(dumps([(name, path.stat().st_size, path.stat().st_mtime_ns) for name, path in zip(names or self._names(paths), paths)]).encode('utf-8')).hexdigest()
+
+    def _names(self, paths):
+        """Get the names of checkpoint files as recorded in the manifest.
+
+        Args:
+            paths ([Path]): files inside the checkpoint directory.
+
+        Returns:
+            [string]: their paths relative to the checkpoint directory.
+        """
+        return [path.relative_to(self.directory).as_posix() for path in paths]
+
+    def _valid(self, stage):
+        """Check whether a checkpoint can be reused.
+
+        Args:
+            stage (string): name of the stage.
+
+        Returns:
+            bool: True if its files are unchanged, its parameters match and none of its upstream checkpoints were rebuilt since.
+        """
+        entry = self.manifest.get(stage)
+        if not entry:
+            return False
+        params, upstream = self._definition(stage)
+        paths = self._paths(stage)
+        if entry['params'] != params or entry['files'] != self._names(paths) or self._fingerprint(paths) != entry['fingerprint']:
+            return False
+
+        #A deleted upstream checkpoint doesn't invalidate the checkpoints made from it, a rebuilt one does
+        return all(name not in self.manifest or self.manifest[name]['fingerprint'] == entry['inputs'].get(name) for name in upstream)
+
+    def _reusable(self, stage):
+        """Check whether a stage can be skipped.
+
+        Args:
+            stage (string): name of the stage.
+
+        Returns:
+            bool: True if its checkpoint is valid and the pipeline isn't forced.
+        """
+        return not self.force and self._valid(stage)
+
+    def _record(self, stage, paths, **info):
+        """Record a written checkpoint in the manifest.
+
+        Args:
+            stage (string): name of the stage.
+            paths ([Path]): files of the checkpoint.
+            **info: counts shown by stages, such as rows or triples.
+        """
+        params, upstream = self._definition(stage)
+        self.manifest[stage] = {
+            'params': params,
+            'inputs': {name: self.manifest[name]['fingerprint'] for name in upstream if name in self.manifest},
+            'files': self._names(paths),
+            'fingerprint': self._fingerprint(paths),
+            'created': strftime('%Y-%m-%dT%H:%M:%S'),
+            'info': info,
+        }
+        self._write(self.directory / 'manifest.json', lambda temporary: self._dump_manifest(temporary))
+
+    def _read_manifest(self):
+        """Read the manifest of the checkpoint directory.
+
+        Returns:
+            dict: the entry of every recorded checkpoint by stage. Empty if there is no readable manifest.
+        """
+        try:
+            with open(self.directory / 'manifest.json', encoding='utf-8') as f:
+                return load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _dump_manifest(self, filename):
+        """Write the manifest.
+
+        Args:
+            filename (Path): path to the manifest file.
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            dump(self.manifest, f, indent=2)
+
+    def _dump(self, filename, value):
+        """Pickle a part of the graph checkpoint, such as the aggregate views.
+
+        Args:
+            filename (Path): path to the file.
+            value (object): the pickled object.
+        """
+        with open(filename, 'wb') as f:
+            dump_pickle(value, f)
+
+    def _write(self, path, write):
+        """Write a file next to its destination and rename it, so an interrupted stage never leaves a partial checkpoint.
+
+        Args:
+            path (Path): destination of the file.
+            write (function): called with the temporary path to write to.
+
+        Returns:
+            object: the value returned by write.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(path.name + '.tmp')
+        try:
+            value = write(temporary)
+            if temporary.exists():
+                replace(temporary, path)
+            return value
+        finally:
+            if temporary.exists():
+                temporary.unlink()
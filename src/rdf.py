@@ -1,29 +1,150 @@
-from contextlib import closing
-from csv import reader, writer
+from .aggregate import AggregateViews, AGGREGATE_CONTEXT
+from .algebra import describe_query
+from .budget import MemoryBudget, MemoryBudgetExceeded, StagingFile
+from .columnar import ColumnarTables
+from .fanout import FanOut
+from csv import reader
 from hashlib import md5
+from .ingest import LocalReader, PORTAL_NAMESPACE, is_local, normalize_column
+from itertools import repeat
 from .monitor import Monitor
-from pandas import DataFrame, read_csv
+from .results import format_from_filename, write_result
+from .sample import StratifiedSamples
+from contextlib import contextmanager
 from pathlib import Path
+from pickle import dump, load, HIGHEST_PROTOCOL
+from pyparsing import ParseBaseException
 from rdflib import Graph, Literal, Namespace, URIRef, ConjunctiveGraph
-from rdflib.plugins.sparql import prepareQuery
-from rdflib.namespace import RDFS, RDF, XSD
-from requests import exceptions, Session
+from rdflib.namespace import RDF, XSD
+from rdflib.plugins.sparql.sparql import SPARQLError
+from .versions import Cancelled, ContextStore, GraphVersion, GraphVersions
 
 class Manager:
     """A Manager class used to manage context-aware rdf graph.
+
+    The graph is versioned. Queries read the version that was current when they started, while imports build the next version and publish it once complete.
     """
-    def __init__(self):
+    def __init__(self, memory_budget=None, sample_rates=(0.01,), columnar=False):
         """Initialize Manager class.
-        """
-        #Create Conjunctive Graph to store all other graphs
-        self.c_graph = ConjunctiveGraph()
 
+        Args:
+            memory_budget (float, optional): the maximum resident memory in MB while reports are imported. Defaults to None, no limit.
+            sample_rates ((float), optional): rates of the stratified samples of imported reports approximate queries are answered from. Defaults to (0.01,).
+            columnar (bool, optional): keep imported reports as columnar tables, and answer queries over one dataset from them. Defaults to False.
+        """
         #Initialize the monitor class to print progress
         self.monitor = Monitor()
 
+        #Create the first version of the graph. It holds the Conjunctive Graph storing all other graphs, the materialized aggregate views over imported reports, their stratified samples used by approximate queries and their columnar tables, when enabled.
+        self._versions = GraphVersions(GraphVersion(0, ConjunctiveGraph(ContextStore()), AggregateViews(), StratifiedSamples(sample_rates), ColumnarTables() if columnar else None), self.monitor)
+
         #Initialize a list to store all imported rdf files
         self.files=[]
 
+        #Initialize the parallel evaluator used by fan-out queries
+        self.fanout = FanOut()
+
+        #Memory budget of report imports, and the budget enforced by the running import
+        self.memory_budget = memory_budget
+        self._budget = None
+
+    @property
+    def c_graph(self):
+        """rdflib.ConjunctiveGraph: the graph of the version seen by the running thread."""
+        return self._versions.visible().c_graph
+
+    @property
+    def aggregates(self):
+        """aggregate.AggregateViews: the aggregate views of the version seen by the running thread."""
+        return self._versions.visible().aggregates
+
+    @aggregates.setter
+    def aggregates(self, aggregates):
+        self._versions.building().aggregates = aggregates
+
+    @property
+    def samples(self):
+        """sample.StratifiedSamples: the stratified samples of the version seen by the running thread."""
+        return self._versions.visible().samples
+
+    @samples.setter
+    def samples(self, samples):
+        self._versions.building().samples = samples
+
+    @property
+    def columns(self):
+        """columnar.ColumnarTables: the columnar tables of the version seen by the running thread. None when disabled."""
+        return self._versions.visible().columns
+
+    @columns.setter
+    def columns(self, columns):
+        self._versions.building().columns = columns
+
+    @property
+    def version(self):
+        """int: the number of the version seen by the running thread."""
+        return self._versions.visible().number
+
+    def pin (self):
+        """Pin the current version of the graph, so every query of the block reads the same version even if imports publish new ones meanwhile. Queries pin the version they read by themselves.
+
+        Returns:
+            contextmanager: yields the pinned versions.GraphVersion.
+        """
+        return self._versions.pin()
+
+    @contextmanager
+    def transaction (self, cancelled=None):
+        """Apply the changes of the block, such as imports, to the next version of the graph, and publish it when the block exits. The next version starts as a copy of the current one, which is still queried while the block runs. Nothing is published if the block raises.
+
+        Imports open their own transaction, so a transaction is only needed to publish several changes at once.
+
+        Args:
+            cancelled (function, optional): checked before the version is published, returns True to discard it. Defaults to None.
+
+        Raises:
+            versions.Cancelled: the transaction was cancelled, and nothing was published.
+
+        Returns:
+            contextmanager: yields the versions.GraphVersion being built.
+        """
+        with self._versions.build(cancelled) as version:
+            yield version
+
+    def get_versions (self):
+        """Get the state of the versions of the graph.
+
+        Returns:
+            dict: the number of the current version, its readers, the number of replaced versions still read, and of published and released versions.
+        """
+        return self._versions.stats()
+
+    def remove_context (self, id):
+        """Remove a sub graph together with its aggregate views, samples and columns, and publish the graph without it.
+
+        Args:
+            id (string): name of the sub graph.
+        """
+        with self.transaction():
+            #Removing the graph from the store also stops it being listed by contexts()
+            self.c_graph.store.remove_graph(self.c_graph.get_context(id))
+            self.aggregates.remove(id)
+            self.samples.remove(id)
+            if self.columns is not None:
+                self.columns.remove(id)
+
+    def record_context (self, id):
+        """Record that the state derived from a sub graph, such as its aggregate views, samples and columns, describes its current triples. The state is only used to answer queries until the sub graph changes.
+
+        Args:
+            id (string): name of the sub graph.
+        """
+        revision = self.c_graph.store.revision(id)
+        self.aggregates.record(id, revision)
+        self.samples.record(id, revision)
+        if self.columns is not None:
+            self.columns.record(id, revision)
+
     def get_context_id (self):
         """Get id(name) of all rdf sub-graphs.
 
@@ -31,8 +152,11 @@ class Manager:
             string: id of all rdf sub-graphs.
         """
         ids = []
-        for context in self.c_graph.contexts():
-            ids.append(str(context.identifier))
+        with self.pin():
+            for context in self.c_graph.contexts():
+                ids.append(str(context.identifier))
+            if self.aggregates.names():
+                ids.append(AGGREGATE_CONTEXT)
         return ids
         
     def get_namespace (self):
@@ -43,100 +167,264 @@ class Manager:
         """
         return list(self.c_graph.namespaces())
 
-    def query (self, query, id=None):
+    def query (self, query, id=None, parallel=False, approximate=False):
         """Query rdf graphs using SPARQL.
 
         Args:
             query (SPARQL string): SPARQL statments used to query the graph.
             id (string, optional): Name of sub graphs to query. Leave to None if entire rdf graph should be query. Defaults to None.
+            parallel (bool, optional): Fan the query out over worker processes when its shape allows it. Defaults to False.
+            approximate (bool|float, optional): Estimate COUNT and SUM aggregates from a stratified sample when the query shape allows it. See execute. Defaults to False.
 
         Returns:
-            list of resources: a list of resources that met the SPARQL statments.
+            list of resources: a list of resources that met the SPARQL statments. Statments that can't be parsed or evaluated are logged and give an empty list.
         """
         print("INFO: Querying rdf graph with SPARQL statment \'%s\'..." % str(query))
-        self.monitor.start(mode=1)
+        self.monitor.start(mode=1, desc='Querying')
         result = []
-        try:
-            if id:
-                result = list(self.c_graph.get_context(id).query(query))
-            else:
-                result = list(self.c_graph.query(query))
-        except:
-            pass
-        
-        #Convert all values from URIRef and Literal to string
-        for i in range(len(result)):
-            result[i] = list(result[i])
-            for j in range(len(result[i])):
-                    result[i][j] = str(result[i][j])
+        with self.monitor.span('query') as span, self.pin():
+            try:
+                result = list(self.execute(query, id, parallel, approximate))
+            except (ParseBaseException, SPARQLError) as e:
+                print('ERROR: Unable to evaluate the SPARQL statment: %s' % (e))
+
+            #Convert all values from URIRef and Literal to string
+            result = [[str(value) for value in row] for row in result]
+            span.add(rows=len(result))
         
         self.monitor.stop()
 
         return result           
 
-    def import_file (self, filename):
+    def execute (self, query, id=None, parallel=False, approximate=False):
+        """Evaluate a SPARQL query and return the raw rdflib result. Queries matching an aggregate view are answered from the view, and queries mapping onto the columnar tables from the tables.
+
+        Args:
+            query (SPARQL string): SPARQL statments used to query the graph.
+            id (string, optional): Name of sub graphs to query. Leave to None if entire rdf graph should be query. Defaults to None.
+            parallel (bool, optional): Evaluate top-level UNION branches or GRAPH ?g sub-graphs in separate worker processes and merge their results. Only applies when id is None. Defaults to False.
+            approximate (bool|float, optional): Estimate COUNT and SUM aggregates from the stratified sample of the given rate, or of the smallest rate if True. Each estimated variable ?x is followed by the bounds ?x_lower and ?x_upper of its confidence interval. Estimable queries answered exactly, such as from an aggregate view, get bounds equal to the exact value. Other queries are evaluated exactly. Defaults to False.
+
+        Returns:
+            rdflib.query.Result: result of the query.
+        """
+        #Every step reads the version pinned at the start, so a result never mixes versions
+        with self.pin():
+            if id == AGGREGATE_CONTEXT:
+                return self.aggregates.to_graph().query(query)
+
+            shape = describe_query(query, dict(self.c_graph.namespaces()))
+            result = self.aggregates.answer(shape, self.c_graph, id)
+
+            if result is None and self.columns is not None:
+                result = self.columns.answer(shape, self.c_graph, id)
+
+            if result is None and approximate:
+                estimate = self.samples.answer(shape, self.c_graph, id, None if approximate is True else approximate)
+                if estimate is not None:
+                    return estimate
+                print('INFO: Query can\'t be estimated from a sample, evaluating it exactly...')
+
+            if result is None and parallel and not id:
+                result = self.fanout.execute(shape, self.c_graph)
+
+            if result is None:
+                prepared = shape.prepared if shape else query
+                result = self.c_graph.get_context(id).query(prepared) if id else self.c_graph.query(prepared)
+
+            #Exact answers of an approximate query get bounds equal to their value, so its variables don't depend on the path answering it
+            return self.samples.bound(shape, result) if approximate else result
+
+    def export_query (self, query, filename, format=None, id=None, approximate=False):
+        """Evaluate a SPARQL query and stream its result to a file without converting rows to python lists.
+
+        Args:
+            query (SPARQL string): SPARQL statments used to query the graph.
+            filename (string): path to the result file.
+            format (string, optional): one of 'csv', 'tsv', 'json' or 'xml'. Leave to None to use the file extension. Defaults to None.
+            id (string, optional): Name of sub graphs to query. Leave to None if entire rdf graph should be query. Defaults to None.
+            approximate (bool|float, optional): Estimate COUNT and SUM aggregates from a stratified sample when the query shape allows it. See execute. Defaults to False.
+
+        Returns:
+            int: the number of rows written.
+        """
+        path = Path(filename).absolute()
+        format = format or format_from_filename(path)
+        print("INFO: Exporting result of SPARQL statment \'%s\' to \'%s\'..." % (str(query), path))
+        self.monitor.start(mode=1, desc='Exporting results')
+        try:
+            with self.monitor.span('export-query', format=format) as span, self.pin(), open(path, 'wb') as f:
+                rows = write_result(self.execute(query, id, approximate=approximate), f, format)
+                span.add(rows=rows, bytes=f.tell())
+                return rows
+        finally:
+            self.monitor.stop()
+
+    def get_aggregate (self, view, id):
+        """Get the counts of a materialized aggregate view.
+
+        Args:
+            view (string): name of the view such as 'area-name', 'charge-group', 'crime-code', 'weapon', 'premise', 'victim-descent' or 'month'.
+            id (string): name of the sub graph the view belongs to.
+
+        Returns:
+            [(string, int)]: a list of (key, count) tuples sorted by count.
+        """
+        return self.aggregates.get(view, id)
+
+    def get_aggregate_names (self):
+        """Get names of all materialized aggregate views.
+
+        Returns:
+            [(string, string)]: a list of (sub graph id, view name) tuples.
+        """
+        return self.aggregates.names()
+
+    def import_file (self, filename, cancelled=None):
         """Import rdf graph from files. Must be XML formatted. The subgraph id will be based on filename.
 
         Args:
             filename (string): path to rdf file.
+            cancelled (function, optional): checked before the graph is published, returns True to discard the import. Defaults to None.
+
+        Raises:
+            versions.Cancelled: the import was cancelled, and nothing was published.
         """
         print("INFO: Importing rdf graph from \'%s\'..." % str(filename))
-        self.monitor.start(mode=1)
+        self.monitor.start(mode=1, desc='Importing')
         try:
             path = Path(filename).resolve()
             if path.exists():
                 id = path.stem
-                self.c_graph.parse(source=str(path), format='xml', publicID=id)
+                with self.monitor.span('import-file') as span, self.transaction(cancelled):
+                    #Triples are counted in the sub graph being imported, the union would have to be scanned
+                    graph = self.c_graph.get_context(id)
+                    triples = len(graph)
+                    self.c_graph.parse(source=str(path), format='xml', publicID=id)
+                    span.add(triples=len(graph) - triples, bytes=path.stat().st_size)
                 return True, path
             else:
                 return False, filename
+        except Cancelled:
+            raise
         except:
             return False, filename
         finally:
             self.monitor.stop()
 
-    def export_file (self, filename, id=None):
+    def import_snapshot (self, filename, id, cancelled=None):
+        """Import a sub graph from a snapshot written by export_snapshot.
+
+        Args:
+            filename (string): path to the snapshot file.
+            id (string): name of the sub graph the triples are added to.
+            cancelled (function, optional): checked before the graph is published, returns True to discard the import. Defaults to None.
+
+        Raises:
+            versions.Cancelled: the import was cancelled, and nothing was published.
+
+        Returns:
+            int: the number of triples imported.
+        """
+        path = Path(filename)
+        print("INFO: Importing snapshot of \'%s\' rdf sub-graph from \'%s\'..." % (id, path))
+        self.monitor.start(mode=1, desc='Importing')
+        try:
+            with self.monitor.span('import-snapshot', dataset=id) as span, self.transaction(cancelled), open(path, 'rb') as f:
+                snapshot = load(f)
+                for prefix, namespace in snapshot['namespaces']:
+                    self.c_graph.bind(prefix, namespace)
+                graph = Graph(store=self.c_graph.store, identifier=id)
+                graph.addN((s, p, o, graph) for s, p, o in snapshot['triples'])
+                self.monitor.update(len(snapshot['triples']))
+                span.add(triples=len(snapshot['triples']), bytes=path.stat().st_size)
+                return len(snapshot['triples'])
+        finally:
+            self.monitor.stop()
+
+    def export_snapshot (self, filename, id):
+        """Export a sub graph to a snapshot file. A snapshot holds the pickled triples and namespaces of the graph, and imports several times faster than parsing rdf.
+
+        Args:
+            filename (string): path to the snapshot file.
+            id (string): name of the sub graph to export.
+        """
+        path = Path(filename)
+        with self.monitor.span('export-snapshot', dataset=id) as span, self.pin():
+            graph = self.c_graph.get_context(id)
+            with open(path, 'wb') as f:
+                dump({'namespaces': [(prefix, str(namespace)) for prefix, namespace in self.c_graph.namespaces()], 'triples': list(graph)}, f, protocol=HIGHEST_PROTOCOL)
+            span.add(triples=len(graph), bytes=path.stat().st_size)
+
+    def export_file (self, filename, id=None, format='pretty-xml'):
         """Expoert rdf graph or subgraph to file. Provide id to specify the sub graph to export. 
 
         Args:
             filename (string): path to rdf file.
             id (string, optional): Name of sub graphs to export. Leave to None if entire rdf graph should be exported . Defaults to None.
+            format (string, optional): rdflib serialization format such as 'pretty-xml', 'xml', 'turtle', 'nt' or 'nquads'. Defaults to 'pretty-xml'.
         """
         path = Path(filename).absolute()
         if not id:
             print("INFO: Exporting full rdf graph to \'%s\'..." % str(path))
-            self.monitor.start(mode=1)
-            self.c_graph.serialize(destination=filename, format='pretty-xml')
+            self.monitor.start(mode=1, desc='Exporting')
+            with self.monitor.span('export-file', format=format) as span, self.pin():
+                self.c_graph.serialize(destination=filename, format=format)
+                span.add(triples=len(self.c_graph), bytes=Path(filename).stat().st_size)
             self.monitor.stop()
         else:
             print("INFO: Exporting \'%s\' rdf sub-graph to \'%s\'..." % (id, path))
-            self.monitor.start(mode=1)
-            for g in self.c_graph.contexts():
-                if str(g.identifier) == id:
-                    g.serialize(destination=filename, format='pretty-xml')
+            self.monitor.start(mode=1, desc='Exporting')
+            with self.monitor.span('export-file', dataset=id, format=format) as span, self.pin():
+                for g in self.c_graph.contexts():
+                    if str(g.identifier) == id:
+                        g.serialize(destination=filename, format=format)
+                        span.add(triples=len(g), bytes=Path(filename).stat().st_size)
             self.monitor.stop()
     
-    def import_reports(self, dataset_size):
-        """Import arrest reports and crime reports from the web.
+    def import_reports(self, dataset_size, arrest_reports_url='https://data.lacity.org/resource/amvf-fr72', crime_reports_url='https://data.lacity.org/resource/2nrs-mtv8', load=None, workers=None, cancelled=None):
+        """Import arrest reports and crime reports from the web or from local CSV exports.
 
         Args:
             dataset_size (int): the maximum of data per dataset to include.
+            arrest_reports_url (str, optional): url of arrest reports, or a local CSV file, gzip-compressed CSV file or directory of such files. Defaults to 'https://data.lacity.org/resource/amvf-fr72'.
+            crime_reports_url (str, optional): url of crime reports, or a local CSV file, gzip-compressed CSV file or directory of such files. Defaults to 'https://data.lacity.org/resource/2nrs-mtv8'.
+            load (function, optional): called with a sub graph id such as 'arrest-reports' and the url of its reports, returns the normalized reports, such as from a checkpoint. Local sources are always read. Leave to None to download and normalize the reports. Defaults to None.
+            workers (int, optional): number of processes parsing local files. Defaults to the number of cores.
+            cancelled (function, optional): checked before the graph is published, returns True to discard the import. Defaults to None.
+
+        Raises:
+            MemoryBudgetExceeded: the import doesn't fit in the memory budget.
+            versions.Cancelled: the import was cancelled, and nothing was published.
         """
-        self._import_arrest_reports(dataset_size=dataset_size)
-        self._import_crime_reports(dataset_size=dataset_size)
-
-    def _download_csv(self, url, dataset_size):
+        #Both datasets are published in one version, so queries never see the reports of only one of them
+        with self.monitor.span('import-reports', size=dataset_size), self.transaction(cancelled):
+            self._budget = MemoryBudget(self.memory_budget) if self.memory_budget else None
+            if self._budget and not self._budget.measurable():
+                print('INFO: Memory budget ignored, resident memory can\'t be measured on this platform')
+                self._budget = None
+            try:
+                self._import_arrest_reports(url=arrest_reports_url, dataset_size=dataset_size, load=load, workers=workers)
+                self._import_crime_reports(url=crime_reports_url, dataset_size=dataset_size, load=load, workers=workers)
+            finally:
+                self._budget = None
+
+    def _download_csv(self, url, dataset_size, filename=None):
         """Download data from a given url and convert such data to DataFrame.
 
         Args:
             url (str): url where dataset located.
             dataset_size (int): the amount of data should be downloaded.
+            filename (str, optional): file the downloaded CSV is also written to. Defaults to None.
 
         Returns:
             DataFrame: a dataframe contains all data from a given url.
         """
+        #requests is only needed for web ingest, so it is imported on first use
+        from requests import Session
+
         try:
-            with Session() as sess:
+            with Session() as sess, self.monitor.span('download', url=url) as span:
 
                 #Determine how many data should be downloaded
                 available_dataset_size = int(sess.get(url+".json?$query=SELECT COUNT(*)").json()[0]["COUNT"])
@@ -145,48 +433,263 @@ class Manager:
                 print('INFO: Downloading %s data from \'%s\'...' %(nums_data_to_download, url))
 
                 #Download data
-                self.monitor.start(total=nums_data_to_download)
+                self.monitor.start(total=nums_data_to_download, desc='Downloading')
 
                 response = sess.get(url+".csv?$limit="+str(nums_data_to_download),stream=True)
 
                 l = []
                 for line in response.iter_lines():
                     l.append(line.decode('utf-8'))
+                    span.add(bytes=len(line) + 1)
                     self.monitor.update()
+                    if self._budget and not len(l) % 10000:
+                        self._budget.check('downloading \'%s\'' % url)
+
+                if filename:
+                    with open(filename, 'w', encoding='utf-8', newline='') as f:
+                        f.writelines(line + '\n' for line in l)
 
-                df = DataFrame(reader(l, delimiter=','))
-                df.columns=df.iloc[0]
-                df = df[1:]
+                df = self._reports_from_lines(l)
+
+                #Free the raw lines
+                del l
+                span.add(rows=len(df))
 
                 self.monitor.stop()
 
                 return df
 
+        except MemoryBudgetExceeded:
+            raise
         except Exception as e:
             print('ERROR: %s' % (e))
     
-    def _import_arrest_reports (self, url = 'https://data.lacity.org/resource/amvf-fr72', dataset_size=9999999999):
-        """Import arrest reports from the web.
+    def _reports_from_lines (self, lines):
+        """Convert CSV lines to a DataFrame of strings. The first line is the header.
+
+        Args:
+            lines (iterable): lines of a CSV file.
+
+        Returns:
+            DataFrame: a dataframe with one string column per CSV column.
+        """
+        #pandas is only needed for report ingest, so it is imported on first use
+        from pandas import DataFrame
+
+        #Blank lines, such as a line break split across downloaded chunks, aren't reports
+        df = DataFrame(row for row in reader(lines, delimiter=',') if row)
+        df.columns=df.iloc[0]
+        return df[1:]
+
+    def _normalize_reports (self, reports, desc):
+        """Normalize downloaded reports. Every value is converted to an upper case string with single spaces.
+
+        Args:
+            reports (DataFrame): downloaded reports.
+            desc (string): description of the stage shown by the monitor.
+
+        Returns:
+            DataFrame: the normalized reports.
+        """
+        with self.monitor.span('normalize') as span:
+            span.add(rows=len(reports))
+            self.monitor.start(total=reports.shape[1], unit_scale=int(reports.shape[0]/reports.shape[1]),mode=2, desc=desc)
+            return reports.progress_apply(normalize_column)
+
+    def _read_local (self, source, dataset_size, workers=None):
+        """Read and normalize reports from local CSV exports in parallel.
+
+        Args:
+            source (str): a CSV file, a gzip-compressed CSV file or a directory of such files.
+            dataset_size (int): the maximum of data to include.
+            workers (int, optional): number of worker processes. Defaults to the number of cores.
+
+        Returns:
+            generator: DataFrames of normalized reports, in file order.
+        """
+        local = LocalReader(source, workers)
+        span = self.monitor.open_span('read-local', source=str(source), workers=local.workers)
+        try:
+            chunks = local.chunks(dataset_size)
+            while True:
+                rows, size = local.rows, local.bytes
+                with span.running():
+                    reports = next(chunks, None)
+                span.add(rows=local.rows - rows, bytes=local.bytes - size)
+                if reports is None:
+                    break
+                yield reports
+        finally:
+            self.monitor.close_span(span)
+
+    def _add_quads (self, graph, batches):
+        """Add batches of quads to the store.
+
+        Args:
+            graph (rdflib.Graph): the sub graph the quads are added to.
+            batches (iterable): lists of (subject, predicate, object, graph) quads.
+
+        Returns:
+            StagingFile: the quads spilled to disk near the memory budget, to be loaded with _load_staging. None if nothing was spilled.
+        """
+        #Batches are generated lazily, so generating and adding them are measured block by block
+        generate, add = self.monitor.open_span('triples'), self.monitor.open_span('add')
+        staging = spill = None
+        try:
+            batches = iter(batches)
+            while True:
+                with generate.running():
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                generate.add(triples=len(batch))
+
+                #Near the memory budget, every following batch is spilled instead of growing the store
+                if staging is None and self._budget and self._budget.near():
+                    print('INFO: Memory budget nearly reached, spilling triples to disk...')
+                    staging, spill = StagingFile(), self.monitor.open_span('spill')
+                if staging:
+                    size = staging.size
+                    with spill.running():
+                        staging.write(batch)
+                    spill.add(triples=len(batch), bytes=staging.size - size)
+                else:
+                    with add.running():
+                        graph.addN(batch)
+                    add.add(triples=len(batch))
+                self.monitor.update(len(batch))
+
+                if self._budget:
+                    self._budget.check('adding triples to the graph')
+        except BaseException:
+            if staging:
+                staging.close()
+            raise
+        finally:
+            if spill:
+                self.monitor.close_span(spill)
+            self.monitor.close_span(add)
+            self.monitor.close_span(generate)
+        return staging
+
+    def _load_staging (self, graph, staging):
+        """Bulk-load quads spilled by _add_quads, once the intermediate data of the import is freed.
 
         Args:
-            url (str, optional): url of arrest reports. Defaults to 'https://data.lacity.org/resource/amvf-fr72'.
+            graph (rdflib.Graph): the sub graph the quads are added to.
+            staging (StagingFile): the spilled quads. Nothing is loaded if None.
+        """
+        if staging is None:
+            return
+        try:
+            with self.monitor.span('load-staged') as span:
+                print('INFO: Loading %s spilled triples...' % staging.triples)
+                span.add(triples=staging.triples, bytes=staging.size)
+                staging.load(graph, self._budget)
+        finally:
+            staging.close()
+
+    def _report_quads (self, quads, reports, namespace, graph):
+        """Generate the quads of reports, and update the aggregate views and samples with them. Under a memory budget the reports are converted chunk by chunk, so only the terms of one chunk are held at once.
+
+        Args:
+            quads (function): _arrest_report_quads or _crime_report_quads.
+            reports (iterable): DataFrames of normalized reports, such as the chunks of a local source.
+            namespace (rdflib.Namespace): namespace of the generated resources.
+            graph (rdflib.Graph): the sub graph the quads belong to.
+
+        Returns:
+            generator: lists of (subject, predicate, object, graph) quads.
+        """
+        for part in reports:
+            #Update aggregate views with the new reports
+            with self.monitor.span('aggregate'):
+                self.aggregates.update(str(graph.identifier), namespace, part)
+
+            #Sample the new reports, through the same mapping
+            with self.monitor.span('sample') as span:
+                span.add(triples=self.samples.update(str(graph.identifier), namespace, part, quads))
+
+            #Keep the new reports as columns
+            if self.columns is not None:
+                with self.monitor.span('columns') as span:
+                    self.columns.update(str(graph.identifier), namespace, part)
+                    span.add(rows=len(part))
+
+            if not self._budget:
+                yield from quads(part, namespace, graph)
+                continue
+            for chunk in self._budget.chunks(part):
+                yield from quads(chunk, namespace, graph)
+
+    def _statements (self, subjects, predicate, objects, graph):
+        """Pair subjects with objects through one predicate.
+
+        Args:
+            subjects (iterable): subjects of the quads.
+            predicate (rdflib.URIRef): predicate of the quads, created once rather than for every subject.
+            objects (iterable): objects of the quads, one per subject.
+            graph (rdflib.Graph): the sub graph the quads belong to.
+
+        Returns:
+            list: (subject, predicate, object, graph) quads.
+        """
+        return [(s, predicate, o, graph) for s, o in zip(subjects, objects)]
+
+    def _import_arrest_reports (self, url = 'https://data.lacity.org/resource/amvf-fr72', dataset_size=9999999999, load=None, workers=None):
+        """Import arrest reports from the web or from local CSV exports.
+
+        Args:
+            url (str, optional): url of arrest reports, or a local CSV file, gzip-compressed CSV file or directory of such files. Defaults to 'https://data.lacity.org/resource/amvf-fr72'.
             dataset_size (int, optional): the maximum of data per dataset to include. Defaults to 9999999999.
+            load (function, optional): returns the normalized reports instead of downloading them. See import_reports. Defaults to None.
+            workers (int, optional): number of processes parsing local files. Defaults to the number of cores.
         """
+        with self.monitor.span('import', dataset='arrest-reports'):
+            local = is_local(url)
+            if local:
+                #Local exports are parsed in parallel, and each chunk is added to the graph as soon as it is parsed
+                print('INFO: Reading arrest reports from \'%s\'...' % url)
+                arrest_reports = self._read_local(url, dataset_size, workers)
+            elif load:
+                arrest_reports = [load('arrest-reports', url)]
+            else:
+                #Download dataset
+                arrest_reports = self._download_csv(url, dataset_size)
 
-        #Download dataset
-        arrest_reports = self._download_csv(url, dataset_size)
+                #Format dataset
+                print('INFO: Processing arrest reports...')
+                arrest_reports = [self._normalize_reports(arrest_reports, 'Processing arrest reports')]
 
-        #Format dataset
-        print('INFO: Processing arrest reports...')
-        self.monitor.start(total=arrest_reports.shape[1], unit_scale=int(arrest_reports.shape[0]/arrest_reports.shape[1]),mode=2)
-        arrest_reports = arrest_reports.progress_apply(lambda x: x.astype(str).str.upper().replace(' +', ' ', regex=True))
+            #Import dataset to graph
+            print('INFO: Adding arrest reports to graph...')
+            namespace = Namespace(PORTAL_NAMESPACE if local else url.split('resource')[0])
 
-        #Import dataset to graph
-        print('INFO: Adding arrest reports to graph...')
-        namespace = Namespace(url.split('resource')[0])
+            self.monitor.start(mode=1, desc='Adding arrest reports')
 
-        self.monitor.start(mode=1)
+            #Add data to a rdf graph
+            graph = Graph(store=self.c_graph.store, identifier='arrest-reports')
+            graph.bind('ns1', namespace)
+            staging = self._add_quads(graph, self._report_quads(self._arrest_report_quads, arrest_reports, namespace, graph))
 
+            #Free the reports before spilled quads are loaded
+            del arrest_reports
+            self._load_staging(graph, staging)
+            self.record_context(str(graph.identifier))
+
+            self.monitor.stop()
+
+    def _arrest_report_quads (self, arrest_reports, namespace, graph):
+        """Generate the quads of normalized arrest reports, one batch per predicate.
+
+        Args:
+            arrest_reports (DataFrame): normalized arrest reports.
+            namespace (rdflib.Namespace): namespace of the generated resources.
+            graph (rdflib.Graph): the sub graph the quads belong to.
+
+        Returns:
+            generator: lists of (subject, predicate, object, graph) quads.
+        """
         #Convert data to rdf literals or URIRefs
         reports = ('Report-'+ arrest_reports['rpt_id'].apply(lambda x : md5(x.encode('utf-8')).hexdigest())).apply(lambda x : namespace[x])
         persons = ('Person-'+ (arrest_reports['age']+arrest_reports['sex_cd']+arrest_reports['descent_cd']).apply(lambda x : md5(x.encode('utf-8')).hexdigest())).apply(lambda x : namespace[x])
@@ -225,72 +728,98 @@ class Manager:
         booking_locations = arrest_reports['bgk_location'].apply(lambda x : Literal(x, datatype=XSD.string))
         booking_codes = arrest_reports['bkg_loc_cd'].apply(lambda x : Literal(x, datatype=XSD.integer))
 
-        #Add data to a rdf graph
-        graph = Graph(store=self.c_graph.store, identifier='arrest-reports')
-        graph.bind('ns1', namespace)
-
-        graph.addN([(s, RDF.type, namespace['ArrestReport'], graph) for s in reports])
-
-        graph.addN([(s, namespace['hasID'], o, graph) for s,o in zip(reports, ids)])
-        graph.addN([(s, namespace['hasDateTime'], o, graph) for s, o in zip(reports, dateTimes)])
-        graph.addN([(s, namespace['hasReporType'], o, graph) for s, o in zip(reports, report_types)])
-        graph.addN([(s, namespace['hasArrestType'], o, graph) for s, o in zip(reports, arrest_types)])
-        graph.addN([(s, namespace['hasDispositionDescription'], o, graph) for s, o in zip(reports, disposition_descriptions)])
-
-        graph.addN([(s, namespace['hasPerson'], o, graph) for s, o in zip(reports, persons)])
-        graph.addN([(s, namespace['hasLocation'], o, graph) for s, o in zip(reports, locations)])
-        graph.addN([(s, namespace['hasCharge'], o, graph) for s, o in zip(reports, charges)])
-        graph.addN([(s, namespace['hasBooking'], o, graph) for s, o in zip(reports, bookings)])
-
-        graph.addN([(s, RDF.type, namespace['Person'], graph) for s in persons])
-        graph.addN([(s, namespace['hasAge'], o, graph) for s, o in zip(persons, ages)])
-        graph.addN([(s, namespace['hasSex'], o, graph) for s, o in zip(persons, sexs)])
-        graph.addN([(s, namespace['hasDescendent'], o, graph) for s, o in zip(persons, descendents)])
-
-        graph.addN([(s, RDF.type, namespace['Location'], graph) for s in locations])
-        graph.addN([(s, namespace['hasReportingDistrictNumber'], o, graph) for s, o in zip(locations, reporting_district_numbers)])
-        graph.addN([(s, namespace['hasAreaID'], o, graph) for s, o in zip(locations, area_ids)])
-        graph.addN([(s, namespace['hasAreaName'], o, graph) for s, o in zip(locations, area_names)])
-        graph.addN([(s, namespace['hasAddress'], o, graph) for s, o in zip(locations, addresses)])
-        graph.addN([(s, namespace['hasCrossStreet'], o, graph) for s, o in zip(locations, cross_streets)])
-        graph.addN([(s, namespace['hasLatitude'], o, graph) for s, o in zip(locations, latitudes)])
-        graph.addN([(s, namespace['hasLongtitude'], o, graph) for s, o in zip(locations, longtitudes)])
-
-        graph.addN([(s, RDF.type, namespace['Charge'], graph) for s in charges])
-        graph.addN([(s, namespace['hasChargeGroupCode'], o, graph) for s, o in zip(charges, charge_group_codes)])
-        graph.addN([(s, namespace['hasChargeGroupDescription'], o, graph) for s, o in zip(charges, charge_group_descriptions)])
-        graph.addN([(s, namespace['hasChargeCode'], o, graph) for s, o in zip(charges, charge_codes)])
-        graph.addN([(s, namespace['hasChargeDescription'], o, graph) for s, o in zip(charges, charge_descriptions)])
-      
-        graph.addN([(s, RDF.type, namespace['Booking'], graph) for s in bookings])
-        graph.addN([(s, namespace['hasBookingDateTime'], o, graph) for s, o in zip(bookings, booking_dateTimes)])
-        graph.addN([(s, namespace['hasBookingLocation'], o, graph) for s, o in zip(bookings, booking_locations)])
-        graph.addN([(s, namespace['hasBookingCode'], o, graph) for s, o in zip(bookings, booking_codes)])
-
-        self.monitor.stop()
-
-    def _import_crime_reports (self, url = 'https://data.lacity.org/resource/2nrs-mtv8', dataset_size=9999999999):
-        """Import crime reports from the web.
+        yield self._statements(reports, RDF.type, repeat(namespace['ArrestReport']), graph)
+
+        yield self._statements(reports, namespace['hasID'], ids, graph)
+        yield self._statements(reports, namespace['hasDateTime'], dateTimes, graph)
+        yield self._statements(reports, namespace['hasReporType'], report_types, graph)
+        yield self._statements(reports, namespace['hasArrestType'], arrest_types, graph)
+        yield self._statements(reports, namespace['hasDispositionDescription'], disposition_descriptions, graph)
+
+        yield self._statements(reports, namespace['hasPerson'], persons, graph)
+        yield self._statements(reports, namespace['hasLocation'], locations, graph)
+        yield self._statements(reports, namespace['hasCharge'], charges, graph)
+        yield self._statements(reports, namespace['hasBooking'], bookings, graph)
+
+        yield self._statements(persons, RDF.type, repeat(namespace['Person']), graph)
+        yield self._statements(persons, namespace['hasAge'], ages, graph)
+        yield self._statements(persons, namespace['hasSex'], sexs, graph)
+        yield self._statements(persons, namespace['hasDescendent'], descendents, graph)
+
+        yield self._statements(locations, RDF.type, repeat(namespace['Location']), graph)
+        yield self._statements(locations, namespace['hasReportingDistrictNumber'], reporting_district_numbers, graph)
+        yield self._statements(locations, namespace['hasAreaID'], area_ids, graph)
+        yield self._statements(locations, namespace['hasAreaName'], area_names, graph)
+        yield self._statements(locations, namespace['hasAddress'], addresses, graph)
+        yield self._statements(locations, namespace['hasCrossStreet'], cross_streets, graph)
+        yield self._statements(locations, namespace['hasLatitude'], latitudes, graph)
+        yield self._statements(locations, namespace['hasLongtitude'], longtitudes, graph)
+
+        yield self._statements(charges, RDF.type, repeat(namespace['Charge']), graph)
+        yield self._statements(charges, namespace['hasChargeGroupCode'], charge_group_codes, graph)
+        yield self._statements(charges, namespace['hasChargeGroupDescription'], charge_group_descriptions, graph)
+        yield self._statements(charges, namespace['hasChargeCode'], charge_codes, graph)
+        yield self._statements(charges, namespace['hasChargeDescription'], charge_descriptions, graph)
+
+        yield self._statements(bookings, RDF.type, repeat(namespace['Booking']), graph)
+        yield self._statements(bookings, namespace['hasBookingDateTime'], booking_dateTimes, graph)
+        yield self._statements(bookings, namespace['hasBookingLocation'], booking_locations, graph)
+        yield self._statements(bookings, namespace['hasBookingCode'], booking_codes, graph)
+
+    def _import_crime_reports (self, url = 'https://data.lacity.org/resource/2nrs-mtv8', dataset_size=9999999999, load=None, workers=None):
+        """Import crime reports from the web or from local CSV exports.
 
         Args:
-            url (str, optional): url of crime reports. Defaults to 'https://data.lacity.org/resource/2nrs-mtv8'.
+            url (str, optional): url of crime reports, or a local CSV file, gzip-compressed CSV file or directory of such files. Defaults to 'https://data.lacity.org/resource/2nrs-mtv8'.
             dataset_size (int, optional): the maximum of data per dataset to include. Defaults to 9999999999.
+            load (function, optional): returns the normalized reports instead of downloading them. See import_reports. Defaults to None.
+            workers (int, optional): number of processes parsing local files. Defaults to the number of cores.
         """
+        with self.monitor.span('import', dataset='crime-reports'):
+            local = is_local(url)
+            if local:
+                #Local exports are parsed in parallel, and each chunk is added to the graph as soon as it is parsed
+                print('INFO: Reading crime reports from \'%s\'...' % url)
+                crime_reports = self._read_local(url, dataset_size, workers)
+            elif load:
+                crime_reports = [load('crime-reports', url)]
+            else:
+                #Download dataset
+                crime_reports = self._download_csv(url, dataset_size)
+
+                #Format dataset
+                print('INFO: Processing crime reports...')
+                crime_reports = [self._normalize_reports(crime_reports, 'Processing crime reports')]
+
+            #Import dataset to graph
+            print('INFO: Adding crime reports to graph...')
+            namespace = Namespace(PORTAL_NAMESPACE if local else url.split('resource')[0])
+
+            self.monitor.start(mode=1, desc='Adding crime reports')
 
-        #Download dataset
-        crime_reports = self._download_csv(url,dataset_size)
+            #Add data to a rdf graph
+            graph = Graph(store=self.c_graph.store, identifier='crime-reports')
+            graph.bind('ns1', namespace)
+            staging = self._add_quads(graph, self._report_quads(self._crime_report_quads, crime_reports, namespace, graph))
 
-        #Format dataset
-        print('INFO: Processing crime reports...')
-        self.monitor.start(total=crime_reports.shape[1], unit_scale=int(crime_reports.shape[0]/crime_reports.shape[1]),mode=2)
-        crime_reports = crime_reports.progress_apply(lambda x: x.astype(str).str.upper().replace(' +', ' ', regex=True))
+            #Free the reports before spilled quads are loaded
+            del crime_reports
+            self._load_staging(graph, staging)
+            self.record_context(str(graph.identifier))
 
-        #Add dataset to graph
-        print('INFO: Adding crime reports to graph...')
-        namespace = Namespace(url.split('resource')[0])
+            self.monitor.stop()
+
+    def _crime_report_quads (self, crime_reports, namespace, graph):
+        """Generate the quads of normalized crime reports, one batch per predicate.
 
-        self.monitor.start(mode=1)
+        Args:
+            crime_reports (DataFrame): normalized crime reports.
+            namespace (rdflib.Namespace): namespace of the generated resources.
+            graph (rdflib.Graph): the sub graph the quads belong to.
 
+        Returns:
+            generator: lists of (subject, predicate, object, graph) quads.
+        """
         #Convert data to rdf literals or URIRefs
         reports = ('Report-' + (crime_reports['dr_no']).apply(lambda x : md5(x.encode('utf-8')).hexdigest())).apply(lambda x : namespace[x])
         persons = ('Person-' + (crime_reports['vict_age'] + crime_reports['vict_sex'] + crime_reports['vict_descent']).apply(lambda x : md5(x.encode('utf-8')).hexdigest())).apply(lambda x : namespace[x])
@@ -336,57 +865,51 @@ class Manager:
         status_codes = crime_reports['status'].apply(lambda x : Literal(x, datatype=XSD.integer))
         status_descriptions = crime_reports['status_desc'].apply(lambda x : Literal(x, datatype=XSD.string))
 
-        #Add data to a rdf graph
-        graph = Graph(store=self.c_graph.store, identifier='crime-reports')
-        graph.bind('ns1', namespace)
-
-        graph.addN([(s, RDF.type, namespace['CrimeReport'], graph) for s in reports])
-
-        graph.addN([(s, namespace['hasID'], o, graph) for s, o in zip(reports, ids)])
-        graph.addN([(s, namespace['hasDateTime'], o, graph) for s, o in zip(reports, dateTimes)])
-        graph.addN([(s, namespace['hasDateReported'], o, graph) for s, o in zip(reports, date_reporteds)])
-        graph.addN([(s, namespace['hasMocodes'], o, graph) for s, o in zip(reports, mocodes)])
-        graph.addN([(s, namespace['hasPart1-2'], o, graph) for s, o in zip(reports, part_1_2s)])
-
-        graph.addN([(s, namespace['hasPerson'], o, graph) for s, o in zip(reports, persons)])
-        graph.addN([(s, namespace['hasLocation'], o, graph) for s, o in zip(reports, locations)])
-        graph.addN([(s, namespace['hasCrime'], o, graph) for s, o in zip(reports, crimes)])
-        graph.addN([(s, namespace['hasPremise'], o, graph) for s, o in zip(reports, premises)])
-        graph.addN([(s, namespace['hasWeapon'], o, graph) for s, o in zip(reports, weapons)])
-        graph.addN([(s, namespace['hasStatus'], o, graph) for s, o in zip(reports, statuss)])
-
-        graph.addN([(s, RDF.type, namespace['Person'], graph) for s in persons])
-        graph.addN([(s, namespace['hasAge'], o, graph) for s, o in zip(persons, ages)])
-        graph.addN([(s, namespace['hasSex'], o, graph) for s, o in zip(persons, sexs)])
-        graph.addN([(s, namespace['hasDescendent'], o, graph) for s, o in zip(persons, descendents)])
-
-        graph.addN([(s, RDF.type, namespace['Location'], graph) for s in locations])
-        graph.addN([(s, namespace['hasReportingDisctrictNumber'], o, graph) for s, o in zip(locations, reporting_district_numbers)])
-        graph.addN([(s, namespace['hasAreaID'], o, graph) for s, o in zip(locations, area_ids)])
-        graph.addN([(s, namespace['hasAreaName'], o, graph) for s, o in zip(locations, area_names)])
-        graph.addN([(s, namespace['hasAddress'], o, graph) for s, o in zip(locations, addresses)])
-        graph.addN([(s, namespace['hasCrossStreet'], o, graph) for s, o in zip(locations, cross_streets)])
-        graph.addN([(s, namespace['hasLatitude'], o, graph) for s, o in zip(locations, latitudes)])
-        graph.addN([(s, namespace['hasLongitude'], o, graph) for s, o in zip(locations, longtitudes)])
-
-        graph.addN([(s, RDF.type, namespace['Crime'], graph) for s in crimes])
-        graph.addN([(s, namespace['hasCrimeCommitted'], o, graph) for s, o in zip(crimes, crime_committeds)])
-        graph.addN([(s, namespace['hasCrimeCrimmitedDescription'], o, graph) for s, o in zip(crimes, crime_committed_descriptions)])
-        graph.addN([(s, namespace['hasCrimeCommited1'], o, graph) for s, o in zip(crimes, crime_committed_1s)])
-        graph.addN([(s, namespace['hasCrimeCommited2'], o, graph) for s, o in zip(crimes, crime_committed_2s)])
-        graph.addN([(s, namespace['hasCrimeCommited3'], o, graph) for s, o in zip(crimes, crime_committed_3s)])
-        graph.addN([(s, namespace['hasCrimeCommited4'], o, graph) for s, o in zip(crimes, crime_committed_4s)])
-
-        graph.addN([(s, RDF.type, namespace['Premise'], graph) for s in premises])
-        graph.addN([(s, namespace['hasPremiseCode'], o, graph) for s, o in zip(premises, premise_codes)])
-        graph.addN([(s, namespace['hasPremiseDescription'], o, graph) for s, o in zip(premises, premise_descriptions)])
-
-        graph.addN([(s, RDF.type, namespace['Weapon'], graph) for s in weapons])
-        graph.addN([(s, namespace['hasWeaponCode'], o, graph) for s, o in zip(weapons, weapon_codes)])
-        graph.addN([(s, namespace['hasWeaponDescription'], o, graph) for s, o in zip(weapons, weapon_descriptions)])
-
-        graph.addN([(s, RDF.type, namespace['Status'], graph) for s in statuss])
-        graph.addN([(s, namespace['hasStatusCode'], o, graph) for s, o in zip(statuss, status_codes)])
-        graph.addN([(s, namespace['hasStatusDescription'], o, graph) for s, o in zip(statuss, status_descriptions)])
-
-        self.monitor.stop()
\ No newline at end of file
+        yield self._statements(reports, RDF.type, repeat(namespace['CrimeReport']), graph)
+
+        yield self._statements(reports, namespace['hasID'], ids, graph)
+        yield self._statements(reports, namespace['hasDateTime'], dateTimes, graph)
+        yield self._statements(reports, namespace['hasDateReported'], date_reporteds, graph)
+        yield self._statements(reports, namespace['hasMocodes'], mocodes, graph)
+        yield self._statements(reports, namespace['hasPart1-2'], part_1_2s, graph)
+
+        yield self._statements(reports, namespace['hasPerson'], persons, graph)
+        yield self._statements(reports, namespace['hasLocation'], locations, graph)
+        yield self._statements(reports, namespace['hasCrime'], crimes, graph)
+        yield self._statements(reports, namespace['hasPremise'], premises, graph)
+        yield self._statements(reports, namespace['hasWeapon'], weapons, graph)
+        yield self._statements(reports, namespace['hasStatus'], statuss, graph)
+
+        yield self._statements(persons, RDF.type, repeat(namespace['Person']), graph)
+        yield self._statements(persons, namespace['hasAge'], ages, graph)
+        yield self._statements(persons, namespace['hasSex'], sexs, graph)
+        yield self._statements(persons, namespace['hasDescendent'], descendents, graph)
+
+        yield self._statements(locations, RDF.type, repeat(namespace['Location']), graph)
+        yield self._statements(locations, namespace['hasReportingDisctrictNumber'], reporting_district_numbers, graph)
+        yield self._statements(locations, namespace['hasAreaID'], area_ids, graph)
+        yield self._statements(locations, namespace['hasAreaName'], area_names, graph)
+        yield self._statements(locations, namespace['hasAddress'], addresses, graph)
+        yield self._statements(locations, namespace['hasCrossStreet'], cross_streets, graph)
+        yield self._statements(locations, namespace['hasLatitude'], latitudes, graph)
+        yield self._statements(locations, namespace['hasLongitude'], longtitudes, graph)
+
+        yield self._statements(crimes, RDF.type, repeat(namespace['Crime']), graph)
+        yield self._statements(crimes, namespace['hasCrimeCommitted'], crime_committeds, graph)
+        yield self._statements(crimes, namespace['hasCrimeCrimmitedDescription'], crime_committed_descriptions, graph)
+        yield self._statements(crimes, namespace['hasCrimeCommited1'], crime_committed_1s, graph)
+        yield self._statements(crimes, namespace['hasCrimeCommited2'], crime_committed_2s, graph)
+        yield self._statements(crimes, namespace['hasCrimeCommited3'], crime_committed_3s, graph)
+        yield self._statements(crimes, namespace['hasCrimeCommited4'], crime_committed_4s, graph)
+
+        yield self._statements(premises, RDF.type, repeat(namespace['Premise']), graph)
+        yield self._statements(premises, namespace['hasPremiseCode'], premise_codes, graph)
+        yield self._statements(premises, namespace['hasPremiseDescription'], premise_descriptions, graph)
+
+        yield self._statements(weapons, RDF.type, repeat(namespace['Weapon']), graph)
+        yield self._statements(weapons, namespace['hasWeaponCode'], weapon_codes, graph)
+        yield self._statements(weapons, namespace['hasWeaponDescription'], weapon_descriptions, graph)
+
+        yield self._statements(statuss, RDF.type, repeat(namespace['Status']), graph)
+        yield self._statements(statuss, namespace['hasStatusCode'], status_codes, graph)
+        yield self._statements(statuss, namespace['hasStatusDescription'], status_descriptions, graph)
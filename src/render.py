@@ -0,0 +1,153 @@
+from html import escape
+from io import StringIO
+from urllib.parse import quote
+
+#Style of rendered result tables
+STYLE = '''
+            table, th, td {
+                border: 1px solid black;
+            }
+
+            '''
+
+#Script appending the following pages of a result while the page is scrolled.
+#Formatted with the url of the pages, the index of the next page and whether the last page is shown.
+PAGING_SCRIPT = '''
+var base = '%s', next = %s, done = %s, loading = false;
+function more() {
+    if (done || loading || window.innerHeight + window.scrollY < document.body.offsetHeight - 800) return;
+    loading = true;
+    var request = new XMLHttpRequest();
+    request.open('GET', base + next + '/');
+    request.onload = function () {
+        if (request.responseText) {
+            document.getElementById('rows').insertAdjacentHTML('beforeend', request.responseText);
+            next++;
+        } else {
+            done = true;
+        }
+        loading = false;
+        more();
+    };
+    request.onerror = function () { loading = false; };
+    request.send();
+}
+window.addEventListener('scroll', more);
+window.addEventListener('load', more);
+'''
+
+class HTMLRenderer:
+    """A HTMLRenderer class used to render result rows as html tables. All urls are rendered as hyperlinks with their namespace replaced by its prefix.
+    """
+    def __init__(self, namespaces, memo_size=100000):
+        """Initialize HTMLRenderer class. Namespaces are snapshotted, so later changes of the graph don't affect the renderer.
+
+        Args:
+            namespaces ([(string, string)]): prefixes and namespaces used to shorten urls.
+            memo_size (int, optional): maximum number of rendered urls remembered. Defaults to 100000.
+        """
+        #Namespaces are looked up by the prefix of a url with the same length, longest first
+        self._prefixes = {}
+        for prefix, namespace in namespaces:
+            namespace = str(namespace)
+            if namespace:
+                self._prefixes[namespace] = str(prefix) + ':'
+        self._lengths = sorted({len(namespace) for namespace in self._prefixes}, reverse=True)
+        self.memo_size = memo_size
+        self._memo = {}
+
+    def shorten(self, url):
+        """Replace the longest matching namespace of a url with its prefix.
+
+        Args:
+            url (string): url to be shortened.
+
+        Returns:
+            string: the shortened url.
+        """
+        prefixes = self._prefixes
+        for length in self._lengths:
+            prefix = prefixes.get(url[:length])
+            if prefix is not None:
+                return prefix + url[length:]
+        return url
+
+    def cell(self, value):
+        """Render one table cell.
+
+        Args:
+            value (string): value of the cell.
+
+        Returns:
+            string: html of the cell.
+        """
+        if 'https://' in value or 'http://' in value:
+            html = self._memo.get(value)
+            if html is None:
+                if len(self._memo) >= self.memo_size:
+                    self._memo.clear()
+                html = self._memo[value] = '<td><a href="custom-url-scheme://redirect-to/%s/">%s</a></td>' % (quote('<' + value + '>'), escape(self.shorten(value), quote=False))
+            return html
+        return '<td>' + escape(value, quote=False) + '</td>'
+
+    def write_rows(self, out, rows):
+        """Write table rows to a text stream.
+
+        Args:
+            out (text file object): stream the rows are written to.
+            rows ([[string]]): rows to be written.
+        """
+        cell = self.cell
+        write = out.write
+        for row in rows:
+            write('<tr>')
+            write(''.join([cell(value) for value in row]))
+            write('</tr>')
+
+    def render_rows(self, rows):
+        """Render table rows without the surrounding table.
+
+        Args:
+            rows ([[string]]): rows to be rendered.
+
+        Returns:
+            string: html of the rows.
+        """
+        out = StringIO()
+        self.write_rows(out, rows)
+        return out.getvalue()
+
+    def render(self, headers, rows, script=''):
+        """Render a html document containing a table.
+
+        Args:
+            headers ([string]): headers of the table.
+            rows ([[string]]): rows of the table.
+            script (string, optional): javascript added to the document. Defaults to ''.
+
+        Returns:
+            string: the html document.
+        """
+        return self.document(headers, self.render_rows(rows), script)
+
+    def document(self, headers, rows, script=''):
+        """Render a html document around table rows that are already rendered.
+
+        Args:
+            headers ([string]): headers of the table.
+            rows (string): html of the rows, as returned by render_rows.
+            script (string, optional): javascript added to the document. Defaults to ''.
+
+        Returns:
+            string: the html document.
+        """
+        out = StringIO()
+        out.write('<!DOCTYPE html>\n<html>\n<head>\n<title>SPARQL-Results</title>\n<style>%s</style>\n</head>\n<body>\n<table>\n<thead><tr>' % STYLE)
+        out.write(''.join(['<th>' + escape(str(header), quote=False) + '</th>' for header in headers]))
+        out.write('</tr></thead>\n<tbody id="rows">')
+        out.write(rows)
+        out.write('</tbody>\n</table>\n')
+        if script:
+            out.write('<script>%s</script>\n' % script)
+        out.write('</body>\n</html>')
+        return out.getvalue()
@@ -0,0 +1,264 @@
+from collections import deque
+from concurrent.futures import CancelledError, Executor, Future
+from gc import collect, freeze, unfreeze
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from os import cpu_count, getpid
+from threading import Lock, Thread
+
+class ReplicaError(RuntimeError):
+    """Raised for a task whose replica died before answering it.
+    """
+
+class ReplicaPool(Executor):
+    """A ReplicaPool class used to run read-only tasks, such as queries, in forked replicas of a process holding a loaded graph.
+
+    Every replica is forked once the graph is loaded, so all of them share its memory copy-on-write. Objects are moved to the permanent generation of the garbage collector before forking, so collections in the replicas don't write to the pages of the graph and copy them. A dispatcher thread hands each task to an idle replica, and tasks wait in submission order while every replica is busy. A replica that dies, or whose task is aborted, is replaced by a new fork.
+    """
+    def __init__(self, replicas=None):
+        """Initialize ReplicaPool class and fork the replicas.
+
+        Args:
+            replicas (int, optional): number of replicas. Defaults to the number of cores.
+        """
+        self.replicas = replicas or cpu_count() or 1
+        self.restarts = 0
+        self.tasks = 0
+        self._context = get_context('fork')
+        self._lock = Lock()
+        self._pending = deque()
+        self._shutdown = False
+
+        #Written to wake the dispatcher up when a task is submitted
+        self._wakeup, self._waker = self._context.Pipe(duplex=False)
+
+        collect()
+        freeze()
+        self._workers = [self._fork() for _ in range(self.replicas)]
+        self._dispatcher = Thread(target=self._dispatch, name='replica-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule a task on the next idle replica.
+
+        Args:
+            fn (function): a module level function, called in a replica with args and kwargs.
+
+        Raises:
+            RuntimeError: the pool is shut down.
+
+        Returns:
+            concurrent.futures.Future: the future of the task.
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit tasks to a replica pool that is shut down')
+            self._pending.append((future, fn, args, kwargs))
+        self._waker.send_bytes(b'')
+        return future
+
+    def abort(self, future):
+        """Stop a task. A running task is stopped by replacing its replica.
+
+        Args:
+            future (concurrent.futures.Future): a future returned by submit.
+
+        Returns:
+            bool: True if the task was pending or running.
+        """
+        with self._lock:
+            if future.cancel():
+                return True
+            for worker in self._workers:
+                if worker['future'] is future:
+                    worker['process'].kill()
+                    future.set_exception(CancelledError())
+                    return True
+        return False
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """Stop the replicas once their tasks are done.
+
+        Args:
+            wait (bool, optional): wait for pending tasks and the replicas to finish. Defaults to True.
+            cancel_futures (bool, optional): cancel pending tasks instead of running them. Defaults to False.
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft()[0].cancel()
+        self._waker.send_bytes(b'')
+        if wait:
+            self._dispatcher.join()
+        unfreeze()
+
+    def stats(self):
+        """Get the state of the replicas.
+
+        Returns:
+            dict: the number of replicas, of busy replicas, of pending tasks, of finished tasks and of restarted replicas.
+        """
+        with self._lock:
+            return {
+                'replicas': len(self._workers),
+                'busy': sum(1 for worker in self._workers if worker['future'] is not None),
+                'pending': len(self._pending),
+                'tasks': self.tasks,
+                'restarts': self.restarts,
+            }
+
+    def memory(self):
+        """Get the memory of this process and of every replica. Pages shared copy-on-write are split between the processes sharing them.
+
+        Returns:
+            [dict]: pid, resident memory and proportional set size in MB of each process, this process first. Sizes are None where they can't be measured.
+        """
+        with self._lock:
+            pids = [getpid()] + [worker['process'].pid for worker in self._workers]
+        usage = []
+        for pid in pids:
+            rss = pss = None
+            try:
+                with open('/proc/%s/smaps_rollup' % pid) as f:
+                    for line in f:
+                        name, _, value = line.partition(':')
+                        if name in ('Rss', 'Pss'):
+                            size = int(value.split()[0]) / 1024
+                            rss, pss = (size, pss) if name == 'Rss' else (rss, size)
+            except OSError:
+                pass
+            usage.append({'pid': pid, 'rss': rss, 'pss': pss})
+        return usage
+
+    def _fork(self):
+        """Fork a replica.
+
+        Returns:
+            dict: the process of the replica, the connection tasks are sent through and the future of its running task.
+        """
+        connection, child = self._context.Pipe()
+        process = self._context.Process(target=_serve, args=(child,), daemon=True)
+        process.start()
+        child.close()
+        return {'process': process, 'connection': connection, 'future': None}
+
+    def _dispatch(self):
+        """Hand tasks to idle replicas and collect their results, until the pool is shut down and every task is done.
+        """
+        while True:
+            with self._lock:
+                for worker in self._workers:
+                    if worker['future'] is None and self._pending:
+                        self._send(worker)
+                if self._shutdown and not self._pending and all(worker['future'] is None for worker in self._workers):
+                    break
+                connections = {worker['connection']: worker for worker in self._workers}
+                sentinels = {worker['process'].sentinel: worker for worker in self._workers}
+
+            for ready in wait(list(connections) + list(sentinels) + [self._wakeup]):
+                if ready is self._wakeup:
+                    self._wakeup.recv_bytes()
+                elif ready in connections and self._receive(connections[ready]):
+                    continue
+                else:
+                    self._replace(connections.get(ready) or sentinels[ready])
+
+        #Replicas inherit the connections of each other, so they are told to stop rather than closed
+        for worker in self._workers:
+            worker['connection'].send(None)
+            worker['connection'].close()
+            worker['process'].join()
+
+    def _send(self, worker):
+        """Send the next pending task to an idle replica. Called with the lock held.
+
+        Args:
+            worker (dict): the replica.
+        """
+        while self._pending:
+            future, fn, args, kwargs = self._pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker['connection'].send((fn, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            worker['future'] = future
+            return
+
+    def _receive(self, worker):
+        """Complete the task of a replica with its answer.
+
+        Args:
+            worker (dict): the replica.
+
+        Returns:
+            bool: False if the replica died.
+        """
+        try:
+            ok, value = worker['connection'].recv()
+        except (EOFError, OSError):
+            return False
+        with self._lock:
+            future, worker['future'] = worker['future'], None
+            self.tasks += 1
+            if future is None or future.done():
+                return True
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        return True
+
+    def _replace(self, worker):
+        """Replace a replica that died, failing its running task.
+
+        Args:
+            worker (dict): the replica.
+        """
+        if worker not in self._workers:
+            return
+        worker['process'].join()
+        worker['connection'].close()
+        with self._lock:
+            future = worker['future']
+            if future is not None and not future.done():
+                future.set_exception(ReplicaError('The replica evaluating the task died with exit code %s' % worker['process'].exitcode))
+            self._workers.remove(worker)
+            if self._shutdown:
+                return
+            self.restarts += 1
+
+            #Objects created since the last fork are frozen too, so the new replica shares them
+            collect()
+            freeze()
+            self._workers.append(self._fork())
+
+def _serve(connection):
+    """Answer tasks inside a replica until the pool stops it.
+
+    Args:
+        connection (multiprocessing.connection.Connection): the connection tasks are received through.
+    """
+    while True:
+        try:
+            task = connection.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        fn, args, kwargs = task
+        try:
+            answer = (True, fn(*args, **kwargs))
+        except Exception as e:
+            answer = (False, e)
+        try:
+            connection.send(answer)
+        except Exception as e:
+            #The result or the exception couldn't be pickled
+            connection.send((False, ReplicaError('Unable to send the answer of the task: %s' % e)))
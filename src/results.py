@@ -0,0 +1,435 @@
+from array import array
+from collections import OrderedDict, deque
+from io import SEEK_END
+from json import dumps, loads
+from tempfile import TemporaryFile
+from rdflib.term import BNode, Literal, URIRef
+from threading import Lock
+
+#Result formats supported by write_result and their file extensions
+FORMATS = {'csv': '.csv', 'tsv': '.tsv', 'json': '.json', 'xml': '.xml'}
+
+class ResultSerializer:
+    """A ResultSerializer class used to stream SPARQL result rows to a binary stream in buffered chunks.
+
+    Encoded terms are cached, so repeated resources and literals are only encoded once.
+    """
+    #Separator written between two rows
+    row_separator = ''
+
+    def __init__(self, stream, vars, buffer_size=65536, cache_size=100000):
+        """Initialize ResultSerializer class.
+
+        Args:
+            stream (binary file object): a file or socket stream the result is written to.
+            vars ([rdflib.term.Variable]): projected variables of the result.
+            buffer_size (int, optional): number of characters buffered before they are written. Defaults to 65536.
+            cache_size (int, optional): maximum number of cached term encodings. Defaults to 100000.
+        """
+        self.stream = stream
+        self.vars = list(vars)
+        self.buffer_size = buffer_size
+        self.cache_size = cache_size
+        self.rows = 0
+        self._buffer = []
+        self._buffered = 0
+        self._cache = {}
+
+    def serialize(self, rows):
+        """Write all rows of a result.
+
+        Args:
+            rows (iterable of dict): bindings of each row, mapping variables to terms.
+
+        Returns:
+            int: the number of rows written.
+        """
+        self._write(self.header())
+        for row in rows:
+            self.write_row(row)
+        self._write(self.footer())
+        self.flush()
+        return self.rows
+
+    def write_row(self, row):
+        """Write one row.
+
+        Args:
+            row (dict): bindings of the row, mapping variables to terms.
+        """
+        cache = self._cache
+        cells = []
+        for var in self.vars:
+            term = row.get(var)
+            cell = cache.get(term)
+            if cell is None:
+                if len(cache) >= self.cache_size:
+                    cache.clear()
+                cell = cache[term] = self.encode(var, term)
+            cells.append(cell)
+        self._write((self.row_separator if self.rows else '') + self.join(cells))
+        self.rows += 1
+
+    def flush(self):
+        """Write buffered chunks to the stream.
+        """
+        if self._buffer:
+            self.stream.write(''.join(self._buffer).encode('utf-8'))
+            self._buffer = []
+            self._buffered = 0
+
+    def _write(self, text):
+        """Buffer text and flush it once the buffer is full.
+
+        Args:
+            text (string): text to be written.
+        """
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def header(self):
+        """Get the text written before the rows.
+
+        Returns:
+            string: header of the result.
+        """
+        return ''
+
+    def footer(self):
+        """Get the text written after the rows.
+
+        Returns:
+            string: footer of the result.
+        """
+        return ''
+
+    def encode(self, var, term):
+        """Encode one term.
+
+        Args:
+            var (rdflib.term.Variable): variable the term is bound to.
+            term (rdflib.term.Node): term to be encoded. None for unbound values.
+
+        Returns:
+            string: encoded term.
+        """
+        raise NotImplementedError
+
+    def join(self, cells):
+        """Join encoded terms to a row.
+
+        Args:
+            cells ([string]): encoded terms of a row.
+
+        Returns:
+            string: encoded row.
+        """
+        raise NotImplementedError
+
+class CSVSerializer(ResultSerializer):
+    """A CSVSerializer class used to stream results in the SPARQL 1.1 CSV format.
+    """
+    def header(self):
+        return ','.join(self._quote(str(var)) for var in self.vars) + '\r\n'
+
+    def encode(self, var, term):
+        if term is None:
+            return ''
+        if isinstance(term, BNode):
+            return '_:' + term
+        return self._quote(str(term))
+
+    def join(self, cells):
+        return ','.join(cells) + '\r\n'
+
+    def _quote(self, value):
+        """Quote a CSV field when it contains a separator, a quote or a line break.
+
+        Args:
+            value (string): field to be quoted.
+
+        Returns:
+            string: quoted field.
+        """
+        if any(c in value for c in ',"\r\n'):
+            return '"' + value.replace('"', '""') + '"'
+        return value
+
+class TSVSerializer(ResultSerializer):
+    """A TSVSerializer class used to stream results in the SPARQL 1.1 TSV format.
+    """
+    def header(self):
+        return '\t'.join('?' + var for var in self.vars) + '\n'
+
+    def encode(self, var, term):
+        if term is None:
+            return ''
+        return term.n3().replace('\t', '\\t')
+
+    def join(self, cells):
+        return '\t'.join(cells) + '\n'
+
+class JSONSerializer(ResultSerializer):
+    """A JSONSerializer class used to stream results in the SPARQL 1.1 JSON format.
+    """
+    row_separator = ','
+
+    def header(self):
+        return '{"head": {"vars": %s}, "results": {"bindings": [' % dumps([str(var) for var in self.vars])
+
+    def footer(self):
+        return ']}}'
+
+    def encode(self, var, term):
+        if term is None:
+            return ''
+        if isinstance(term, URIRef):
+            value = {'type': 'uri', 'value': str(term)}
+        elif isinstance(term, BNode):
+            value = {'type': 'bnode', 'value': str(term)}
+        elif isinstance(term, Literal):
+            value = {'type': 'literal', 'value': str(term)}
+            if term.language:
+                value['xml:lang'] = term.language
+            elif term.datatype:
+                value['datatype'] = str(term.datatype)
+        else:
+            value = {'type': 'literal', 'value': str(term)}
+        return dumps(value)
+
+    def write_row(self, row):
+        #Unbound variables are left out of a JSON binding
+        if not hasattr(self, '_keys'):
+            self._keys = [dumps(str(var)) + ': ' for var in self.vars]
+        cache = self._cache
+        cells = []
+        for key, var in zip(self._keys, self.vars):
+            term = row.get(var)
+            if term is None:
+                continue
+            cell = cache.get(term)
+            if cell is None:
+                if len(cache) >= self.cache_size:
+                    cache.clear()
+                cell = cache[term] = self.encode(var, term)
+            cells.append(key + cell)
+        self._write((self.row_separator if self.rows else '') + '{' + ', '.join(cells) + '}')
+        self.rows += 1
+
+SERIALIZERS = {'csv': CSVSerializer, 'tsv': TSVSerializer, 'json': JSONSerializer}
+
+def iter_rows(result):
+    """Iterate over the bindings of a SELECT result without keeping evaluated rows in memory.
+
+    Args:
+        result (rdflib.query.Result): result of a query.
+
+    Returns:
+        generator: bindings of each row, mapping variables to terms.
+    """
+    #rdflib keeps every row it yields in result.bindings. Drain the lazy generator directly when it is available.
+    generator = getattr(result, '_genbindings', None)
+    if generator is not None:
+        result._genbindings = None
+        for row in generator:
+            if row:
+                yield row
+    else:
+        for row in result.bindings:
+            yield row
+
+def write_result(result, stream, format='csv', buffer_size=65536):
+    """Stream a SPARQL result to a binary stream.
+
+    Args:
+        result (rdflib.query.Result): result of a query.
+        stream (binary file object): a file or socket stream the result is written to.
+        format (string, optional): one of 'csv', 'tsv', 'json' or 'xml'. Defaults to 'csv'.
+        buffer_size (int, optional): number of characters buffered before they are written. Defaults to 65536.
+
+    Returns:
+        int: the number of rows written.
+    """
+    if format not in FORMATS:
+        raise ValueError('Unsupported result format \'%s\'' % format)
+
+    #ASK results only have a boolean answer
+    if result.type == 'ASK':
+        if format == 'json':
+            stream.write(('{"head": {}, "boolean": %s}' % str(result.askAnswer).lower()).encode('utf-8'))
+        elif format == 'xml':
+            result.serialize(destination=stream, format=format)
+        else:
+            stream.write(('%s\n' % str(result.askAnswer).lower()).encode('utf-8'))
+        return 1
+
+    #XML results are written by rdflib
+    if format == 'xml':
+        result.serialize(destination=stream, format=format)
+        return len(result.bindings)
+
+    return SERIALIZERS[format](stream, result.vars, buffer_size).serialize(iter_rows(result))
+
+def format_from_filename(filename, default='csv'):
+    """Guess the result format from the extension of a filename.
+
+    Args:
+        filename (string): path of the result file.
+        default (string, optional): format used when the extension is unknown. Defaults to 'csv'.
+
+    Returns:
+        string: the result format.
+    """
+    for format, extension in FORMATS.items():
+        if str(filename).lower().endswith(extension):
+            return format
+    return default
+
+class ResultCursor:
+    """A ResultCursor class used to fetch rows of a query result on demand. Rows are converted to string when they are fetched.
+
+    Only a window of the last fetched rows is kept in memory. Rows leaving the window are written to a temporary file, and read back from it by their offset when they are shown again, so memory follows the part of the result being shown rather than how far it was scrolled, and the query is never evaluated again.
+    """
+    def __init__(self, result, window=10000):
+        """Initialize ResultCursor class.
+
+        Args:
+            result (rdflib.query.Result): result of a query.
+            window (int, optional): number of rows kept in memory, both of the last fetched rows and of rows read back from the file. Defaults to 10000.
+        """
+        self._lock = Lock()
+        self._capacity = window
+        if result.type == 'SELECT':
+            self.headers = [str(var) for var in result.vars]
+        elif result.type == 'ASK':
+            self.headers = ['ask']
+        else:
+            self.headers = ['s', 'p', 'o']
+        self._source = self._rows_of(result)
+        self.exhausted = False
+
+        #Last fetched rows, and the number of rows fetched so far
+        self._window = deque()
+        self._fetched = 0
+
+        #File of the rows that left the window, the offset of each of them in it, and the rows read back from it
+        self._spool = None
+        self._offsets = array('Q')
+        self._read = OrderedDict()
+
+    def __len__(self):
+        """Get the number of rows fetched so far.
+
+        Returns:
+            int: number of fetched rows.
+        """
+        return self._fetched
+
+    def fetch(self, n):
+        """Fetch more rows from the result.
+
+        Args:
+            n (int): maximum number of rows to fetch.
+
+        Returns:
+            int: number of rows fetched.
+        """
+        with self._lock:
+            fetched = self._fetched
+            self._advance(fetched + n)
+            return self._fetched - fetched
+
+    def rows(self, start, end):
+        """Get a range of rows, fetching them if they have not been fetched yet.
+
+        Args:
+            start (int): index of the first row.
+            end (int): index after the last row.
+
+        Returns:
+            [[string]]: rows in the range. Fewer rows are returned when the result ends earlier.
+        """
+        with self._lock:
+            if end > self._fetched:
+                self._advance(end)
+            return [self._row(index) for index in range(start, min(end, self._fetched))]
+
+    def row(self, index):
+        """Get one fetched row.
+
+        Args:
+            index (int): index of the row.
+
+        Returns:
+            [string]: the row.
+        """
+        with self._lock:
+            if not 0 <= index < self._fetched:
+                raise IndexError('Row %s has not been fetched' % index)
+            return self._row(index)
+
+    def _row(self, index):
+        """Get one fetched row, reading it back from the file when it left the window. Called with the lock held.
+
+        Args:
+            index (int): index of the row.
+
+        Returns:
+            [string]: the row.
+        """
+        first = self._fetched - len(self._window)
+        if index >= first:
+            return self._window[index - first]
+
+        row = self._read.get(index)
+        if row is None:
+            self._spool.seek(self._offsets[index])
+            row = self._read[index] = loads(self._spool.readline())
+            if len(self._read) > self._capacity:
+                self._read.popitem(last=False)
+        else:
+            self._read.move_to_end(index)
+        return row
+
+    def _advance(self, end):
+        """Read rows from the result until end rows are fetched or the result ends. Called with the lock held.
+
+        Args:
+            end (int): number of rows fetched from the start of the result.
+        """
+        while self._fetched < end:
+            try:
+                row = next(self._source)
+            except StopIteration:
+                self.exhausted = True
+                break
+            if len(self._window) == self._capacity:
+                self._evict()
+            self._window.append(row)
+            self._fetched += 1
+
+    def _evict(self):
+        """Write the first row of the window to the file. Called with the lock held.
+        """
+        if self._spool is None:
+            self._spool = TemporaryFile()
+        self._spool.seek(0, SEEK_END)
+        self._offsets.append(self._spool.tell())
+        self._spool.write(dumps(self._window.popleft()).encode('utf-8') + b'\n')
+
+    def _rows_of(self, result):
+        """Convert the rows of a result to lists of strings.
+
+        Args:
+            result (rdflib.query.Result): result of a query.
+
+        Returns:
+            generator: rows of the result.
+        """
+        if result.type == 'SELECT':
+            return ([str(row.get(var)) for var in result.vars] for row in iter_rows(result))
+        if result.type == 'ASK':
+            return iter([[str(result.askAnswer)]])
+        return ([str(value) for value in triple] for triple in result)
@@ -0,0 +1,396 @@
+from collections import Counter
+from hashlib import md5
+from math import sqrt
+from rdflib import ConjunctiveGraph, Graph, Literal, Namespace
+from rdflib.query import Result
+from rdflib.term import Variable
+from statistics import NormalDist
+from .algebra import term_sort_key
+from .versions import ContextStore, unchanged
+
+#Columns of the report id, the area and the date the reports of each context are stratified by
+STRATA = {
+    'arrest-reports': ('rpt_id', 'area', 'arst_date'),
+    'crime-reports': ('dr_no', 'area', 'date_occ'),
+}
+
+#Aggregates that can be estimated by scaling the sampled solutions of each stratum
+_ESTIMABLE = ('Aggregate_Count', 'Aggregate_Sum')
+
+class StratifiedSamples:
+    """A StratifiedSamples class used to keep stratified samples of the imported reports, and to estimate aggregate queries from them.
+
+    Reports are stratified by area and month. Within each stratum a report is sampled when the hash of its id falls below the sampling rate, and the first report of every stratum is always sampled. Each rate has its own sample graph, holding every triple of the sampled reports.
+
+    COUNT and SUM of a stratum are scaled by its number of reports over its number of sampled reports. The confidence interval of an estimate comes from the variance of the sampled reports within each stratum.
+    """
+    def __init__(self, rates=(0.01,), confidence=0.95):
+        """Initialize StratifiedSamples class.
+
+        Args:
+            rates ((float), optional): sampling rates, each between 0 and 1. Defaults to (0.01,).
+            confidence (float, optional): confidence level of the estimated intervals. Defaults to 0.95.
+        """
+        self.rates = tuple(sorted(rates or ()))
+        self.confidence = confidence
+
+        #Sample graph of each rate, with one context per sampled context
+        self._graphs = {rate: ConjunctiveGraph(ContextStore()) for rate in self.rates}
+
+        #Number of reports of each (context, stratum), and of sampled reports of each (context, rate, stratum)
+        self._population = {}
+        self._sampled = {}
+
+        #Stratum of every sampled report node, per context
+        self._strata = {}
+
+        #Report ids already counted per context. Reports are only counted once across delta loads.
+        self._seen = {}
+
+        #Revision of each sub graph once its reports were sampled
+        self._revisions = {}
+
+        #Contexts whose state isn't shared with a copy of the samples
+        self._owned = set()
+
+    def copy(self):
+        """Copy the samples. The copy shares the sample graphs and the state of every context with the samples, until it changes them.
+
+        Returns:
+            StratifiedSamples: the copy.
+        """
+        samples = StratifiedSamples.__new__(StratifiedSamples)
+        samples.__dict__.update({name: dict(value) if isinstance(value, dict) else value for name, value in self.__dict__.items()})
+        samples._graphs = {rate: ConjunctiveGraph(graph.store.copy()) for rate, graph in self._graphs.items()}
+        self._owned, samples._owned = set(), set()
+        return samples
+
+    def update(self, context, namespace, reports, quads):
+        """Sample newly imported reports and add their triples to the sample graphs.
+
+        Args:
+            context (string): id of the sub-graph the reports were added to.
+            namespace (rdflib.Namespace): namespace of the reports.
+            reports (DataFrame): normalized reports.
+            quads (function): generates the quads of reports, such as Manager._crime_report_quads.
+
+        Returns:
+            int: the number of triples added to the sample graphs.
+        """
+        if context not in STRATA or not self.rates:
+            return 0
+        id_column, area_column, date_column = STRATA[context]
+        self._own(context)
+        seen = self._seen.setdefault(context, set())
+
+        #Only sample reports that have not been sampled by a previous load
+        known = reports[id_column].isin(seen)
+        new_reports = reports[~known]
+        earlier = set(reports[known][id_column])
+        distinct = new_reports.drop_duplicates(subset=[id_column])
+        seen.update(distinct[id_column])
+
+        ids = list(distinct[id_column])
+        strata = list(zip(distinct[area_column], distinct[date_column].str[:7]))
+        draws = [int(md5(id.encode('utf-8')).hexdigest()[:8], 16) / 2 ** 32 for id in ids]
+        self._population.setdefault(context, Counter()).update(strata)
+
+        namespace = Namespace(str(namespace))
+        nodes = self._strata.setdefault(context, {})
+        triples = 0
+        for rate in self.rates:
+            sampled = self._sampled.setdefault((context, rate), Counter())
+            chosen = set()
+            for id, stratum, draw in zip(ids, strata, draws):
+                if draw < rate or not sampled[stratum]:
+                    sampled[stratum] += 1
+                    chosen.add(id)
+                    nodes[namespace['Report-' + md5(id.encode('utf-8')).hexdigest()]] = stratum
+
+            #Every row of a sampled report is kept, so the sample holds all of its triples. That includes the rest of a report sampled by a previous chunk or load, which the graph holds triples of.
+            graph = Graph(store=self._graphs[rate].store, identifier=context)
+            graph.bind('ns1', namespace)
+            chosen.update(id for id in earlier if next(graph.triples((namespace['Report-' + md5(id.encode('utf-8')).hexdigest()], None, None)), None) is not None)
+            for batch in quads(reports[reports[id_column].isin(chosen)], namespace, graph):
+                graph.addN(batch)
+                triples += len(batch)
+        return triples
+
+    def record(self, context, revision):
+        """Record the revision of a sub graph once its reports are sampled. Its samples only answer queries while it is unchanged.
+
+        Args:
+            context (string): id of the sub-graph.
+            revision (tuple): revision of the sub-graph, see versions.ContextStore.revision.
+        """
+        if context in self._seen:
+            self._revisions[context] = revision
+
+    def remove(self, context):
+        """Remove the reports of a context from the samples.
+
+        Args:
+            context (string): id of the removed sub-graph.
+        """
+        for rate, graph in self._graphs.items():
+            graph.store.remove_graph(graph.get_context(context))
+            self._sampled.pop((context, rate), None)
+        for state in (self._population, self._strata, self._seen, self._revisions):
+            state.pop(context, None)
+
+    def _own(self, context):
+        """Copy the state of a context shared with a copy of the samples, before it is changed.
+
+        Args:
+            context (string): id of the sub-graph.
+        """
+        if context in self._owned:
+            return
+        for state, key in [(self._population, context), (self._strata, context), (self._seen, context)] + [(self._sampled, (context, rate)) for rate in self.rates]:
+            if key in state:
+                state[key] = state[key].copy()
+        self._owned.add(context)
+
+    def sizes(self):
+        """Get the number of reports of every sampled context and rate.
+
+        Returns:
+            {(string, float): (int, int)}: number of reports and of sampled reports, by (context, rate).
+        """
+        return {(context, rate): (sum(self._population[context].values()), sum(sampled.values())) for (context, rate), sampled in self._sampled.items()}
+
+    def answer(self, shape, graph, id=None, rate=None):
+        """Estimate a COUNT or SUM aggregate query from a sample.
+
+        Estimable queries are SELECT queries grouped by variables whose projection only holds group variables and plain COUNT or SUM aggregates, and whose every solution binds exactly one sampled report. Only sub graphs unchanged since they were sampled can be queried, and the union only when every other sub graph is empty. Each estimated variable ?x is followed by ?x_lower and ?x_upper, the bounds of its confidence interval. Groups missing from the sample are missing from the estimate.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            graph (rdflib.ConjunctiveGraph): the queried graph.
+            id (string, optional): name of the sub-graph being queried. Defaults to None.
+            rate (float, optional): rate of the sample to estimate from. Defaults to the smallest rate.
+
+        Returns:
+            rdflib.query.Result: estimated result of the query. None if the query can't be estimated.
+        """
+        if not self.rates:
+            return None
+        rate = self.rates[0] if rate is None else rate
+        if rate not in self.rates:
+            return None
+        columns = _columns(shape)
+        if columns is None:
+            return None
+        group = list(shape.group or [])
+
+        contexts = [id] if id else [context for context in STRATA if (context, rate) in self._sampled]
+        if not contexts or any((context, rate) not in self._sampled for context in contexts) or not unchanged(graph, self._revisions, id):
+            return None
+        nodes = {}
+        for context in contexts:
+            for node, stratum in self._strata[context].items():
+                #A report node in two contexts can't be attributed to one stratum
+                if node in nodes:
+                    return None
+                nodes[node] = (context, stratum)
+
+        graph = self._graphs[rate]
+        print('INFO: Estimating query from a %s%% stratified sample...' % (rate * 100))
+        totals = self._evaluate(shape, graph.get_context(id) if id else graph, group, columns, nodes)
+        if totals is None:
+            return None
+
+        #A query without GROUP BY has one group, even without solutions
+        if not group and not totals:
+            totals[()] = {}
+
+        estimates = [var for var in shape.projection if not isinstance(columns[var], int)]
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        rows = []
+        for key, reports in totals.items():
+            row = {var: key[columns[var]] for var in shape.projection if isinstance(columns[var], int)}
+            for index, var in enumerate(estimates):
+                total, variance = self._estimate(reports, index, rate)
+                integer = columns[var].name == 'Aggregate_Count'
+                bounds = (max(total - z * sqrt(variance), 0) if integer else total - z * sqrt(variance), total + z * sqrt(variance))
+                row[var], row[Variable(var + '_lower')], row[Variable(var + '_upper')] = (Literal(int(round(value))) if integer else Literal(value) for value in (total,) + bounds)
+            rows.append(row)
+
+        #Apply ORDER BY and LIMIT/OFFSET
+        if shape.order:
+            for var, descending in reversed(shape.order):
+                rows.sort(key=lambda row: term_sort_key(row.get(var)), reverse=descending)
+        end = None if shape.length is None else shape.start + shape.length
+        rows = rows[shape.start:end]
+
+        result = Result('SELECT')
+        result.vars = []
+        for var in shape.projection:
+            result.vars.append(var)
+            if var in estimates:
+                result.vars.extend([Variable(var + '_lower'), Variable(var + '_upper')])
+        result.bindings = [{var: value for var, value in row.items() if value is not None} for row in rows]
+        return result
+
+    def bound(self, shape, result):
+        """Add the bounds of an estimate to the exact result of an estimable query, both equal to the exact value. The result of an approximate query then has the same variables whether it was estimated or answered exactly, such as from an aggregate view.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            result (rdflib.query.Result): exact result of the query.
+
+        Returns:
+            rdflib.query.Result: the result with ?x_lower and ?x_upper following each variable ?x that would be estimated. The result itself if the query can't be estimated.
+        """
+        columns = _columns(shape)
+        if columns is None:
+            return result
+        estimates = [var for var in shape.projection if not isinstance(columns[var], int)]
+        bounded = Result('SELECT')
+        bounded.vars = []
+        for var in result.vars:
+            bounded.vars.append(var)
+            if var in estimates:
+                bounded.vars.extend([Variable(var + '_lower'), Variable(var + '_upper')])
+        bounded.bindings = []
+        for row in result.bindings:
+            row = dict(row)
+            for var in estimates:
+                if row.get(var) is not None:
+                    row[Variable(var + '_lower')] = row[Variable(var + '_upper')] = row[var]
+            bounded.bindings.append(row)
+        return bounded
+
+    def _evaluate(self, shape, graph, group, columns, nodes):
+        """Evaluate the pattern of a query over a sample graph and sum the contribution of every sampled report to each group.
+
+        Args:
+            shape (algebra.QueryShape): shape of the query.
+            graph (rdflib.Graph): sample graph to be queried.
+            group ([rdflib.term.Variable]): group variables.
+            columns (dict): group variable index or aggregate of each projected variable.
+            nodes (dict): context and stratum of every sampled report node.
+
+        Returns:
+            {tuple: {rdflib.URIRef: [float]}}: for each group key, the contribution of each report to each estimated variable. None if a solution doesn't bind exactly one sampled report.
+        """
+        #A shape only exists once a query was parsed, so the SPARQL plugin is already loaded here
+        from rdflib.plugins.sparql.evaluate import evalPart
+        from rdflib.plugins.sparql.sparql import QueryContext
+
+        aggregates = [source for source in columns.values() if not isinstance(source, int)]
+        context = QueryContext(graph)
+        context.prologue = shape.prepared.prologue
+
+        totals = {}
+        for solution in evalPart(context, shape.pattern):
+            reports = {value for value in solution.values() if value in nodes}
+            if len(reports) != 1:
+                return None
+            report = reports.pop()
+            values = totals.setdefault(tuple(solution.get(var) for var in group), {}).setdefault(report, [0] * len(aggregates))
+            for index, aggregate in enumerate(aggregates):
+                if aggregate.vars == '*':
+                    values[index] += 1
+                    continue
+                value = solution.get(aggregate.vars)
+                if value is None:
+                    continue
+                if aggregate.name == 'Aggregate_Count':
+                    values[index] += 1
+                    continue
+                value = value.toPython() if isinstance(value, Literal) else None
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    return None
+                values[index] += value
+
+        #Reports are replaced by their stratum once their contributions are complete
+        return {key: {(nodes[report], report): values for report, values in reports.items()} for key, reports in totals.items()}
+
+    def _estimate(self, reports, index, rate):
+        """Scale the contributions of sampled reports to a total and estimate its variance.
+
+        Args:
+            reports (dict): contributions of each sampled report, by (context and stratum, report).
+            index (int): index of the estimated variable.
+            rate (float): rate of the sample.
+
+        Returns:
+            (float, float): estimated total and its variance.
+        """
+        strata = {}
+        for (stratum, _), values in reports.items():
+            sums = strata.setdefault(stratum, [0, 0])
+            sums[0] += values[index]
+            sums[1] += values[index] ** 2
+
+        total = variance = 0
+        for (context, stratum), (sum_y, sum_y2) in strata.items():
+            population = self._population[context][stratum]
+            sampled = self._sampled[(context, rate)][stratum]
+            total += population / sampled * sum_y
+            if sampled > 1:
+                #Reports of the stratum without a solution contribute zeros to its sample variance
+                s2 = max(sum_y2 - sum_y ** 2 / sampled, 0) / (sampled - 1)
+                variance += population ** 2 * (1 - sampled / population) * s2 / sampled
+        return total, variance
+
+    def __getstate__(self):
+        """Get the state of the samples to be pickled, with the triples of the sample graphs instead of their stores.
+
+        Returns:
+            dict: the state.
+        """
+        state = dict(self.__dict__)
+        state['_graphs'] = {rate: (list(graph.namespaces()), [(s, p, o, c.identifier) for s, p, o, c in graph.quads()]) for rate, graph in self._graphs.items()}
+        return state
+
+    def __setstate__(self, state):
+        """Restore pickled samples.
+
+        Args:
+            state (dict): the state returned by __getstate__.
+        """
+        graphs = state.pop('_graphs')
+        self.__dict__.update(state)
+        self._graphs = {}
+        for rate, (namespaces, quads) in graphs.items():
+            graph = self._graphs[rate] = ConjunctiveGraph(ContextStore())
+            for prefix, namespace in namespaces:
+                graph.bind(prefix, namespace)
+            graph.addN((s, p, o, graph.get_context(c)) for s, p, o, c in quads)
+
+def _columns(shape):
+    """Map the projected variables of an estimable query to what they are computed from. Estimable queries are SELECT queries grouped by variables, whose projection only holds group variables and plain COUNT or SUM aggregates.
+
+    Args:
+        shape (algebra.QueryShape): shape of the query.
+
+    Returns:
+        {rdflib.term.Variable: int|CompValue}: index of the group variable of each projected variable, or its aggregate. None if the query can't be estimated.
+    """
+    if shape is None or shape.type != 'SelectQuery' or not shape.is_aggregate or shape.having is not None or shape.pattern is None:
+        return None
+    group = list(shape.group or [])
+    if not all(isinstance(var, Variable) for var in group):
+        return None
+
+    #Every projected variable must either be a group variable or a plain count or sum of solutions
+    columns = {}
+    for var in shape.projection:
+        source = shape.resolve(var)
+        if source is None:
+            return None
+        if isinstance(source, Variable):
+            if source not in group:
+                return None
+            columns[var] = group.index(source)
+        elif source.name == 'Aggregate_Sample' and source.vars in group:
+            columns[var] = group.index(source.vars)
+        elif source.name in _ESTIMABLE and not source.distinct and (source.vars == '*' or isinstance(source.vars, Variable)):
+            columns[var] = source
+        else:
+            return None
+    if shape.order and any(var not in columns for var, _ in shape.order):
+        return None
+    return columns
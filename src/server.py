@@ -0,0 +1,288 @@
+from .monitor import Span
+from .replica import ReplicaError, ReplicaPool
+from .results import write_result
+from asyncio import Semaphore, TimeoutError, new_event_loop, set_event_loop, start_server, wait_for, wrap_future
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from json import dumps
+from multiprocessing import get_all_start_methods
+from os import cpu_count
+from time import perf_counter
+from urllib.parse import parse_qs, urlsplit
+
+#Manager shared by all query workers. Replicas inherit it copy-on-write.
+_manager = None
+
+#Media types of each result format, in order of preference
+MEDIA_TYPES = {
+    'json': 'application/sparql-results+json',
+    'csv': 'text/csv',
+    'tsv': 'text/tab-separated-values',
+    'xml': 'application/sparql-results+xml',
+}
+
+#Accepted aliases of each result format
+_ACCEPT = {
+    'application/sparql-results+json': 'json', 'application/json': 'json',
+    'text/csv': 'csv',
+    'text/tab-separated-values': 'tsv',
+    'application/sparql-results+xml': 'xml', 'application/xml': 'xml', 'text/xml': 'xml',
+    '*/*': 'json', 'application/*': 'json', 'text/*': 'csv',
+}
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 406: 'Not Acceptable', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+class Server:
+    """A Server class used to serve SPARQL 1.1 Protocol queries over one loaded rdf graph.
+    """
+    def __init__(self, manager, host='127.0.0.1', port=8000, workers=None, max_concurrent=None, timeout=60, max_body=1048576):
+        """Initialize Server class.
+
+        Args:
+            manager (rdf.Manager): the rdf manager holding the graph to be queried.
+            host (string, optional): address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): port to listen on. Defaults to 8000.
+            workers (int, optional): number of query workers. Defaults to the number of cores.
+            max_concurrent (int, optional): maximum number of queries being evaluated at once. Defaults to the number of workers.
+            timeout (float, optional): seconds a request may wait and run before it is answered with 504. Defaults to 60.
+            max_body (int, optional): maximum size of a request body in bytes. Defaults to 1048576.
+        """
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.workers = workers or cpu_count() or 1
+        self.max_concurrent = max_concurrent or self.workers
+        self.timeout = timeout
+        self.max_body = max_body
+        self.metrics = {'requests': 0, 'queries': 0, 'errors': 0, 'timeouts': 0, 'in_flight': 0, 'query_seconds': 0.0}
+        self._executor = None
+        self._semaphore = None
+
+    def serve_forever(self):
+        """Start the worker pool and serve requests until interrupted.
+        """
+        global _manager
+
+        #Forked replicas share the loaded graph. Fall back to threads where fork isn't available.
+        _manager = self.manager
+        if 'fork' in get_all_start_methods():
+            self._executor = ReplicaPool(self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(self.workers)
+
+        loop = new_event_loop()
+        set_event_loop(loop)
+        self._semaphore = Semaphore(self.max_concurrent)
+        server = loop.run_until_complete(start_server(self._handle, self.host, self.port))
+        print('INFO: Serving SPARQL endpoint on http://%s:%s/sparql...' % (self.host, self.port))
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            _manager = None
+
+    async def _handle(self, reader, writer):
+        """Handle one http connection.
+
+        Args:
+            reader (asyncio.StreamReader): stream of the request.
+            writer (asyncio.StreamWriter): stream of the response.
+        """
+        self.metrics['requests'] += 1
+        try:
+            status, content_type, body = await self._respond(reader)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            status, content_type, body = 500, 'text/plain', str(e).encode('utf-8')
+
+        header = 'HTTP/1.1 %s %s\r\nContent-Type: %s; charset=utf-8\r\nContent-Length: %s\r\nConnection: close\r\n\r\n' % (status, _REASONS.get(status, ''), content_type, len(body))
+        writer.write(header.encode('latin-1') + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(self, reader):
+        """Parse a request and build its response.
+
+        Args:
+            reader (asyncio.StreamReader): stream of the request.
+
+        Returns:
+            (int, string, bytes): status, content type and body of the response.
+        """
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        if not request_line:
+            return 400, 'text/plain', b'Empty request'
+        method, target, _ = (request_line.split(' ') + ['', ''])[:3]
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0) or 0)
+        if length > self.max_body:
+            return 413, 'text/plain', b'Request body is too large'
+        body = (await reader.readexactly(length)).decode('utf-8') if length else ''
+
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        if url.path == '/health':
+            health = {'status': 'ok', 'triples': len(self.manager.c_graph), 'contexts': self.manager.get_context_id(), 'versions': self.manager.get_versions()}
+            if isinstance(self._executor, ReplicaPool):
+                health['replicas'] = self._executor.stats()
+            return 200, 'application/json', dumps(health).encode('utf-8')
+        if url.path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', self._format_metrics().encode('utf-8')
+        if url.path != '/sparql':
+            return 404, 'text/plain', b'Not found'
+
+        #SPARQL 1.1 Protocol: query via GET, url-encoded POST or direct POST
+        if method == 'GET':
+            query = params.get('query', [None])[0]
+        elif method == 'POST':
+            content_type = headers.get('content-type', '').split(';')[0].strip()
+            if content_type == 'application/sparql-query':
+                query = body
+            else:
+                form = parse_qs(body)
+                params.update(form)
+                query = form.get('query', [None])[0]
+        else:
+            return 405, 'text/plain', b'Only GET and POST are allowed'
+        if not query:
+            return 400, 'text/plain', b'Missing query parameter'
+
+        format = self._negotiate(params.get('format', [None])[0], headers.get('accept', ''))
+        if not format:
+            return 406, 'text/plain', ('Supported media types: %s' % ', '.join(MEDIA_TYPES.values())).encode('utf-8')
+        id = params.get('default-graph-uri', [None])[0]
+
+        return await self._evaluate(query, id, format)
+
+    async def _evaluate(self, query, id, format):
+        """Evaluate a query on the worker pool under the concurrency limit and timeout. The replica of a query that times out is replaced, so it stops using a core.
+
+        Args:
+            query (SPARQL string): SPARQL statments used to query the graph.
+            id (string): Name of sub graphs to query.
+            format (string): result format.
+
+        Returns:
+            (int, string, bytes): status, content type and body of the response.
+        """
+        start = perf_counter()
+        deadline = start + self.timeout
+        try:
+            await wait_for(self._semaphore.acquire(), self.timeout)
+        except TimeoutError:
+            self.metrics['timeouts'] += 1
+            return 503, 'text/plain', b'Too many concurrent queries'
+
+        self.metrics['in_flight'] += 1
+        future = self._executor.submit(_evaluate_query, query, id, format)
+        try:
+            ok, body, record = await wait_for(wrap_future(future), max(deadline - perf_counter(), 0.001))
+        except TimeoutError:
+            self.metrics['timeouts'] += 1
+            if isinstance(self._executor, ReplicaPool):
+                self._executor.abort(future)
+            self.manager.monitor.mark('query', perf_counter() - start, format=format, error='TimeoutError')
+            return 504, 'text/plain', ('Query exceeded the %s seconds timeout' % self.timeout).encode('utf-8')
+        except ReplicaError as e:
+            self.metrics['errors'] += 1
+            self.manager.monitor.mark('query', perf_counter() - start, format=format, error='ReplicaError')
+            return 500, 'text/plain', str(e).encode('utf-8')
+        finally:
+            self.metrics['in_flight'] -= 1
+            self._semaphore.release()
+
+        #Replicas don't write to the sinks of the server, so the span they measured is recorded here
+        self.manager.monitor.add_record(record)
+        self.metrics['queries'] += 1
+        self.metrics['query_seconds'] += perf_counter() - start
+        if not ok:
+            self.metrics['errors'] += 1
+            return 400, 'text/plain', body
+        return 200, MEDIA_TYPES[format], body
+
+    def _negotiate(self, format, accept):
+        """Pick the result format from an explicit format parameter or the Accept header.
+
+        Args:
+            format (string): value of the format parameter.
+            accept (string): value of the Accept header.
+
+        Returns:
+            string: the result format. None if nothing acceptable is supported.
+        """
+        if format:
+            return format if format in MEDIA_TYPES else _ACCEPT.get(format)
+        if not accept:
+            return 'json'
+
+        #Order media ranges by their quality values
+        ranges = []
+        for i, media_range in enumerate(accept.split(',')):
+            parts = [x.strip() for x in media_range.split(';')]
+            quality = 1.0
+            for part in parts[1:]:
+                if part.startswith('q='):
+                    try:
+                        quality = float(part[2:])
+                    except ValueError:
+                        quality = 0.0
+            ranges.append((quality, i, parts[0]))
+        for quality, _, media_type in sorted(ranges, key=lambda r: (-r[0], r[1])):
+            if quality > 0 and media_type in _ACCEPT:
+                return _ACCEPT[media_type]
+        return None
+
+    def _format_metrics(self):
+        """Format server metrics in the Prometheus text format.
+
+        Returns:
+            string: the metrics.
+        """
+        lines = []
+        metrics = dict(self.metrics)
+        if isinstance(self._executor, ReplicaPool):
+            stats = self._executor.stats()
+            metrics.update({'replicas': stats['replicas'], 'replica_restarts': stats['restarts']})
+        for name, value in metrics.items():
+            gauge = name in ('in_flight', 'replicas')
+            metric = 'sparql_' + name + ('' if gauge else '_total')
+            lines.append('# TYPE %s %s' % (metric, 'gauge' if gauge else 'counter'))
+            lines.append('%s %s' % (metric, value))
+        return '\n'.join(lines) + '\n'
+
+def _evaluate_query(query, id, format):
+    """Evaluate a query and serialize its result. Executed inside a query worker.
+
+    Args:
+        query (SPARQL string): SPARQL statments used to query the graph.
+        id (string): Name of sub graphs to query.
+        format (string): result format.
+
+    Returns:
+        (bool, bytes, dict): whether the query succeeded, the serialized result or the error message, and the record of the 'query' span of its evaluation.
+    """
+    span = Span('query', attributes={'format': format, 'dataset': id} if id else {'format': format})
+    with span.running():
+        try:
+            result = _manager.execute(query, id)
+            stream = BytesIO()
+            span.add(rows=write_result(result, stream, format), bytes=stream.tell())
+            ok, body = True, stream.getvalue()
+        except Exception as e:
+            span.error = type(e).__name__
+            ok, body = False, str(e).encode('utf-8')
+    return ok, body, span.finish()
@@ -0,0 +1,104 @@
+import PyQt5.QtCore as qtc
+import PyQt5.QtGui as qtg
+
+class ResultTableModel(qtc.QAbstractTableModel):
+    """A ResultTableModel class used to show a query result in a table view. Rows are fetched from a result cursor only when the view scrolls to them.
+
+    Args:
+        PyQt5.QtCore.QAbstractTableModel: the base class of table models in PyQt5.
+    """
+    def __init__(self, cursor, renderer, batch_size=256, parent=None):
+        """Initialize ResultTableModel class.
+
+        Args:
+            cursor (results.ResultCursor): cursor over the result to be shown.
+            renderer (render.HTMLRenderer): renderer of the result, used to shorten urls.
+            batch_size (int, optional): number of rows fetched each time the view reaches the end of the table. Defaults to 256.
+            parent (QtCore.QObject, optional): parent object of this model. Defaults to None.
+        """
+        super().__init__(parent)
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.renderer = renderer
+        self._rows = len(cursor)
+
+        self._link_font = qtg.QFont()
+        self._link_font.setUnderline(True)
+
+    def rowCount(self, parent=qtc.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._rows
+
+    def columnCount(self, parent=qtc.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.cursor.headers)
+
+    def data(self, index, role=qtc.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self.cursor.row(index.row())[index.column()]
+        if role == qtc.Qt.DisplayRole:
+            return self.renderer.shorten(value) if is_url(value) else value
+        if role == qtc.Qt.ToolTipRole:
+            return value
+        if is_url(value):
+            if role == qtc.Qt.ForegroundRole:
+                return qtg.QBrush(qtg.QColor('blue'))
+            if role == qtc.Qt.FontRole:
+                return self._link_font
+        return None
+
+    def headerData(self, section, orientation, role=qtc.Qt.DisplayRole):
+        if role != qtc.Qt.DisplayRole:
+            return None
+        if orientation == qtc.Qt.Horizontal:
+            return self.cursor.headers[section]
+        return str(section)
+
+    def canFetchMore(self, parent=qtc.QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._rows < len(self.cursor) or not self.cursor.exhausted
+
+    def fetchMore(self, parent=qtc.QModelIndex()):
+        if parent.isValid():
+            return
+        self.fetch_until(self._rows + self.batch_size)
+
+    def fetch_until(self, count):
+        """Fetch rows until the table has count rows or the result ends.
+
+        Args:
+            count (int): number of rows the table should have.
+        """
+        if count > len(self.cursor):
+            self.cursor.fetch(count - len(self.cursor))
+        count = min(count, len(self.cursor))
+        if count > self._rows:
+            self.beginInsertRows(qtc.QModelIndex(), self._rows, count - 1)
+            self._rows = count
+            self.endInsertRows()
+
+    def value(self, index):
+        """Get the full value of a cell.
+
+        Args:
+            index (PyQt5.QtCore.QModelIndex): index of the cell.
+
+        Returns:
+            string: value of the cell.
+        """
+        return self.cursor.row(index.row())[index.column()]
+
+def is_url(value):
+    """Check whether a value is a url that can be navigated to.
+
+    Args:
+        value (string): value to be checked.
+
+    Returns:
+        bool: whether the value is a url.
+    """
+    return value.startswith('http://') or value.startswith('https://')
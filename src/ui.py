@@ -1,13 +1,12 @@
-import dominate
-from dominate.tags import *
+from .navigation import EntityNavigator, History
+from .render import HTMLRenderer
+from .table import ResultTableModel, is_url
+from .workers import DescribeWorker, ExportWorker, ImportWorker, QueryWorker
 from pathlib import Path
 import PyQt5.QtGui as qtg
 import PyQt5.QtCore as qtc
 import PyQt5.QtWidgets as qtw
-import PyQt5.QtWebEngineCore as qtwec
-import PyQt5.QtWebEngineWidgets as qtwew
-import re
-from urllib.parse import quote, unquote
+from time import perf_counter
 
 class MainWindow (qtw.QWidget):
     """The MainWindow class used to initialize ui and its functionality. 
@@ -15,20 +14,43 @@ class MainWindow (qtw.QWidget):
     Args:
         PyQt5.QtWidgets.QWdiget: the base class for all user interface objects in PyQt5.
     """
-    def __init__(self, rdf_manager, scheme_handler):
+    def __init__(self, rdf_manager, started=None):
         """Initialize main window. 
 
         Args:
             rdf_manager (rdf.Manager): the rdf manager used to manage rdf graphs.
-            scheme_handler (PyQt5.QtWebEngineCore.QWebEngineUrlSchemeHandler): a handler used to handle custom url requests.
+            started (float, optional): time.perf_counter() when the program started, used to report time-to-window and time-to-first-query. Defaults to None.
         """
         #Initialize parents class
         super().__init__()
 
         #Initialize variables
         self.rdf_manager = rdf_manager
-        self.scheme_handler = scheme_handler
-        self.chunked_data=[[[]]]
+        self.result_model = None
+        self.renderer = None
+        self.web_page = 0
+        self.web_type = 'html'
+
+        #The web viewer and its custom url handler are created when the Chunk tab is first shown, so WebEngine isn't loaded before
+        self.scheme_handler = None
+        self.web_view = None
+
+        #Startup times are reported once
+        self.started = started
+        self.first_query_reported = False
+
+        #Settings kept across sessions, such as the last imported graph
+        self.settings = qtc.QSettings('SPARQL-with-LA-Public-Safety-Data', 'ui')
+
+        #Entities behind clicked urls are described through the store indexes
+        self.navigator = EntityNavigator(rdf_manager)
+        self.history = History()
+        self.chunk_size = 1000
+        self.last_query = None
+
+        #Long operations run on a thread pool so the window stays responsive
+        self.thread_pool = qtc.QThreadPool.globalInstance()
+        self.worker = None
 
         #Initialize main window
         self.setWindowTitle('SPARQL-with-LA-Public-Safety-Data')
@@ -41,11 +63,65 @@ class MainWindow (qtw.QWidget):
         self._rdf_file_path_widgets = self.import_component()
         self.query_component()
         self.count_and_chunk_selector_component()
+        self.progress_component()
         self.output_component()
+        self.set_busy(False)
 
         #Show main window
         self.show()
 
+        #Runs once the window is painted
+        qtc.QTimer.singleShot(0, self.window_shown)
+
+    def window_shown(self):
+        """Execute once the main window is painted. Report time-to-window and open the last graph in the background if asked to.
+        """
+        self.report_startup('time-to-window', 'Window shown')
+
+        path = self.settings.value('last-graph', '')
+        if self.findChild(qtw.QCheckBox, 'open-last-graph').isChecked() and path and Path(path).exists() and not self.worker:
+            #The snapshot written when the graph was imported is used while the file is unchanged
+            snapshot = self.snapshot_path()
+            from_snapshot = snapshot.exists() and self.settings.value('last-graph-snapshot', '') == self.graph_key(path)
+            print('INFO: Opening last graph \'%s\'...' % path)
+            self.findChild(qtw.QLineEdit, 'filename').setText(path)
+            self.start_worker(ImportWorker(self.rdf_manager, path, snapshot, from_snapshot), self.import_finished)
+
+    def snapshot_path(self):
+        """Get the path of the snapshot of the last imported graph.
+
+        Returns:
+            Path: path in the cache directory of the program.
+        """
+        directory = Path(qtc.QStandardPaths.writableLocation(qtc.QStandardPaths.GenericCacheLocation) or '.') / 'SPARQL-with-LA-Public-Safety-Data'
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / 'last-graph.pkl'
+
+    def graph_key(self, path):
+        """Identify the content of a graph file by its path, size and modification time.
+
+        Args:
+            path (string): path to the rdf file.
+
+        Returns:
+            string: the key.
+        """
+        path = Path(path).resolve()
+        return '%s|%s|%s' % (path, path.stat().st_size, path.stat().st_mtime_ns)
+
+    def report_startup(self, name, desc):
+        """Print and record the time since the program started.
+
+        Args:
+            name (string): name of the recorded stage.
+            desc (string): description printed with the time.
+        """
+        if self.started is None:
+            return
+        seconds = perf_counter() - self.started
+        print('INFO: %s %.3f s after start' % (desc, seconds))
+        self.rdf_manager.monitor.mark(name, seconds)
+
     def title_component(self):
         """Initalize title component.
         """
@@ -97,6 +173,15 @@ class MainWindow (qtw.QWidget):
         buttom.clicked.connect(self.import_button_clicked)
         container.layout().addWidget(buttom) 
 
+        #Open last graph on start checkbox
+        checkbox = qtw.QCheckBox('Open last')
+        checkbox.setObjectName('open-last-graph')
+        checkbox.setFont(font)
+        checkbox.setToolTip('Import the last imported graph in the background when the program starts')
+        checkbox.setChecked(self.settings.value('open-last-graph', False, type=bool))
+        checkbox.toggled.connect(lambda checked: self.settings.setValue('open-last-graph', checked))
+        container.layout().addWidget(checkbox)
+
         #Add import component to main window
         self.layout().addWidget(container, stretch = 2)
 
@@ -199,6 +284,66 @@ class MainWindow (qtw.QWidget):
         combo_box.currentIndexChanged.connect(self.chunk_selection_change)
         container.layout().addWidget(combo_box, 1)
 
+        #Back button component
+        buttom = qtw.QPushButton('<')
+        buttom.setObjectName('back')
+        buttom.setFont(font)
+        buttom.setToolTip('Back')
+        buttom.clicked.connect(self.back_button_clicked)
+        container.layout().addWidget(buttom, 1)
+
+        #Forward button component
+        buttom = qtw.QPushButton('>')
+        buttom.setObjectName('forward')
+        buttom.setFont(font)
+        buttom.setToolTip('Forward')
+        buttom.clicked.connect(self.forward_button_clicked)
+        container.layout().addWidget(buttom, 1)
+
+        #Export button component
+        buttom = qtw.QPushButton('Export')
+        buttom.setObjectName('export')
+        buttom.setFont(font)
+        buttom.clicked.connect(self.export_button_clicked)
+        container.layout().addWidget(buttom, 1)
+
+        #Add child components to main window
+        self.layout().addWidget(container, stretch = 1)
+
+    def progress_component(self):
+        """Initialize progress indicator component. It is only visible while an operation is running.
+        """
+        #Create container to store all child components
+        container = qtw.QWidget()
+        container.setObjectName('progress-container')
+        container.setLayout(qtw.QHBoxLayout())
+        container.layout().setContentsMargins(2, 2, 2, 2)
+
+        #Initalize custom fonts
+        font = qtg.QFont('Play', 10)
+
+        #Create child components
+        #Stage label component
+        label = qtw.QLabel('')
+        label.setObjectName('progress-label')
+        label.setFont(font)
+        container.layout().addWidget(label, 5)
+
+        #Progress bar component
+        progress_bar = qtw.QProgressBar()
+        progress_bar.setObjectName('progress-bar')
+        progress_bar.setFont(font)
+        container.layout().addWidget(progress_bar, 20)
+
+        #Cancel button component
+        buttom = qtw.QPushButton('Cancel')
+        buttom.setObjectName('cancel')
+        buttom.setFont(font)
+        buttom.clicked.connect(self.cancel_button_clicked)
+        container.layout().addWidget(buttom, 1)
+
+        container.setHidden(True)
+
         #Add child components to main window
         self.layout().addWidget(container, stretch = 1)
 
@@ -210,15 +355,34 @@ class MainWindow (qtw.QWidget):
         container.setLayout(qtw.QHBoxLayout())
         container.layout().setContentsMargins(2, 2, 2, 2)
 
+        #Initalize custom fonts
+        font = qtg.QFont('Play', 10)
+
         #Create child components
-        #Web Viwer component 
-        browser = qtwew.QWebEngineView()
-        browser.setObjectName('html-output')
-        browser.setContextMenuPolicy(qtc.Qt.ContextMenuPolicy.NoContextMenu)
-        container.layout().addWidget(browser)
+        tabs = qtw.QTabWidget()
+        tabs.setObjectName('output-tabs')
+        tabs.setFont(font)
+        container.layout().addWidget(tabs)
+
+        #Table component. Rows are fetched while scrolling.
+        table = qtw.QTableView()
+        table.setObjectName('table-output')
+        table.setFont(font)
+        table.setWordWrap(False)
+        table.verticalHeader().setDefaultSectionSize(table.fontMetrics().height() + 6)
+        table.clicked.connect(self.table_cell_clicked)
+        tabs.addTab(table, 'Table')
+
+        #Web Viwer component. The viewer itself is created when the tab is first shown.
+        viewer = qtw.QWidget()
+        viewer.setObjectName('html-output-container')
+        viewer.setLayout(qtw.QVBoxLayout())
+        viewer.layout().setContentsMargins(0, 0, 0, 0)
+        tabs.addTab(viewer, 'Chunk')
+        tabs.currentChanged.connect(self.output_tab_changed)
 
         #Add output component to main window
-        self.layout().addWidget(browser, stretch = 100)
+        self.layout().addWidget(container, stretch = 100)
 
     def import_button_clicked(self):
         """Execute when import button is clicked.
@@ -231,8 +395,17 @@ class MainWindow (qtw.QWidget):
         else:
             filename = self.findChild(qtw.QLineEdit, 'filename').text()
 
-        #Attempt to import rdf file to graph
-        successfully_imported, path = self.rdf_manager.import_file(filename)
+        #Attempt to import rdf file to graph on a worker thread
+        self.findChild(qtw.QLineEdit, 'filename').setText(str(filename))
+        self.start_worker(ImportWorker(self.rdf_manager, filename, self.snapshot_path()), self.import_finished)
+
+    def import_finished(self, result):
+        """Execute when an import worker finished.
+
+        Args:
+            result ((bool, string)): whether the file was imported, and its path.
+        """
+        successfully_imported, path = result
 
         #Update the ui to show which file is being imported
         self.findChild(qtw.QLineEdit, 'filename').setText(str(path))
@@ -240,6 +413,8 @@ class MainWindow (qtw.QWidget):
         #If import successfully, show green border around filename input field
         if successfully_imported:
             self.findChild(qtw.QLineEdit, 'filename').setStyleSheet('border: 2px solid LightGreen')
+            self.settings.setValue('last-graph', str(path))
+            self.settings.setValue('last-graph-snapshot', self.graph_key(path))
         #Else, show  red border
         else:
             self.findChild(qtw.QLineEdit, 'filename').setStyleSheet('border: 2px solid red')
@@ -250,6 +425,11 @@ class MainWindow (qtw.QWidget):
         #Retreive the query from sparql input field component
         query = self.findChild(qtw.QPlainTextEdit, 'sparql-query').toPlainText()
 
+        #Only one operation runs at a time
+        if self.worker:
+            return
+
+        self.history.visit(('query', query))
         self.excute_query_process(query)
         
         
@@ -259,303 +439,308 @@ class MainWindow (qtw.QWidget):
         Args:
             query (string): a sparql statment used to query  the graph.
         """
-        #Query graph
-        result = self.rdf_manager.query(query)
-        headers = []
+        #Query graph on a worker thread
+        self.last_query = query
+        self.start_worker(QueryWorker(self.rdf_manager, query), lambda result: self.show_query_result(query, result))
 
-        #Normalize query
-        query = query.replace('\n', ' ')
-        query = query.replace('\t', ' ')
-        query = re.sub(' +', ' ', query)
-        query = query.strip()
+    def show_query_result(self, query, cursor):
+        """Update ui to show the result of a query.
 
-        if '*' in re.split('where', query, flags=re.IGNORECASE)[0] or 'WHERE'.upper() not in query.upper():
-            if len(result)!=0:
-                headers = [x for x in range(len(result[0]))]
-        else:
-            #Extract headers from SPARQL query. Use 1,2,3... if no header is provided.
-            splitted_query = re.split('where', query, flags=re.IGNORECASE)[0]
-            splitted_query = re.split(' ', splitted_query)[1:]
-            splitted_query = [x for x in splitted_query if x !='']
-            accumulation = ''
-            for i in range(len(splitted_query)):
-                accumulation = accumulation + ' ' + splitted_query[i]
-                if (accumulation.count('(') == accumulation.count (')')):
-                    match = re.compile(r"[?][\S]+$")
-                    regex = match.search(accumulation)
-                    if regex:
-                        accumulation = regex.group(0)
-                        if accumulation[-1] == ')':
-                            accumulation = accumulation[:-1]
-                        if accumulation[0] == '?':
-                            accumulation = accumulation[1:]
-                        headers.append(accumulation)
-                    else:
-                        if len(result)!=0:
-                            headers = [x for x in range(len(result[0]))] 
-
-        #Insert headers onto result
-        result.insert(0,headers)
+        Args:
+            query (string): a sparql statment used to query  the graph.
+            cursor (results.ResultCursor): cursor over the result.
+        """
+        #Snapshot namespaces once for every chunk of the result
+        self.renderer = HTMLRenderer(self.rdf_manager.get_namespace())
 
-        #Show how many result found
-        self.findChild(qtw.QLabel, 'count-output').setText( str(len(result)-1) + ' results found')
+        #Show the result in the table. The model fetches the rest of the rows on demand.
+        self.result_model = ResultTableModel(cursor, self.renderer, parent=self)
+        self.result_model.rowsInserted.connect(self.result_rows_fetched)
+        self.findChild(qtw.QTableView, 'table-output').setModel(self.result_model)
+
+        #Report the time until the first result is shown
+        if not self.first_query_reported:
+            self.first_query_reported = True
+            self.report_startup('time-to-first-query', 'First query answered')
 
-        #Split result into chuck 
-        self.chunked_data = self.split_data_into_chunk(result)
+        #Serve pages of the result to the web viewer
+        if self.scheme_handler:
+            self.scheme_handler.set_result(cursor, self.renderer)
 
-        #Update chunk selector options
+        #Update result count and chunk selector options
         chunk_selector = self.findChild(qtw.QComboBox, 'chunk-selector')
+        chunk_selector.blockSignals(True)
         chunk_selector.clear()
-        chuck_indexes = range(len(self.chunked_data))
-        chuck_indexes = [str(x) for x in chuck_indexes]
-        chunk_selector.addItems(chuck_indexes)
+        chunk_selector.blockSignals(False)
+        self.result_rows_fetched()
 
-        #Show chunk 0 
+        #Show chunk 0
         self.chunk_selection_change(0)
 
-
-    def to_html_button_clicked(self):
-        
-        """Execute when To HTML button is clicked.
+    def result_rows_fetched(self, *_):
+        """Execute when more rows of the result are fetched. Update result count and chunk selector options.
         """
-        #Disable To HTML button
-        self.findChild(qtw.QPushButton, 'to-html').setHidden(True)
-
-        #Enable To Text button
-        self.findChild(qtw.QPushButton, 'to-plaintext').setHidden(False)
+        rows = self.result_model.rowCount()
+        exhausted = self.result_model.cursor.exhausted
 
-        #Update web viwer to render data
-        self.update_web_viewer(_type='html')
+        #Show how many result found
+        if exhausted:
+            self.findChild(qtw.QLabel, 'count-output').setText(str(rows) + ' results found')
+        else:
+            self.findChild(qtw.QLabel, 'count-output').setText(str(rows) + '+ results loaded')
 
-    def to_plain_text_button_clicked(self):
-        """Execute when To Text button is clicked.
-        """
-        #Enable To HTML button
-        self.findChild(qtw.QPushButton, 'to-html').setHidden(False)
+        #Offer every fetched chunk, and the next one if the result isn't exhausted yet
+        chunks = max(-(-rows // self.chunk_size), 1)
+        if not exhausted and rows % self.chunk_size == 0:
+            chunks += 1
+        chunk_selector = self.findChild(qtw.QComboBox, 'chunk-selector')
+        chunk_selector.blockSignals(True)
+        chunk_selector.addItems([str(x) for x in range(chunk_selector.count(), chunks)])
+        chunk_selector.blockSignals(False)
 
-        #Disable To Text button
-        self.findChild(qtw.QPushButton, 'to-plaintext').setHidden(True)
+    def table_cell_clicked(self, index):
+        """Execute when a cell of the result table is clicked. Navigate to the clicked url.
 
-        #Update web viewr to not render data
-        self.update_web_viewer(_type='plain')
+        Args:
+            index (PyQt5.QtCore.QModelIndex): index of the clicked cell.
+        """
+        value = self.result_model.value(index)
+        if is_url(value):
+            self.navigate_to('<' + value + '>')
 
-    def update_web_viewer(self, data = None, _type = None):
-        """Update web viewer by modifying how custom url handler respond to request.
+    def navigate_to(self, target):
+        """Show every triple the target appears in.
 
         Args:
-            data (string, optional): data stored by the custom url handler. Defaults to None.
-            _type (string, optional): reply format of data by the custom url handler. Defaults to None.
+            target (string): the reference that should be direct to
         """
-        #If data is provided, update handler stored ata
-        if data:
-            self.scheme_handler.set_data(data)
+        #Only one operation runs at a time
+        if self.worker:
+            return
 
-        #If type is provided, update handler stored type
-        if _type:
-            self.scheme_handler.set_type(_type)
-        
-        #Reset web viwer and load new resppond
-        self.findChild(qtwew.QWebEngineView, 'html-output').setHtml('')
-        self.findChild(qtwew.QWebEngineView, 'html-output').load(qtc.QUrl('custom-url-scheme://retrieve-data/'))
+        uri = self.navigator.parse(target)
 
-    def chunk_selection_change(self, index):
-        """Execute when result chuck selection is changed.
+        #Anything but a url goes through the SPARQL query
+        if uri is None:
+            query0 = 'SELECT (COALESCE(%s) as ?s) ?p ?o WHERE {%s ?p ?o}' % (target, target)
+            query1 = 'SELECT ?s (COALESCE(%s) as ?p) ?o WHERE {?s %s ?o}' % (target, target)
+            query2 = 'SELECT ?s ?p (COALESCE(%s) as ?o) WHERE {?s ?p %s}' % (target, target)
+
+            query = 'SELECT ?s ?p ?o WHERE {{%s} UNION {%s} UNION {%s}}' % (query0, query1, query2)
+
+            self.history.visit(('query', query))
+            self.excute_query_process(query)
+            return
+
+        self.history.visit(('entity', uri))
+        self.show_entity(uri)
+
+    def show_entity(self, uri):
+        """Describe an entity on a worker thread and show it.
 
         Args:
-            index (int): new index of the chuck selected.
+            uri (rdflib.URIRef): url of the entity.
         """
-        #Reset to To HTML button if it is still at To Text button
-        if not self.findChild(qtw.QPushButton, 'to-html').isHidden():
-            self.to_html_button_clicked()
+        #Exports re-run the equivalent query
+        query = self.navigator.query(uri)
+        self.last_query = query
+        self.start_worker(DescribeWorker(self.rdf_manager, self.navigator, uri), lambda result: self.show_query_result(query, result))
 
-        #Convert data chuck to html table
-        html = self.data_to_html(self.chunked_data[index])
+    def back_button_clicked(self):
+        """Execute when back button is clicked.
+        """
+        self.show_history_entry(self.history.back())
 
-        #Update web viewer to show the latest result
-        self.update_web_viewer(data = html, _type='html')
+    def forward_button_clicked(self):
+        """Execute when forward button is clicked.
+        """
+        self.show_history_entry(self.history.forward())
 
-    def data_to_html(self, data):
-        """Convert 2d array of data to html table. Ensure that all urls are hyperlink.
+    def show_history_entry(self, entry):
+        """Show an entry of the navigation history again.
 
         Args:
-            data (string): 2d array contains data to be converted.
+            entry ((string, object)): the kind of the entry, 'query' or 'entity', and its query or url.
+        """
+        if entry is None:
+            return
+        kind, value = entry
+        if kind == 'entity':
+            self.show_entity(value)
+        else:
+            self.findChild(qtw.QPlainTextEdit, 'sparql-query').setPlainText(value)
+            self.excute_query_process(value)
 
-        Returns:
-            string: html table contains data.
-        """
-        #Create html document
-        doc = dominate.document(title='SPARQL-Results')
-
-        #Initalize document style
-        with doc.head:
-            style('''
-            table, th, td {
-                border: 1px solid black;
-            }
-            
-            ''')
-
-        #Add children to html documents
-        with doc.add(table()):
-            with thead().add(tr()):
-                for i in data[0]:
-                    th(i)
-            with tbody():
-                for i in range(1, len(data)):
-                    with tr():
-                        for j in data[i]:
-                            if 'https://' in j or 'http://' in j:
-                                with td():
-                                    #Replace namepsace with prefix
-                                    shorted_name = j
-                                    for prefix_namespace in self.rdf_manager.get_namespace():
-                                        prefix, namespace = prefix_namespace
-                                        prefix = str(prefix)+':'
-                                        namespace = str(namespace)
-                                        if namespace in j:
-                                            shorted_name = j.replace(namespace, prefix)
-
-                                    node = a(shorted_name)
-                                    node['href']='custom-url-scheme://redirect-to/' + quote('<'+ j + '>') + '/'
-                            else:
-                                td(j)
-        return (str(doc))
-    
-    def split_data_into_chunk (self, data, chunk_size = 1000):
-        """Split data into smaller chunk.
+    def start_worker(self, worker, on_finished):
+        """Run a worker on the thread pool and show its progress. Only one worker runs at a time.
 
         Args:
-            data (string): data to be split.
-            chunk_size (int, optional): size of each chunk. Defaults to 1000.
+            worker (workers.Worker): the worker to be run.
+            on_finished (callable): a function called with the result of the worker.
+        """
+        if self.worker:
+            return
+        self.worker = worker
+        worker.signals.progress.connect(self.worker_progress)
+        worker.signals.partial.connect(lambda count: self.findChild(qtw.QLabel, 'count-output').setText(str(count) + ' results so far...'))
+        worker.signals.finished.connect(on_finished)
+        worker.signals.failed.connect(lambda message: self.findChild(qtw.QLabel, 'count-output').setText('Error: ' + message))
+        worker.signals.cancelled.connect(lambda: self.findChild(qtw.QLabel, 'count-output').setText('Cancelled'))
+        for signal in (worker.signals.finished, worker.signals.failed, worker.signals.cancelled):
+            signal.connect(self.worker_done)
+        self.set_busy(True)
+        self.thread_pool.start(worker)
+
+    def worker_progress(self, desc, n, total):
+        """Execute when a worker reports progress.
 
-        Returns:
-            string: a list of chucked data.
+        Args:
+            desc (string): description of the current stage.
+            n (int): current tick.
+            total (int): total tick. 0 when progress is infinite.
+        """
+        self.findChild(qtw.QLabel, 'progress-label').setText(desc)
+        progress_bar = self.findChild(qtw.QProgressBar, 'progress-bar')
+        progress_bar.setRange(0, total)
+        if total:
+            progress_bar.setValue(min(n, total))
+
+    def worker_done(self, *_):
+        """Execute when a worker finished, failed or was cancelled.
         """
-        #Do nothing if there is no data
-        if len(data) <=1:
-            return [data]
+        self.worker = None
+        self.set_busy(False)
 
-        #Extract the header from data
-        header = data[0]
-        data = data[1:]
+    def cancel_button_clicked(self):
+        """Execute when cancel button is clicked.
+        """
+        if self.worker:
+            self.worker.cancel()
+            self.findChild(qtw.QLabel, 'progress-label').setText('Cancelling...')
 
-        #Store all data chunk
-        chucked_data = []
+    def set_busy(self, busy):
+        """Show progress indicator and disable actions that can't run next to a worker.
 
-        #Start chunking data and add header to each chunk
-        for i in range(0,len(data), chunk_size):
-            temp_data = data[i:i+chunk_size]
-            temp_data.insert(0, header)
-            chucked_data.append(temp_data)
+        Args:
+            busy (bool): whether a worker is running.
+        """
+        self.findChild(qtw.QWidget, 'progress-container').setHidden(not busy)
+        for button in self.findChildren(qtw.QPushButton):
+            if button.objectName() not in ('cancel', 'to-html', 'to-plaintext'):
+                button.setEnabled(not busy)
 
-        return chucked_data
+        #History buttons are only enabled when there is somewhere to go
+        self.findChild(qtw.QPushButton, 'back').setEnabled(not busy and self.history.can_go_back())
+        self.findChild(qtw.QPushButton, 'forward').setEnabled(not busy and self.history.can_go_forward())
 
+    def export_button_clicked(self):
+        """Execute when export button is clicked. Stream the result of the last query to a file.
+        """
+        #Nothing to export before the first query
+        if not self.last_query:
+            return
 
-class SchemeHandler (qtwec.QWebEngineUrlSchemeHandler):
-    """A handler used to respond to the custom url requests.
+        filename, _ = qtw.QFileDialog.getSaveFileName(self, 'Export Results', './results.csv', 'CSV (*.csv);;TSV (*.tsv);;JSON (*.json);;XML (*.xml)')
+        if not filename:
+            return
 
-    Args:
-        PyQt5.QtWebEngineCore.QWebEngineUrlSchemeHandler: abstract class used to handle custom url.
-    """
-    def __init__(self, parent=None):
-        """Initalize the handler.
+        self.start_worker(ExportWorker(self.rdf_manager, self.last_query, filename), lambda count: self.findChild(qtw.QLabel, 'count-output').setText(str(count) + ' results exported to ' + filename))
 
-        Args:
-            parent (QtCore.QObject, optional): parent object of this handler. Defaults to None.
+    def to_html_button_clicked(self):
+        
+        """Execute when To HTML button is clicked.
         """
-        super().__init__(parent)
-        self._data = ''
-        self._type = ''
-        self._ui=None
+        #Disable To HTML button
+        self.findChild(qtw.QPushButton, 'to-html').setHidden(True)
+
+        #Enable To Text button
+        self.findChild(qtw.QPushButton, 'to-plaintext').setHidden(False)
 
-    def requestStarted(self, job):
-        """Execute when http occured.
+        #Update web viwer to render data
+        self.update_web_viewer(_type='html')
 
-        Args:
-            job (PyQt5.QtWebEngineCore.QWebEngineUrlRequestJob): the object contains all information related to the request.
+    def to_plain_text_button_clicked(self):
+        """Execute when To Text button is clicked.
         """
-        request_url = job.requestUrl().toString()
-        if request_url =='custom-url-scheme://retrieve-data/':
-            self._request_to_retrieve_data(job)
-        else:
-            target = request_url[32: len(request_url)-1]
-            target = unquote(target)
-            self._rediect_to_data(job, target)
-            pass
+        #Enable To HTML button
+        self.findChild(qtw.QPushButton, 'to-html').setHidden(False)
+
+        #Disable To Text button
+        self.findChild(qtw.QPushButton, 'to-plaintext').setHidden(True)
+
+        #Update web viewr to not render data
+        self.update_web_viewer(_type='plain')
 
-    def _rediect_to_data(self, job, target):
-        """Tell main window to execute a query for new target
+    def update_web_viewer(self, page = None, _type = None):
+        """Update web viewer by loading a page of the result from the custom url handler.
 
         Args:
-            job (PyQt5.QtWebEngineCore.QWebEngineUrlRequestJob): the object contains all information related to the request.
-            target (string): the reference that should be direct to
+            page (int, optional): index of the first page shown. Defaults to None.
+            _type (string, optional): reply format of data by the custom url handler. Defaults to None.
         """
-        query0 = 'SELECT (COALESCE(%s) as ?s) ?p ?o WHERE {%s ?p ?o}' % (target, target)
-        query1 = 'SELECT ?s (COALESCE(%s) as ?p) ?o WHERE {?s %s ?o}' % (target, target)
-        query2 = 'SELECT ?s ?p (COALESCE(%s) as ?o) WHERE {?s ?p %s}' % (target, target)
+        #If page is provided, update the page shown
+        if page is not None:
+            self.web_page = page
 
-        query = 'SELECT ?s ?p ?o WHERE {{%s} UNION {%s} UNION {%s}}' % (query0, query1, query2)
+        #If type is provided, update handler stored type
+        if _type:
+            self.web_type = _type
+            if self.scheme_handler:
+                self.scheme_handler.set_type(_type)
 
-        self._ui.excute_query_process(query)
-        pass
+        #The page is loaded once the web viewer is first shown
+        if not self.web_view:
+            return
 
+        #Load the page. The following pages are appended by the page itself while scrolling.
+        self.web_view.load(qtc.QUrl(self.scheme_handler.page_url(self.web_page)))
 
-    def _request_to_retrieve_data(self, job):
-        """Execute this function when a request to retreive data is recevied
+    def output_tab_changed(self, index):
+        """Execute when another output tab is selected. Create the web viewer the first time the Chunk tab is shown.
 
         Args:
-            job (PyQt5.QtWebEngineCore.QWebEngineUrlRequestJob): the object contains all information related to the request.
+            index (int): index of the selected tab.
         """
-        #Create buff to store data
-        buff = qtc.QBuffer(parent=self)
-        buff.open(qtc.QIODevice.WriteOnly)
-        buff.write(self._data.encode())
-        buff.seek(0)
-        buff.close()
+        tabs = self.findChild(qtw.QTabWidget, 'output-tabs')
+        if self.web_view or tabs.widget(index).objectName() != 'html-output-container':
+            return
+        self.create_web_viewer()
+        if self.result_model:
+            self.update_web_viewer()
+
+    def create_web_viewer(self):
+        """Load WebEngine, install the custom url handler and create the web viewer.
+        """
+        from .web import install_scheme_handler
+        import PyQt5.QtWebEngineWidgets as qtwew
 
-        #Replay to the request with data and its type
-        job.reply(self._type, buff)
+        self.scheme_handler = install_scheme_handler()
+        self.scheme_handler.set_ui(self)
+        self.scheme_handler.set_type(self.web_type)
+        if self.result_model:
+            self.scheme_handler.set_result(self.result_model.cursor, self.renderer)
 
-    
-    def set_data(self, data):
-        """Modify data stored in this handler.
+        self.web_view = qtwew.QWebEngineView()
+        self.web_view.setObjectName('html-output')
+        self.web_view.setContextMenuPolicy(qtc.Qt.ContextMenuPolicy.NoContextMenu)
+        self.findChild(qtw.QWidget, 'html-output-container').layout().addWidget(self.web_view)
 
-        Args:
-            data (string): data to be stored.
-        """
-        self._data = data
-    
-    def set_type(self, type_):
-        """Modify data type stored in this handler.
+    def chunk_selection_change(self, index):
+        """Execute when result chuck selection is changed.
 
         Args:
-            type_ (string): data type to be stored.
+            index (int): new index of the chuck selected.
         """
-        self._type = ('text/'+ type_).encode()
+        if not self.result_model or index < 0:
+            return
 
-    def set_ui(self, ui):
-        """Provide reference of ui to the handler.
-
-        Args:
-            ui (MainWindow): reference of ui.
-        """
-        self._ui = ui
+        #Reset to To HTML button if it is still at To Text button
+        if not self.findChild(qtw.QPushButton, 'to-html').isHidden():
+            self.findChild(qtw.QPushButton, 'to-html').setHidden(True)
+            self.findChild(qtw.QPushButton, 'to-plaintext').setHidden(False)
 
-def install_scheme_handler():
-    """Initlaize custom url scheme and register it with a handler .
+        #Fetch the rows of the chunk through the table model, so the table sees them too
+        self.result_model.fetch_until((index + 1) * self.chunk_size)
 
-    Returns:
-        handler: the handler responsibles for responding to custom url requests .
-    """
-    #initlaize url scheme
-    scheme =  qtwec.QWebEngineUrlScheme(b'custom-url-scheme')
-    scheme.setSyntax(qtwec.QWebEngineUrlScheme.Syntax.HostAndPort)
-    scheme.setDefaultPort(2345)
-    scheme.setFlags(qtwec.QWebEngineUrlScheme.Flag.SecureScheme) 
-    qtwec.QWebEngineUrlScheme.registerScheme(scheme)
-
-    #Register url scheme and handler together
-    handler = SchemeHandler(qtw.QApplication.instance())
-    qtwew.QWebEngineProfile.defaultProfile().installUrlSchemeHandler(b'custom-url-scheme', handler)
-    
-    return handler        
\ No newline at end of file
+        #Update web viewer to show the selected chunk
+        self.update_web_viewer(page = index, _type='html')
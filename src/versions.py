@@ -0,0 +1,505 @@
+from contextlib import contextmanager, nullcontext
+from itertools import count
+from rdflib import ConjunctiveGraph, Graph
+from rdflib.plugins.memory import IOMemory
+from rdflib.store import Store
+from threading import Lock, local
+from uuid import uuid4
+
+#Revisions of sub graphs are unique across processes, as state recorded with them is written to checkpoints
+_PROCESS = uuid4().hex
+_REVISIONS = count()
+
+class Cancelled(Exception):
+    """Raised when a transaction is cancelled before its version is published. The version is discarded.
+    """
+
+class ContextStore(Store):
+    """A ContextStore class used to keep every sub graph of a graph in a store of its own, so versions of the graph share the sub graphs they don't change.
+
+    A copy of the store shares the stores of its sub graphs with the original. A shared sub graph is copied the first time it is changed, and removing a sub graph only drops it from the copy.
+    """
+    context_aware = True
+    graph_aware = True
+
+    def __init__(self, stores=None, namespaces=(), length=None, revisions=None):
+        """Initialize ContextStore class.
+
+        Args:
+            stores ({Node: IOMemory}, optional): store of each sub graph, by identifier, shared with another ContextStore. Defaults to None.
+            namespaces ([(string, URIRef)], optional): bound prefixes and namespaces. Defaults to ().
+            length (int, optional): number of distinct triples of the stores, if already counted. Defaults to None.
+            revisions ({string: tuple}, optional): revision of each shared store. Defaults to None.
+        """
+        super().__init__()
+        self._stores = dict(stores or {})
+
+        #Revision of every sub graph, replaced whenever it changes. None until asked for after a change.
+        self._revisions = dict(revisions or {})
+
+        #Sub graphs whose store is shared with another version, and copied before it is changed
+        self._shared = set(self._stores)
+
+        #Graph of every sub graph, reading and writing through this store
+        self._contexts = {}
+
+        self._namespaces = {}
+        self._prefixes = {}
+        for prefix, namespace in namespaces:
+            self.bind(prefix, namespace)
+
+        #Number of distinct triples of the union of the sub graphs, counted when first needed after a change
+        self._length = length
+
+    def copy(self):
+        """Copy the store, sharing the stores of the sub graphs until either store changes them.
+
+        Returns:
+            ContextStore: the copy.
+        """
+        self._shared.update(self._stores)
+        return ContextStore(self._stores, self.namespaces(), self._length, self._revisions)
+
+    def add(self, triple, context, quoted=False):
+        """Add a triple to a sub graph.
+
+        Args:
+            triple ((Node, Node, Node)): the triple.
+            context (rdflib.Graph): the sub graph.
+            quoted (bool, optional): the triple is quoted. Defaults to False.
+        """
+        id = _identifier(context)
+        self._writable(id).add(triple, self._context(id), quoted)
+
+    def addN(self, quads):
+        """Add quads to their sub graphs.
+
+        Args:
+            quads (iterable): (subject, predicate, object, graph) quads.
+        """
+        id = store = None
+        for s, p, o, c in quads:
+            if id is None or _identifier(c) != id:
+                id = _identifier(c)
+                store, context = self._writable(id), self._context(id)
+            store.add((s, p, o), context)
+
+    def remove(self, triple, context=None):
+        """Remove the triples matching a pattern.
+
+        Args:
+            triple ((Node, Node, Node)): the pattern, None matching any term.
+            context (rdflib.Graph, optional): the sub graph. Defaults to None, every sub graph.
+        """
+        for id in [_identifier(context)] if context is not None else list(self._stores):
+            #Sub graphs without a matching triple aren't copied
+            if id in self._stores and _contains(self._stores[id], triple):
+                self._writable(id).remove(triple, self._context(id))
+
+    def triples(self, triple, context=None):
+        """Get the triples matching a pattern, each with the sub graphs holding it.
+
+        Args:
+            triple ((Node, Node, Node)): the pattern, None matching any term.
+            context (rdflib.Graph, optional): the sub graph. Defaults to None, the union of every sub graph.
+
+        Returns:
+            generator: ((subject, predicate, object), [rdflib.Graph]) tuples.
+        """
+        if context is not None and context is not self:
+            id = _identifier(context)
+            store = self._stores.get(id)
+            if store is not None:
+                contexts = (self._context(id),)
+                for match, _ in store.triples(triple):
+                    yield match, contexts
+            return
+
+        stores = list(self._stores.items())
+        for index, (id, store) in enumerate(stores):
+            for match, _ in store.triples(triple):
+                #A triple of several sub graphs is only returned with the first of them
+                if any(_contains(other, match) for _, other in stores[:index]):
+                    continue
+                yield match, [self._context(id)] + [self._context(other_id) for other_id, other in stores[index + 1:] if _contains(other, match)]
+
+    def __len__(self, context=None):
+        """Get the number of triples.
+
+        Args:
+            context (rdflib.Graph, optional): the sub graph. Defaults to None, the union of every sub graph.
+
+        Returns:
+            int: the number of triples.
+        """
+        if context is not None and context is not self:
+            store = self._stores.get(_identifier(context))
+            return len(store) if store is not None else 0
+        if self._length is None:
+            #Every triple of the largest sub graph is counted, only the triples of the others are looked up in the sub graphs before them
+            stores = sorted(self._stores.values(), key=len, reverse=True)
+            self._length = len(stores[0]) if stores else 0
+            for index, store in enumerate(stores[1:], 1):
+                self._length += sum(1 for triple, _ in store.triples((None, None, None)) if not any(_contains(other, triple) for other in stores[:index]))
+        return self._length
+
+    def contexts(self, triple=None):
+        """Get the sub graphs, or the sub graphs holding a triple.
+
+        Args:
+            triple ((Node, Node, Node), optional): the triple. Defaults to None.
+
+        Returns:
+            generator: rdflib.Graph of each sub graph.
+        """
+        for id, store in list(self._stores.items()):
+            if triple is None or _contains(store, triple):
+                yield self._context(id)
+
+    def add_graph(self, graph):
+        """Add an empty sub graph.
+
+        Args:
+            graph (rdflib.Graph): the sub graph.
+        """
+        self._writable(_identifier(graph), copy=False)
+
+    def remove_graph(self, graph):
+        """Remove a sub graph and its triples.
+
+        Args:
+            graph (rdflib.Graph): the sub graph.
+        """
+        id = _identifier(graph)
+        self._stores.pop(id, None)
+        self._revisions.pop(str(id), None)
+        self._shared.discard(id)
+        self._length = None
+
+    def revision(self, context):
+        """Get the revision of a sub graph. A sub graph has the same revision until it changes, in this store or in its copies, so state derived from it can tell whether it still describes it.
+
+        Args:
+            context (rdflib.Graph|string): the sub graph or its identifier.
+
+        Returns:
+            tuple: the revision. None if the store doesn't hold the sub graph.
+        """
+        id = str(_identifier(context))
+        if id not in self._revisions:
+            return None
+        if self._revisions[id] is None:
+            self._revisions[id] = (_PROCESS, next(_REVISIONS))
+        return self._revisions[id]
+
+    def bind(self, prefix, namespace):
+        """Bind a prefix to a namespace.
+
+        Args:
+            prefix (string): the prefix.
+            namespace (URIRef): the namespace.
+        """
+        self._prefixes[namespace] = prefix
+        self._namespaces[prefix] = namespace
+
+    def namespace(self, prefix):
+        """Get the namespace of a prefix.
+
+        Args:
+            prefix (string): the prefix.
+
+        Returns:
+            URIRef: the namespace. None if the prefix isn't bound.
+        """
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace):
+        """Get the prefix of a namespace.
+
+        Args:
+            namespace (URIRef): the namespace.
+
+        Returns:
+            string: the prefix. None if the namespace isn't bound.
+        """
+        return self._prefixes.get(namespace)
+
+    def namespaces(self):
+        """Get the bound prefixes.
+
+        Returns:
+            [(string, URIRef)]: (prefix, namespace) tuples.
+        """
+        return list(self._namespaces.items())
+
+    def _context(self, id):
+        """Get the graph of a sub graph.
+
+        Args:
+            id (Node): identifier of the sub graph.
+
+        Returns:
+            rdflib.Graph: the graph, reading and writing through this store.
+        """
+        context = self._contexts.get(id)
+        if context is None:
+            context = self._contexts[id] = Graph(store=self, identifier=id)
+        return context
+
+    def _writable(self, id, copy=True):
+        """Get the store of a sub graph to be changed, created if missing and copied if shared.
+
+        Args:
+            id (Node): identifier of the sub graph.
+            copy (bool, optional): copy a shared store. Defaults to True.
+
+        Returns:
+            IOMemory: the store.
+        """
+        self._length = None
+        self._revisions[str(id)] = None
+        store = self._stores.get(id)
+        if store is None:
+            store = self._stores[id] = IOMemory()
+        elif copy and id in self._shared:
+            context, shared = self._context(id), store
+            store = self._stores[id] = IOMemory()
+            store.addN((s, p, o, context) for (s, p, o), _ in shared.triples((None, None, None)))
+            self._shared.discard(id)
+        return store
+
+def unchanged(graph, revisions, id=None):
+    """Check whether state derived from sub graphs, such as aggregate views, still describes the queried graph.
+
+    Args:
+        graph (rdflib.ConjunctiveGraph): the queried graph, on a ContextStore.
+        revisions ({string: tuple}): revision of each sub graph when the state was derived from it, see ContextStore.revision.
+        id (string, optional): name of the sub graph being queried. Defaults to None, the union of every sub graph.
+
+    Returns:
+        bool: True if every queried sub graph holding triples has the revision the state was derived from.
+    """
+    contexts = [id] if id else [str(context.identifier) for context in graph.contexts() if len(context)]
+    return all(context in revisions and revisions[context] == graph.store.revision(context) for context in contexts)
+
+def _identifier(context):
+    """Get the identifier of a sub graph.
+
+    Args:
+        context (rdflib.Graph|Node): the sub graph or its identifier.
+
+    Returns:
+        Node: the identifier.
+    """
+    return getattr(context, 'identifier', context)
+
+def _contains(store, triple):
+    """Check whether a store holds a triple matching a pattern.
+
+    Args:
+        store (rdflib.store.Store): the store.
+        triple ((Node, Node, Node)): the pattern, None matching any term.
+
+    Returns:
+        bool: True if a triple matches.
+    """
+    for _ in store.triples(triple):
+        return True
+    return False
+
+class GraphVersion:
+    """A GraphVersion class used to hold one version of the graph, together with the aggregate views, samples and columnar tables derived from it.
+
+    A version is only changed while it is being built. Once published it is never changed again, so queries evaluated over it always see the same triples.
+    """
+    def __init__(self, number, c_graph, aggregates, samples, columns):
+        """Initialize GraphVersion class.
+
+        Args:
+            number (int): number of the version, increasing with every published version.
+            c_graph (rdflib.ConjunctiveGraph): the graph.
+            aggregates (aggregate.AggregateViews): aggregate views of the reports of the graph.
+            samples (sample.StratifiedSamples): stratified samples of the reports of the graph.
+            columns (columnar.ColumnarTables): columnar tables of the reports of the graph. None when disabled.
+        """
+        self.number = number
+        self.c_graph = c_graph
+        self.aggregates = aggregates
+        self.samples = samples
+        self.columns = columns
+
+        #Number of queries currently pinning the version
+        self.readers = 0
+
+    def copy(self, number):
+        """Copy the version, so the copy can be changed while the version is still queried. The copy shares the sub graphs and the derived state of every context with the version, and copies those of a context the first time it changes them.
+
+        Args:
+            number (int): number of the copy.
+
+        Returns:
+            GraphVersion: the copy.
+        """
+        c_graph = ConjunctiveGraph(self.c_graph.store.copy())
+        return GraphVersion(number, c_graph, self.aggregates.copy(), self.samples.copy(), self.columns.copy() if self.columns is not None else None)
+
+class GraphVersions:
+    """A GraphVersions class used to publish versions of the graph, and to pin the version each query reads.
+
+    Queries pin the current version while they run. Changes are applied to the next version, built alongside the current one by a single writer at a time, and published by an atomic swap once complete. A replaced version is released once its last reader finishes. Its memory is freed as soon as no result holds it anymore.
+    """
+    def __init__(self, version, monitor=None):
+        """Initialize GraphVersions class.
+
+        Args:
+            version (GraphVersion): the first version.
+            monitor (monitor.Monitor, optional): records the copy and the publication of every version as stages. Defaults to None.
+        """
+        self.current = version
+        self.monitor = monitor
+        self.published = 0
+        self.released = 0
+
+        #Guards the current version and the readers of every version
+        self._lock = Lock()
+
+        #Held while the next version is built
+        self._writer = Lock()
+
+        #Replaced versions that still have readers
+        self._retired = []
+
+        #Version being built and versions pinned by the running thread
+        self._local = local()
+
+    def visible(self):
+        """Get the version seen by the running thread.
+
+        Returns:
+            GraphVersion: the version being built by the thread, else the last version it pinned, else the current version.
+        """
+        builder = getattr(self._local, 'builder', None)
+        if builder is not None:
+            return builder
+        pinned = getattr(self._local, 'pinned', None)
+        return pinned[-1] if pinned else self.current
+
+    def building(self):
+        """Get the version being built by the running thread.
+
+        Raises:
+            RuntimeError: the thread isn't building a version.
+
+        Returns:
+            GraphVersion: the version being built.
+        """
+        builder = getattr(self._local, 'builder', None)
+        if builder is None:
+            raise RuntimeError('A published graph version can\'t be changed, changes must be made in a transaction')
+        return builder
+
+    @contextmanager
+    def pin(self):
+        """Pin the version seen by the running thread until the block exits. Pins can be nested, and the innermost pin sees the version of the outermost one.
+
+        Returns:
+            GraphVersion: the pinned version.
+        """
+        builder = getattr(self._local, 'builder', None)
+        if builder is not None:
+            yield builder
+            return
+
+        pinned = self._local.__dict__.setdefault('pinned', [])
+        with self._lock:
+            version = pinned[-1] if pinned else self.current
+            version.readers += 1
+        pinned.append(version)
+        try:
+            yield version
+        finally:
+            pinned.pop()
+            with self._lock:
+                version.readers -= 1
+                if not version.readers and version in self._retired:
+                    self._release(version)
+
+    @contextmanager
+    def build(self, cancelled=None):
+        """Build the next version from a copy of the current one, and publish it when the block exits. Nothing is published if the block raises. Builds in the same thread are nested into the outermost one.
+
+        Args:
+            cancelled (function, optional): checked once the block exits, returns True to discard the version instead of publishing it. Checked by the outermost build only. Defaults to None.
+
+        Raises:
+            Cancelled: the version was cancelled and discarded.
+
+        Returns:
+            GraphVersion: the version being built.
+        """
+        if getattr(self._local, 'builder', None) is not None:
+            yield self._local.builder
+            return
+
+        with self._writer:
+            #Only the writer replaces the current version, so it can be copied without the lock
+            current = self.current
+            with self._span('copy-version'):
+                self._local.builder = current.copy(current.number + 1)
+            try:
+                yield self._local.builder
+                if cancelled is not None and cancelled():
+                    raise Cancelled()
+                with self._span('publish'):
+                    self._publish(self._local.builder)
+            finally:
+                self._local.builder = None
+
+    def stats(self):
+        """Get the state of the versions.
+
+        Returns:
+            dict: the number of the current version, its readers, the number of replaced versions still read, and of published and released versions.
+        """
+        with self._lock:
+            return {
+                'version': self.current.number,
+                'readers': self.current.readers,
+                'retired': len(self._retired),
+                'published': self.published,
+                'released': self.released,
+            }
+
+    def _span(self, name):
+        """Record a stage of building a version.
+
+        Args:
+            name (string): name of the stage.
+
+        Returns:
+            contextmanager: a span of the monitor, if any.
+        """
+        return self.monitor.span(name) if self.monitor is not None else nullcontext()
+
+    def _publish(self, version):
+        """Replace the current version.
+
+        Args:
+            version (GraphVersion): the new version.
+        """
+        with self._lock:
+            previous, self.current = self.current, version
+            self.published += 1
+            self._retired.append(previous)
+            if not previous.readers:
+                self._release(previous)
+        print('INFO: Published graph version %s' % version.number)
+
+    def _release(self, version):
+        """Release a replaced version without readers. Called with the lock held.
+
+        Args:
+            version (GraphVersion): the version.
+        """
+        self._retired.remove(version)
+        self.released += 1
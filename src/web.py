@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .render import PAGING_SCRIPT
+import PyQt5.QtCore as qtc
+import PyQt5.QtWidgets as qtw
+import PyQt5.QtWebEngineCore as qtwec
+import PyQt5.QtWebEngineWidgets as qtwew
+from threading import Lock
+from urllib.parse import unquote
+
+class SchemeHandler (qtwec.QWebEngineUrlSchemeHandler):
+    """A handler used to respond to the custom url requests. Pages of the current result are rendered on demand and cached.
+
+    Args:
+        PyQt5.QtWebEngineCore.QWebEngineUrlSchemeHandler: abstract class used to handle custom url.
+    """
+    def __init__(self, parent=None, page_size=1000, cache_size=16):
+        """Initalize the handler.
+
+        Args:
+            parent (QtCore.QObject, optional): parent object of this handler. Defaults to None.
+            page_size (int, optional): number of rows in a page. Defaults to 1000.
+            cache_size (int, optional): maximum number of rendered pages cached. Defaults to 16.
+        """
+        super().__init__(parent)
+        self._type = b'text/html'
+        self._ui=None
+        self.page_size = page_size
+        self.cache_size = cache_size
+
+        #Current result. The generation is part of every page url, so pages of an old result are never mixed in.
+        self._cursor = None
+        self._renderer = None
+        self._generation = 0
+
+        #Rendered pages in least recently used order
+        self._pages = OrderedDict()
+        self._lock = Lock()
+
+        #Neighboring pages are rendered in the background
+        self._executor = ThreadPoolExecutor(1)
+
+    def requestStarted(self, job):
+        """Execute when http occured.
+
+        Args:
+            job (PyQt5.QtWebEngineCore.QWebEngineUrlRequestJob): the object contains all information related to the request.
+        """
+        request_url = job.requestUrl().toString()
+        if request_url.startswith('custom-url-scheme://retrieve-data/'):
+            self._request_to_retrieve_data(job, request_url[34:].strip('/').split('/'))
+        else:
+            target = request_url[32: len(request_url)-1]
+            target = unquote(target)
+            self._rediect_to_data(job, target)
+            pass
+
+    def _rediect_to_data(self, job, target):
+        """Tell main window to execute a query for new target
+
+        Args:
+            job (PyQt5.QtWebEngineCore.QWebEngineUrlRequestJob): the object contains all information related to the request.
+            target (string): the reference that should be direct to
+        """
+        self._ui.navigate_to(target)
+
+
+    def _request_to_retrieve_data(self, job, path):
+        """Execute this function when a request to retreive data is recevied. A request is either for a document showing a page, or for the rows of a page appended to the document.
+
+        Args:
+            job (PyQt5.QtWebEngineCore.QWebEngineUrlRequestJob): the object contains all information related to the request.
+            path ([string]): segments of the url path, [generation, 'view', page] or [generation, page].
+        """
+        data = ''
+        document = path[1:2] == ['view']
+        try:
+            generation, page = int(path[0]), int(path[-1])
+        except (IndexError, ValueError):
+            generation, page = None, 0
+
+        #Requests for an old result are answered with nothing
+        if generation == self._generation and self._cursor is not None and page >= 0:
+            rows, count = self._get_page(page)
+            if document:
+                #Plain text shows the source of the page only
+                script = PAGING_SCRIPT % (self._base_url(), page + 1, 'true' if count < self.page_size else 'false') if self._type == b'text/html' else ''
+                data = self._renderer.document(self._cursor.headers, rows, script)
+            else:
+                data = rows
+
+            #Render the neighboring pages before they are scrolled to
+            if count == self.page_size:
+                self._executor.submit(self._prefetch, generation, page + 1)
+            if page > 0:
+                self._executor.submit(self._prefetch, generation, page - 1)
+
+        #Create buff to store data
+        buff = qtc.QBuffer(parent=job)
+        buff.open(qtc.QIODevice.WriteOnly)
+        buff.write(data.encode())
+        buff.seek(0)
+        buff.close()
+
+        #Replay to the request with data and its type
+        job.reply(self._type if document else b'text/html', buff)
+
+    def _get_page(self, page):
+        """Get the rendered rows of a page, rendering them if they aren't cached.
+
+        Args:
+            page (int): index of the page.
+
+        Returns:
+            (string, int): html of the rows and the number of rows in the page.
+        """
+        with self._lock:
+            if page in self._pages:
+                self._pages.move_to_end(page)
+                return self._pages[page]
+            cursor, renderer = self._cursor, self._renderer
+
+        rows = cursor.rows(page * self.page_size, (page + 1) * self.page_size)
+        rendered = (renderer.render_rows(rows), len(rows))
+
+        with self._lock:
+            #Don't cache a page of a result that has been replaced meanwhile
+            if cursor is self._cursor:
+                self._pages[page] = rendered
+                self._pages.move_to_end(page)
+                while len(self._pages) > self.cache_size:
+                    self._pages.popitem(last=False)
+        return rendered
+
+    def _prefetch(self, generation, page):
+        """Render a page in the background. Executed on the prefetch thread.
+
+        Args:
+            generation (int): generation of the result the page belongs to.
+            page (int): index of the page.
+        """
+        if generation == self._generation:
+            self._get_page(page)
+
+    def _base_url(self):
+        """Get the url the pages of the current result are requested from.
+
+        Returns:
+            string: url of the pages without the page index.
+        """
+        return 'custom-url-scheme://retrieve-data/%s/' % self._generation
+
+    def page_url(self, page):
+        """Get the url of a document showing a page of the current result.
+
+        Args:
+            page (int): index of the first page shown.
+
+        Returns:
+            string: url of the document.
+        """
+        return self._base_url() + 'view/%s/' % page
+
+    def set_result(self, cursor, renderer):
+        """Replace the result served by this handler.
+
+        Args:
+            cursor (results.ResultCursor): cursor over the result.
+            renderer (render.HTMLRenderer): renderer of the result.
+        """
+        with self._lock:
+            self._generation += 1
+            self._cursor = cursor
+            self._renderer = renderer
+            self._pages.clear()
+    
+    def set_type(self, type_):
+        """Modify data type stored in this handler.
+
+        Args:
+            type_ (string): data type to be stored.
+        """
+        self._type = ('text/'+ type_).encode()
+
+    def set_ui(self, ui):
+        """Provide reference of ui to the handler.
+
+        Args:
+            ui (MainWindow): reference of ui.
+        """
+        self._ui = ui
+
+def install_scheme_handler():
+    """Initlaize custom url scheme and register it with a handler .
+
+    Returns:
+        handler: the handler responsibles for responding to custom url requests .
+    """
+    #initlaize url scheme
+    scheme =  qtwec.QWebEngineUrlScheme(b'custom-url-scheme')
+    scheme.setSyntax(qtwec.QWebEngineUrlScheme.Syntax.HostAndPort)
+    scheme.setDefaultPort(2345)
+    scheme.setFlags(qtwec.QWebEngineUrlScheme.Flag.SecureScheme | qtwec.QWebEngineUrlScheme.Flag.CorsEnabled)
+    qtwec.QWebEngineUrlScheme.registerScheme(scheme)
+
+    #Register url scheme and handler together
+    handler = SchemeHandler(qtw.QApplication.instance())
+    qtwew.QWebEngineProfile.defaultProfile().installUrlSchemeHandler(b'custom-url-scheme', handler)
+    
+    return handler        
\ No newline at end of file
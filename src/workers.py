@@ -0,0 +1,209 @@
+from .results import ResultCursor
+from .versions import Cancelled
+import PyQt5.QtCore as qtc
+from pathlib import Path
+
+class WorkerSignals(qtc.QObject):
+    """Signals emitted by a Worker. Qt delivers them on the event loop of the main window.
+    """
+    #Progress of the current stage as (description, n, total). total is 0 when progress is infinite.
+    progress = qtc.pyqtSignal(str, int, int)
+
+    #Number of results available so far
+    partial = qtc.pyqtSignal(int)
+
+    #Result of the operation
+    finished = qtc.pyqtSignal(object)
+
+    #Error message of a failed operation
+    failed = qtc.pyqtSignal(str)
+
+    #Emitted after a cancelled operation has been cleaned up
+    cancelled = qtc.pyqtSignal()
+
+class Worker(qtc.QRunnable):
+    """A Worker class used to run a long rdf operation on a QThreadPool thread.
+
+    Args:
+        PyQt5.QtCore.QRunnable: the base class of tasks run by QThreadPool.
+    """
+    def __init__(self, rdf_manager):
+        """Initialize Worker class.
+
+        Args:
+            rdf_manager (rdf.Manager): the rdf manager used to manage rdf graphs.
+        """
+        super().__init__()
+        self.rdf_manager = rdf_manager
+        self.signals = WorkerSignals()
+        self._cancelled = False
+
+    def run(self):
+        """Run the operation and report its outcome through signals.
+        """
+        self.rdf_manager.monitor.add_listener(self._on_progress)
+        try:
+            self.signals.finished.emit(self.work())
+        except Cancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        finally:
+            self.rdf_manager.monitor.remove_listener(self._on_progress)
+
+    def cancel(self):
+        """Request the operation to stop. The request is recorded, and the operation stops at its next check. A running import of the manager checks it before publishing its version, and discards the version if cancelled.
+        """
+        self._cancelled = True
+
+    def is_cancelled(self):
+        """Check whether the operation has been cancelled, such as by the manager before it publishes an import.
+
+        Returns:
+            bool: True if the operation has been cancelled.
+        """
+        return self._cancelled
+
+    def check(self):
+        """Stop the operation if it has been cancelled.
+        """
+        if self._cancelled:
+            raise Cancelled()
+
+    def work(self):
+        """Perform the operation.
+
+        Returns:
+            object: result of the operation.
+        """
+        raise NotImplementedError
+
+    def _on_progress(self, desc, n, total):
+        """Forward progress of the manager monitor to the ui.
+
+        Args:
+            desc (string): description of the current stage.
+            n (int): current tick.
+            total (int): total tick. None when progress is infinite.
+        """
+        #Cancels aren't raised from here. The manager checks them before publishing, so a cancelled import is discarded as a whole.
+        self.signals.progress.emit(desc, n, total or 0)
+
+class QueryWorker(Worker):
+    """A QueryWorker class used to query rdf graphs off the ui thread.
+    """
+    def __init__(self, rdf_manager, query, chunk_size=1000):
+        """Initialize QueryWorker class.
+
+        Args:
+            rdf_manager (rdf.Manager): the rdf manager used to manage rdf graphs.
+            query (string): a sparql statment used to query the graph.
+            chunk_size (int, optional): number of rows fetched before the result is shown. Defaults to 1000.
+        """
+        super().__init__(rdf_manager)
+        self.query = query
+        self.chunk_size = chunk_size
+
+    def work(self):
+        """Query the graph and fetch the first chunk of rows. The rest of the rows are fetched when they are shown.
+
+        Returns:
+            results.ResultCursor: cursor over the result.
+        """
+        self.signals.progress.emit('Querying', 0, 0)
+        cursor = ResultCursor(self.rdf_manager.execute(self.query))
+        cursor.fetch(self.chunk_size)
+        self.check()
+        self.signals.partial.emit(len(cursor))
+        return cursor
+
+class DescribeWorker(Worker):
+    """A DescribeWorker class used to describe an entity off the ui thread.
+    """
+    def __init__(self, rdf_manager, navigator, uri, chunk_size=1000):
+        """Initialize DescribeWorker class.
+
+        Args:
+            rdf_manager (rdf.Manager): the rdf manager used to manage rdf graphs.
+            navigator (navigation.EntityNavigator): the navigator used to describe entities.
+            uri (rdflib.URIRef): url of the entity.
+            chunk_size (int, optional): number of rows fetched before the result is shown. Defaults to 1000.
+        """
+        super().__init__(rdf_manager)
+        self.navigator = navigator
+        self.uri = uri
+        self.chunk_size = chunk_size
+
+    def work(self):
+        """Describe the entity and start prefetching its neighbors.
+
+        Returns:
+            results.ResultCursor: cursor over the triples of the entity.
+        """
+        self.signals.progress.emit('Describing', 0, 0)
+        cursor = ResultCursor(self.navigator.describe(self.uri))
+        cursor.fetch(self.chunk_size)
+        self.navigator.prefetch(self.uri)
+        return cursor
+
+class ImportWorker(Worker):
+    """An ImportWorker class used to import rdf files off the ui thread.
+    """
+    def __init__(self, rdf_manager, filename, snapshot=None, from_snapshot=False):
+        """Initialize ImportWorker class.
+
+        Args:
+            rdf_manager (rdf.Manager): the rdf manager used to manage rdf graphs.
+            filename (string): path to rdf file.
+            snapshot (string, optional): path to a snapshot of the rdf file. Written after the file is imported, unless from_snapshot is set. Defaults to None.
+            from_snapshot (bool, optional): import the snapshot instead of parsing the rdf file. Defaults to False.
+        """
+        super().__init__(rdf_manager)
+        self.filename = filename
+        self.snapshot = snapshot
+        self.from_snapshot = from_snapshot
+
+    def work(self):
+        """Import the rdf file.
+
+        Returns:
+            (bool, string): whether the file was imported, and its path.
+        """
+        id = Path(self.filename).stem
+        if self.from_snapshot:
+            self.rdf_manager.import_snapshot(self.snapshot, id, self.is_cancelled)
+            return True, Path(self.filename).resolve()
+
+        successfully_imported, path = self.rdf_manager.import_file(self.filename, self.is_cancelled)
+        if successfully_imported and self.snapshot:
+            self.rdf_manager.export_snapshot(self.snapshot, id)
+        return successfully_imported, path
+
+class ExportWorker(Worker):
+    """An ExportWorker class used to stream query results to a file off the ui thread.
+    """
+    def __init__(self, rdf_manager, query, filename):
+        """Initialize ExportWorker class.
+
+        Args:
+            rdf_manager (rdf.Manager): the rdf manager used to manage rdf graphs.
+            query (string): a sparql statment used to query the graph.
+            filename (string): path to the result file.
+        """
+        super().__init__(rdf_manager)
+        self.query = query
+        self.filename = filename
+
+    def work(self):
+        """Export the result of the query. The file of a cancelled export is removed.
+
+        Returns:
+            int: the number of rows written.
+        """
+        try:
+            rows = self.rdf_manager.export_query(self.query, self.filename)
+            self.check()
+            return rows
+        except Cancelled:
+            Path(self.filename).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+#Tests import the modules of the repository as the entry scripts do
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.generator import ReportGenerator
+from src.rdf import Manager
+
+#Number of synthetic reports per dataset
+SIZE = 300
+
+@pytest.fixture(scope='session')
+def reports(tmp_path_factory):
+    """Write synthetic arrest and crime reports.
+
+    Returns:
+        (Path, Path): the arrest and crime report CSV files.
+    """
+    paths = ReportGenerator(seed=1).write(tmp_path_factory.mktemp('reports'), SIZE)
+    return paths['amvf-fr72'], paths['2nrs-mtv8']
+
+@pytest.fixture
+def manager(reports):
+    """Import the synthetic reports into a manager keeping columnar tables.
+
+    Returns:
+        rdf.Manager: the manager.
+    """
+    manager = Manager(columnar=True)
+    manager.import_reports(SIZE, str(reports[0]), str(reports[1]), workers=1)
+    return manager
@@ -0,0 +1,42 @@
+from rdflib.term import Variable
+
+from src.algebra import describe_query
+from src.ingest import PORTAL_NAMESPACE
+
+PREFIX = 'PREFIX ns1: <%s>\nPREFIX xsd: <http://www.w3.org/2001/XMLSchema#>\n' % PORTAL_NAMESPACE
+
+#Answered from the charge-group view, and from the columns with the filter on the area
+VIEW = PREFIX + 'SELECT ?group (COUNT(?r) AS ?n) WHERE { ?r a ns1:ArrestReport ; ns1:hasCharge ?c . ?c ns1:hasChargeGroupDescription ?group } GROUP BY ?group'
+COLUMNS = PREFIX + 'SELECT ?group (COUNT(?r) AS ?n) WHERE { ?r a ns1:ArrestReport ; ns1:hasCharge ?c ; ns1:hasLocation ?l . ?c ns1:hasChargeGroupDescription ?group . ?l ns1:hasAreaName ?area FILTER (?area != ""^^xsd:string) } GROUP BY ?group'
+
+def test_exact_answers_of_approximate_queries_have_bounds(manager):
+    n, lower, upper = Variable('n'), Variable('n_lower'), Variable('n_upper')
+    for query in (VIEW, COLUMNS):
+        shape = describe_query(query, dict(manager.c_graph.namespaces()))
+        assert manager.aggregates.answer(shape, manager.c_graph) is not None or manager.columns.answer(shape, manager.c_graph) is not None
+
+        result = manager.execute(query, approximate=True)
+        assert result.vars == manager.samples.answer(shape, manager.c_graph).vars == [Variable('group'), n, lower, upper]
+        exact = {row[0]: row[1] for row in manager.execute(query)}
+        for row in result.bindings:
+            assert row[n] == row[lower] == row[upper] == exact[row[Variable('group')]]
+
+def test_exact_queries_are_unchanged(manager):
+    assert manager.execute(VIEW).vars == [Variable('group'), Variable('n')]
+
+def test_unsampled_sub_graphs_are_queried_exactly(manager, tmp_path):
+    #A copy of the arrest reports under other names, imported into a sub graph that wasn't sampled
+    path = tmp_path / 'copy.rdf'
+    manager.export_file(str(path), 'arrest-reports')
+    path.write_text(path.read_text().replace('/Report-', '/Copy-'))
+    manager.import_file(str(path))
+    shape = describe_query(VIEW, dict(manager.c_graph.namespaces()))
+    assert manager.samples.answer(shape, manager.c_graph) is None
+    assert manager.samples.answer(shape, manager.c_graph, 'arrest-reports') is not None
+
+    n, lower, upper = Variable('n'), Variable('n_lower'), Variable('n_upper')
+    exact = {row[0]: row[1] for row in manager.c_graph.query(VIEW)}
+    result = manager.execute(VIEW, approximate=True)
+    assert {row[Variable('group')]: row[n] for row in result.bindings} == exact
+    for row in result.bindings:
+        assert row[n] == row[lower] == row[upper]
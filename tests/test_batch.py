@@ -0,0 +1,22 @@
+from src.batch import BatchRunner
+
+def test_queries_of_the_same_name_get_their_own_results(manager, tmp_path):
+    queries = {
+        'a': 'SELECT (COUNT(*) AS ?n) WHERE { GRAPH <arrest-reports> { ?s ?p ?o } }',
+        'b': 'SELECT (COUNT(*) AS ?n) WHERE { GRAPH <crime-reports> { ?s ?p ?o } }',
+    }
+    for directory, query in queries.items():
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / 'q.rq').write_text(query, encoding='utf-8')
+    (tmp_path / 'a' / 'summary.rq').write_text(queries['a'], encoding='utf-8')
+
+    output = tmp_path / 'results'
+    runner = BatchRunner(manager, output, workers=1)
+    records = runner.run([str(tmp_path / 'a'), str(tmp_path / 'b')])
+
+    assert [(record['name'], record['status']) for record in records] == [('a/q.rq', 'OK'), ('a/summary.rq', 'OK'), ('b/q.rq', 'OK')]
+    assert len({record['output'] for record in records}) == 3
+    for directory, query in queries.items():
+        expected = str(list(manager.execute(query))[0][0])
+        assert (output / directory / 'q.csv').read_text(encoding='utf-8').split() == ['n', expected]
+    assert (output / 'summary.csv').read_text(encoding='utf-8').startswith('name,status')
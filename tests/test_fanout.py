@@ -0,0 +1,60 @@
+from threading import Barrier, Thread
+
+from rdflib import ConjunctiveGraph, Literal, URIRef
+from rdflib.namespace import XSD
+
+from src import fanout
+from src.algebra import describe_query
+from src.versions import ContextStore
+
+QUERIES = [
+    'SELECT ?g (COUNT(*) AS ?n) WHERE { GRAPH ?g { ?s ?p ?o } } GROUP BY ?g',
+    'SELECT ?g (COUNT(?r) AS ?n) WHERE { GRAPH ?g { ?r a ?type } } GROUP BY ?g',
+]
+
+def rows(result):
+    return sorted(tuple(str(value) for value in row) for row in result)
+
+def test_concurrent_fanout_queries_keep_their_partitions(manager, monkeypatch):
+    exact = [rows(manager.execute(query)) for query in QUERIES]
+
+    #Both queries are partitioned before either pool is forked
+    barrier = Barrier(len(QUERIES), timeout=30)
+    context = fanout.get_context('fork')
+
+    class Context:
+        def Pool(self, *args, **kwargs):
+            barrier.wait()
+            return context.Pool(*args, **kwargs)
+
+    monkeypatch.setattr(fanout, 'get_context', lambda method: Context())
+    answers = {}
+
+    def run(index):
+        answers[index] = rows(manager.execute(QUERIES[index], parallel=True))
+
+    threads = [Thread(target=run, args=(index,)) for index in range(len(QUERIES))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [answers.get(index) for index in range(len(QUERIES))] == exact
+
+def test_partial_sums_keep_their_datatype():
+    query = 'SELECT (SUM(?v) AS ?s) WHERE { GRAPH ?g { ?x <urn:value> ?v } }'
+    #Floats stay floats, and an integer added to a decimal is a decimal
+    for values in [(Literal(1.5, datatype=XSD.float), Literal(2, datatype=XSD.float)), (Literal(2), Literal('0.5', datatype=XSD.decimal))]:
+        graph = ConjunctiveGraph(ContextStore())
+        for index, value in enumerate(values):
+            graph.get_context(URIRef('urn:g%s' % index)).add((URIRef('urn:x%s' % index), URIRef('urn:value'), value))
+        result = fanout.FanOut(2).execute(describe_query(query, {}), graph)
+        [(exact,)] = list(graph.query(query))
+        assert result.bindings[0][result.vars[0]] == exact
+        assert result.bindings[0][result.vars[0]].datatype == exact.datatype
+
+def test_unbound_or_non_numeric_partial_sums_are_unbound():
+    value = Literal(1.5, datatype=XSD.float)
+    for partial in (None, Literal('x')):
+        assert fanout._combine('Aggregate_Sum', value, partial) is None
+        assert fanout._combine('Aggregate_Sum', partial, value) is None
@@ -0,0 +1,91 @@
+import pytest
+
+from functools import partial
+from pandas import concat, read_csv
+
+from src import rdf
+from src.ingest import LocalReader, PORTAL_NAMESPACE
+from src.rdf import Manager
+
+from conftest import SIZE
+
+QUERY = '''PREFIX ns1: <%s>
+SELECT ?group (COUNT(?r) AS ?n) WHERE {
+    ?r a ns1:ArrestReport ; ns1:hasCharge ?c .
+    ?c ns1:hasChargeGroupDescription ?group .
+} GROUP BY ?group''' % PORTAL_NAMESPACE
+
+def answer(result):
+    return sorted((str(row[0]), int(row[1])) for row in result)
+
+def test_reports_split_across_chunks_are_counted_once(reports, tmp_path, monkeypatch):
+    #Every third report gets a second charge, on the row following its first one
+    arrests = read_csv(reports[0], dtype=str)
+    charges = ['chrg_grp_cd', 'grp_description', 'charge', 'chrg_desc']
+    second = arrests.iloc[::3].copy()
+    second[charges] = arrests[charges].iloc[1::3].head(len(second)).to_numpy()
+    path = tmp_path / 'arrests.csv'
+    concat([arrests, second]).sort_index(kind='stable').to_csv(path, index=False)
+
+    #Chunks of 2000 bytes split the rows of many reports between two chunks
+    monkeypatch.setattr(rdf, 'LocalReader', partial(LocalReader, chunk_size=2000))
+    manager = Manager(sample_rates=(1.0,))
+    manager.import_reports(2 * SIZE, str(path), str(reports[1]), workers=1)
+    expected = answer(manager.c_graph.query(QUERY))
+    assert sum(n for _, n in expected) > SIZE
+
+    #Every report is sampled at a rate of 1, so the sample estimates are exact
+    shape = rdf.describe_query(QUERY, dict(manager.c_graph.namespaces()))
+    assert answer(manager.aggregates.answer(shape, manager.c_graph)) == expected
+    assert answer(manager.execute(QUERY)) == expected
+    assert answer(manager.samples.answer(shape, manager.c_graph, rate=1.0)) == expected
+
+def test_columns_are_built_once_per_import(reports, monkeypatch):
+    monkeypatch.setattr(rdf, 'LocalReader', partial(LocalReader, chunk_size=2000))
+    manager = Manager(columnar=True)
+    manager.import_reports(SIZE, str(reports[0]), str(reports[1]), workers=1)
+
+    assert manager.columns.names() == {'arrest-reports': SIZE, 'crime-reports': SIZE}
+    shape = rdf.describe_query(QUERY, dict(manager.c_graph.namespaces()))
+    assert answer(manager.columns.answer(shape, manager.c_graph)) == answer(manager.c_graph.query(QUERY))
+
+def test_columns_arent_used_once_their_sub_graph_changes(manager):
+    shape = rdf.describe_query(QUERY, dict(manager.c_graph.namespaces()))
+    assert manager.columns.answer(shape, manager.c_graph) is not None
+
+    #Replace one charge group, leaving the number of triples unchanged
+    triples = len(manager.c_graph.get_context('arrest-reports'))
+    with manager.transaction():
+        graph = manager.c_graph.get_context('arrest-reports')
+        charge, predicate, group = next(graph.triples((None, rdf.Namespace(PORTAL_NAMESPACE)['hasChargeGroupDescription'], None)))
+        graph.remove((charge, predicate, group))
+        graph.add((charge, predicate, rdf.Literal('EDITED')))
+    assert len(manager.c_graph.get_context('arrest-reports')) == triples
+
+    assert manager.columns.answer(shape, manager.c_graph) is None
+    #Charges may be shared by several reports, which all count the new group
+    assert 'EDITED' in dict(answer(manager.c_graph.query(QUERY)))
+
+def test_views_arent_used_when_the_union_holds_other_reports(manager, tmp_path):
+    #A copy of the arrest reports under other names, imported into a sub graph the views weren't built from
+    path = tmp_path / 'copy.rdf'
+    manager.export_file(str(path), 'arrest-reports')
+    path.write_text(path.read_text().replace('/Report-', '/Copy-'))
+    manager.import_file(str(path))
+    shape = rdf.describe_query(QUERY, dict(manager.c_graph.namespaces()))
+
+    assert manager.aggregates.answer(shape, manager.c_graph) is None
+    assert manager.aggregates.answer(shape, manager.c_graph, 'arrest-reports') is not None
+    expected = answer(manager.c_graph.query(QUERY))
+    assert sum(n for _, n in expected) == 2 * SIZE
+    assert answer(manager.execute(QUERY)) == expected
+
+def test_only_statments_that_cant_be_evaluated_are_logged(manager, capsys, monkeypatch):
+    assert manager.query('SELECT ?r WHERE { ?r ?p }') == []
+    assert 'ERROR:' in capsys.readouterr().out
+
+    def fail(*args):
+        raise RuntimeError('failed')
+    monkeypatch.setattr(manager, 'execute', fail)
+    with pytest.raises(RuntimeError):
+        manager.query(QUERY)
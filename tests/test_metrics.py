@@ -0,0 +1,44 @@
+from asyncio import Semaphore, run
+
+from src import server as endpoint
+from src.batch import BatchRunner
+from src.replica import ReplicaPool
+
+QUERY = 'SELECT ?area (COUNT(?r) AS ?n) WHERE { ?r ?p ?area } GROUP BY ?area'
+
+def query_records(manager):
+    return [record for record in manager.monitor.records if record['name'] == 'query' and 'format' in record]
+
+def test_batch_records_the_queries_of_its_replicas(manager, tmp_path):
+    for name in ('a', 'b', 'c'):
+        (tmp_path / (name + '.rq')).write_text(QUERY, encoding='utf-8')
+    (tmp_path / 'broken.rq').write_text('SELECT WHERE', encoding='utf-8')
+
+    records = BatchRunner(manager, tmp_path / 'results', workers=2).run([str(tmp_path)])
+
+    traces = {trace['query']: trace for trace in query_records(manager)}
+    assert sorted(traces) == ['a.rq', 'b.rq', 'broken.rq', 'c.rq']
+    assert 'error' in traces['broken.rq']
+    for record in records:
+        assert traces[record['name']]['rows'] == record['rows']
+
+def test_server_records_the_queries_of_its_replicas(manager):
+    server = endpoint.Server(manager, workers=1)
+    endpoint._manager = manager
+    server._executor = ReplicaPool(1)
+
+    async def evaluate():
+        server._semaphore = Semaphore(1)
+        return await server._evaluate(QUERY, None, 'csv')
+
+    try:
+        status, _, body = run(evaluate())
+    finally:
+        server._executor.shutdown()
+        endpoint._manager = None
+
+    assert status == 200
+    traces = query_records(manager)
+    assert len(traces) == 1
+    assert traces[0]['rows'] == len(body.decode('utf-8').splitlines()) - 1
+    assert traces[0]['bytes'] == len(body)
@@ -0,0 +1,29 @@
+from src.results import ResultCursor
+
+QUERY = 'SELECT ?s ?p ?o WHERE { GRAPH <arrest-reports> { ?s ?p ?o } }'
+
+def test_cursor_keeps_a_bounded_window_of_rows(manager):
+    expected = [[str(value) for value in row] for row in manager.execute(QUERY)]
+    cursor = ResultCursor(manager.execute(QUERY), window=50)
+
+    assert cursor.fetch(500) == 500
+    assert len(cursor) == 500 and len(cursor._window) == 50
+    assert cursor.rows(0, 500) == expected[:500]
+    assert len(cursor._read) <= 50
+
+    #Scrolling back reads the rows from the file, scrolling forward reads the following ones
+    for index in (3, 480, 120, 0, 499, 250, 249):
+        assert cursor.row(index) == expected[index]
+        assert len(cursor._window) <= 50
+
+    cursor.fetch(len(expected))
+    assert cursor.exhausted and len(cursor) == len(expected)
+    assert cursor.rows(len(expected) - 10, len(expected) + 10) == expected[-10:]
+
+def test_cursor_never_evaluates_the_query_again(manager):
+    cursor = ResultCursor(manager.execute(QUERY), window=10)
+    first = cursor.rows(0, 100)
+
+    #Rows behind the window are read even once the graph no longer holds them
+    manager.remove_context('arrest-reports')
+    assert cursor.rows(0, 100) == first
@@ -0,0 +1,92 @@
+import pytest
+from pandas import read_csv
+
+from src import versions
+from src.algebra import describe_query
+from src.ingest import PORTAL_NAMESPACE
+
+QUERY = '''PREFIX ns1: <%s>
+SELECT ?group (COUNT(?r) AS ?n) WHERE {
+    ?r a ns1:ArrestReport ; ns1:hasCharge ?c .
+    ?c ns1:hasChargeGroupDescription ?group .
+} GROUP BY ?group''' % PORTAL_NAMESPACE
+
+def stores(graph):
+    return {str(id): store for id, store in graph.store._stores.items()}
+
+def count(result):
+    return sum(int(row[1]) for row in result)
+
+def test_removed_context_is_gone_from_every_path(manager):
+    shape = describe_query(QUERY, dict(manager.c_graph.namespaces()))
+    assert manager.aggregates.answer(shape, manager.c_graph) is not None and manager.columns.answer(shape, manager.c_graph) is not None
+    assert count(manager.execute(QUERY)) == 300
+
+    manager.remove_context('arrest-reports')
+
+    assert 'arrest-reports' not in manager.get_context_id()
+    assert count(manager.c_graph.query(QUERY)) == 0
+    assert count(manager.execute(QUERY)) == 0
+    assert count(manager.execute(QUERY, approximate=True)) == 0
+    assert ('arrest-reports', 'charge-group') not in manager.aggregates.names()
+    assert 'arrest-reports' not in manager.columns.names()
+    assert ('arrest-reports', 0.01) not in manager.samples.sizes()
+    assert len(manager.samples._graphs[0.01].get_context('arrest-reports')) == 0
+
+    #The other dataset is still answered from its views
+    assert ('crime-reports', 'weapon') in manager.aggregates.names()
+
+def test_versions_share_the_sub_graphs_they_dont_change(manager, tmp_path):
+    filename = tmp_path / 'copy.rdf'
+    manager.export_file(str(filename), 'crime-reports', format='xml')
+    previous = manager.c_graph
+    manager.import_file(str(filename))
+
+    #A new sub graph leaves every other one shared
+    before, after = stores(previous), stores(manager.c_graph)
+    assert after['arrest-reports'] is before['arrest-reports']
+    assert after['crime-reports'] is before['crime-reports']
+    assert len(after['copy']) == len(before['crime-reports'])
+
+    #A changed sub graph is copied, and the previous version keeps reading the original
+    manager.remove_context('arrest-reports')
+    with manager.transaction():
+        manager.c_graph.get_context('crime-reports').remove((None, None, None))
+    assert len(manager.c_graph.get_context('crime-reports')) == 0
+    assert len(previous.get_context('crime-reports')) == len(before['crime-reports']) > 0
+    assert 'arrest-reports' in [str(context.identifier) for context in previous.contexts()]
+    assert count(previous.query(QUERY)) == 300
+
+def test_delta_load_leaves_the_previous_version_unchanged(manager, reports, tmp_path):
+    #A delta load adding a second charge to every third report
+    charges = ['chrg_grp_cd', 'grp_description', 'charge', 'chrg_desc']
+    arrests = read_csv(reports[0], dtype=str)
+    delta = arrests.iloc[::3].copy()
+    delta[charges] = arrests[charges].iloc[1::3].head(len(delta)).to_numpy()
+    path = tmp_path / 'arrests.csv'
+    delta.to_csv(path, index=False)
+
+    with manager.pin() as previous:
+        pass
+    counts = previous.aggregates.get('charge-group', 'arrest-reports')
+    sizes = previous.samples.sizes()
+    manager.import_reports(len(delta), str(path), str(reports[1]), workers=1)
+
+    assert previous.aggregates.get('charge-group', 'arrest-reports') == counts
+    assert previous.samples.sizes() == sizes
+    assert count(previous.c_graph.query(QUERY)) == 300
+    assert count(manager.execute(QUERY)) == count(manager.c_graph.query(QUERY)) > 300
+
+def test_union_length_is_counted_once_per_version(manager, monkeypatch, tmp_path):
+    filename = tmp_path / 'copy.rdf'
+    manager.export_file(str(filename), 'crime-reports', format='xml')
+    assert len(manager.c_graph) == len(set(manager.c_graph.triples((None, None, None))))
+
+    #Neither an unchanged version nor a file import scan the union
+    monkeypatch.setattr(versions, '_contains', lambda store, triple: pytest.fail('The union was scanned'))
+    with manager.transaction():
+        pass
+    assert len(manager.c_graph) > 0
+    assert manager.import_file(str(filename))[0]
+    record = [record for record in manager.monitor.records if record['name'] == 'import-file'][-1]
+    assert record['triples'] == len(manager.c_graph.get_context('crime-reports'))
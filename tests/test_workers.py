@@ -0,0 +1,35 @@
+from src.rdf import Manager
+from src.workers import ImportWorker
+
+def test_cancelled_import_is_discarded(manager, tmp_path):
+    filename = tmp_path / 'arrest-reports.rdf'
+    manager.export_file(str(filename), 'arrest-reports', format='xml')
+
+    target = Manager()
+    worker = ImportWorker(target, str(filename))
+    outcomes = []
+    worker.signals.finished.connect(lambda result: outcomes.append('finished'))
+    worker.signals.cancelled.connect(lambda: outcomes.append('cancelled'))
+
+    #The cancel arrives while the import is running
+    target.monitor.add_listener(lambda desc, n, total: worker.cancel())
+    worker.run()
+
+    assert outcomes == ['cancelled']
+    assert len(target.c_graph) == 0
+    assert 'arrest-reports' not in target.get_context_id()
+    assert target.get_versions()['published'] == 0
+
+def test_cancelled_import_leaves_an_existing_sub_graph_unchanged(manager, tmp_path):
+    #Other triples imported into an existing sub graph
+    filename = tmp_path / 'arrest-reports.rdf'
+    manager.export_file(str(filename), 'crime-reports', format='xml')
+    triples = set(manager.c_graph.get_context('arrest-reports'))
+    published = manager.get_versions()['published']
+
+    worker = ImportWorker(manager, str(filename))
+    manager.monitor.add_listener(lambda desc, n, total: worker.cancel())
+    worker.run()
+
+    assert set(manager.c_graph.get_context('arrest-reports')) == triples
+    assert manager.get_versions()['published'] == published